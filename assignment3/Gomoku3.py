@@ -5,6 +5,8 @@
 from gtp_connection import GtpConnection,move_to_coord,coord_to_point
 from board_util import GoBoardUtil,EMPTY, BLACK, WHITE
 from simple_board import SimpleGoBoard
+from bitboard import create_board, BOARD_BACKENDS
+import argparse
 
 class SimulationPlayer(object):
     def __init__(self, numSimulations):
@@ -27,16 +29,12 @@ class SimulationPlayer(object):
         return best
 
     def simulate(self, state, move, color):
-        stats = [0] * 3
         #convert the last move to the index point
         coord = move_to_coord(move,state.size)
         point = coord_to_point(coord[0],coord[1],state.size)
         state.play_move_gomoku(point,color)
         moveNr = state.moveNumber()
-        for _ in range(self.numSimulations):
-            winner, _ = state.simulate()
-            stats[winner] += 1
-            state.resetToMoveNumber(moveNr)
+        stats = state.simulate_batch(self.numSimulations)
         assert sum(stats) == self.numSimulations
         assert moveNr == state.moveNumber()
         state.undoMove()
@@ -45,13 +43,17 @@ class SimulationPlayer(object):
             eval = 1 - eval
         return eval
     
-def run():
+def run(board_backend='array'):
     """
     start the gtp connection and wait for commands.
+    board_backend is 'array' for SimpleGoBoard or 'bitboard' for BitboardGoBoard
     """
-    board = SimpleGoBoard(7)
+    board = create_board(7, board_backend)
     con = GtpConnection(SimulationPlayer(10), board)
     con.start_connection()
 
 if __name__=='__main__':
-    run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board', choices = sorted(BOARD_BACKENDS), default = 'array',
+                        help = 'board representation')
+    run(parser.parse_args().board)
@@ -405,9 +405,7 @@ class GtpConnection():
             return
         move_type,pending_moves = self.policy_moves()
         try:
-            signal.alarm(int(self.timelimit))
             move = self.go_engine.genmove(pending_moves,self.board, color)
-            signal.alarm(0)
         except Exception as e:
             move = PASS
         if move == PASS:
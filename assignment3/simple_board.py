@@ -17,6 +17,70 @@ from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
 
 from gtp_connection import point_to_coord,format_point
 
+"""
+Cache of line_windows() tables, one per board size
+"""
+_window_tables = {}
+
+def line_windows(board):
+    """
+    Return a (W, 5) array with the points of every line of 5 points on
+    the board, in all four directions. Shared by all boards of a size.
+    """
+    if board.size not in _window_tables:
+        windows = []
+        for point in where1d(board.board != BORDER):
+            for step in (1, board.NS, board.NS + 1, board.NS - 1):
+                line = [point + i * step for i in range(5)]
+                if line[-1] < board.maxpoint and \
+                        all(board.board[p] != BORDER for p in line):
+                    windows.append(line)
+        _window_tables[board.size] = np.array(windows, dtype = np.int32).reshape(-1, 5)
+    return _window_tables[board.size]
+
+"""
+Data that only depends on the board size: the empty board array, its
+empty points, and the neighbor and diagonal lists of every point.
+All boards of a size share one BoardGeometry, so reset() and copy() do
+not rebuild them. Its fields must not be modified.
+"""
+class BoardGeometry(object):
+
+    def __init__(self, size):
+        self.size = size
+        self.NS = size + 1
+        self.maxpoint = size * size + 3 * (size + 1)
+        board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        self.row_starts = [row * self.NS + 1 for row in range(size + 1)]
+        for row in range(1, size + 1):
+            start = self.row_starts[row]
+            board[start : start + size] = EMPTY
+        self.empty_board = board
+        self.empty_points = [int(p) for p in where1d(board == EMPTY)]
+        self.empty_index = [-1] * self.maxpoint
+        for i, p in enumerate(self.empty_points):
+            self.empty_index[p] = i
+        self.neighbors = []
+        self.diag_neighbors = []
+        for point in range(self.maxpoint):
+            if board[point] == BORDER:
+                self.neighbors.append([])
+            else:
+                self.neighbors.append([nb for nb in
+                                       [point - 1, point + 1, point - self.NS, point + self.NS]
+                                       if board[nb] != BORDER])
+            self.diag_neighbors.append([point - self.NS - 1,
+                                        point - self.NS + 1,
+                                        point + self.NS - 1,
+                                        point + self.NS + 1])
+
+_geometries = {}
+
+def board_geometry(size):
+    if size not in _geometries:
+        _geometries[size] = BoardGeometry(size)
+    return _geometries[size]
+
 class SimpleGoBoard(object):
 
     def get_color(self, point):
@@ -67,7 +131,30 @@ class SimpleGoBoard(object):
         Return:
             The empty points on the board
         """
-        return where1d(self.board == EMPTY)
+        return np.array(self.empty_points, dtype = np.int32)
+
+    def random_empty_point(self):
+        """
+        Return a uniformly random empty point, or PASS if the board is full
+        """
+        if not self.empty_points:
+            return PASS
+        return self.empty_points[random.randrange(len(self.empty_points))]
+
+    def _remove_empty_point(self, point):
+        """
+        Swap-remove point from empty_points, keeping _empty_index in sync
+        """
+        i = self._empty_index[point]
+        last = self.empty_points.pop()
+        if last != point:
+            self.empty_points[i] = last
+            self._empty_index[last] = i
+        self._empty_index[point] = -1
+
+    def _add_empty_point(self, point):
+        self._empty_index[point] = len(self.empty_points)
+        self.empty_points.append(point)
 
     def __init__(self, size):
         """
@@ -89,58 +176,38 @@ class SimpleGoBoard(object):
         self.WE = 1
         self.ko_recapture = None
         self.current_player = BLACK
-        self.maxpoint = size * size + 3 * (size + 1)
-        self.board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        self.geometry = board_geometry(size)
+        self.maxpoint = self.geometry.maxpoint
+        self.board = np.copy(self.geometry.empty_board)
         self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
-        self._initialize_empty_points(self.board)
-        self._initialize_neighbors()
+        self.neighbors = self.geometry.neighbors
+        # empty_points is kept up to date by play_move_gomoku and undoMove,
+        # _empty_index maps a point to its position in empty_points
+        self.empty_points = list(self.geometry.empty_points)
+        self._empty_index = list(self.geometry.empty_index)
         self.moves=[]
         self.last_move = None
+        self._winner = None
+        self._win_move_nr = None
 
     def copy(self):
-        b = SimpleGoBoard(self.size)
-        assert b.NS == self.NS
-        assert b.WE == self.WE
-        b.ko_recapture = self.ko_recapture
-        b.current_player = self.current_player
-        assert b.maxpoint == self.maxpoint
+        """
+        Copy of the position. Plain values and the shared geometry are
+        taken over as they are, only the mutable state is cloned.
+        """
+        b = type(self).__new__(type(self))
+        b.__dict__.update(self.__dict__)
         b.board = np.copy(self.board)
+        b.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
+        b.moves = list(self.moves)
+        b.empty_points = list(self.empty_points)
+        b._empty_index = list(self._empty_index)
         return b
 
     def row_start(self, row):
         assert row >= 1
         assert row <= self.size
-        return row * self.NS + 1
-        
-    def _initialize_empty_points(self, board):
-        """
-        Fills points on the board with EMPTY
-        Argument
-        ---------
-        board: numpy array, filled with BORDER
-        """
-        for row in range(1, self.size + 1):
-            start = self.row_start(row)
-            board[start : start + self.size] = EMPTY
-
-    def _on_board_neighbors(self, point):
-        nbs = []
-        for nb in self._neighbors(point):
-            if self.board[nb] != BORDER:
-                nbs.append(nb)
-        return nbs
-            
-    def _initialize_neighbors(self):
-        """
-        precompute neighbor array.
-        For each point on the board, store its list of on-the-board neighbors
-        """
-        self.neighbors = []
-        for point in range(self.maxpoint):
-            if self.board[point] == BORDER:
-                self.neighbors.append([])
-            else:
-                self.neighbors.append(self._on_board_neighbors(point))
+        return self.geometry.row_starts[row]
         
     def is_eye(self, point, color):
         """
@@ -318,10 +385,7 @@ class SimpleGoBoard(object):
 
     def _diag_neighbors(self, point):
         """ List of all four diagonal neighbors of point """
-        return [point - self.NS - 1, 
-                point - self.NS + 1, 
-                point + self.NS - 1, 
-                point + self.NS + 1]
+        return self.geometry.diag_neighbors[point]
     
     def _point_to_coord(self, point):
         """
@@ -357,8 +421,12 @@ class SimpleGoBoard(object):
         if self.board[point] != EMPTY:
             return False
         self.board[point] = color
+        self._remove_empty_point(point)
         self.moves.append(point)
         self.last_move = point
+        if self._winner is None and self.point_check_game_end_gomoku(point):
+            self._winner = color
+            self._win_move_nr = len(self.moves)
         self.current_player = GoBoardUtil.opponent(color)
         return True
         
@@ -375,7 +443,7 @@ class SimpleGoBoard(object):
             p = p + d
             if self.board[p] == color:
                 count = count + 1
-                if count == 5:
+                if count >= 5:
                     break
             else:
                 break
@@ -385,12 +453,12 @@ class SimpleGoBoard(object):
             p = p + d
             if self.board[p] == color:
                 count = count + 1
-                if count == 5:
+                if count >= 5:
                     break
             else:
                 break
-        assert count <= 5
-        return count == 5
+        # the played stone may join two shorter lines into an overline
+        return count >= 5
     
     def point_check_game_end_gomoku(self, point):
         """
@@ -414,22 +482,21 @@ class SimpleGoBoard(object):
         
         return False
     
+    @property
+    def winner(self):
+        """
+        The color that has five in a row, or None while the game is open.
+        Maintained incrementally by play_move_gomoku and undoMove.
+        """
+        return self._winner
+
     def check_game_end_gomoku(self):
         """
             Check if the game ends for the game of Gomoku.
+            Only the last played stone can complete a five, so the result
+            is tracked in play_move_gomoku instead of rescanning all stones.
             """
-        white_points = where1d(self.board == WHITE)
-        black_points = where1d(self.board == BLACK)
-        
-        for point in white_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, WHITE
-    
-        for point in black_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, BLACK
-
-        return False, None
+        return self._winner is not None, self._winner
 
 
     ##Assignment 3 starts here
@@ -458,7 +525,11 @@ class SimpleGoBoard(object):
     def undoMove(self):
         location = self.moves.pop()
         self.last_move = location
+        if self._win_move_nr is not None and len(self.moves) < self._win_move_nr:
+            self._winner = None
+            self._win_move_nr = None
         self.board[location] = EMPTY
+        self._add_empty_point(location)
         self.current_player = GoBoardUtil.opponent(self.current_player)
 
     def simulate(self):
@@ -474,6 +545,51 @@ class SimpleGoBoard(object):
             return winner,i
         return EMPTY, i
 
+    def simulate_batch(self, num_rollouts):
+        """
+        Play num_rollouts random games from this position at once, with the
+        same result distribution as simulate(), without changing the board.
+        Each rollout is a random order of the empty points. A stone gets
+        the value +1 for black or -1 for white, so a line of 5 points is a
+        five when its sum is +-5. The rollout ends at the first ply that
+        completes a five, which is the last ply played in that line.
+        Returns the counts [draws, black wins, white wins], indexed by color.
+        """
+        stats = [0] * 3
+        win, winner = self.check_game_end_gomoku()
+        if win:
+            stats[winner] = num_rollouts
+            return stats
+        empty = np.array(self.empty_points, dtype = np.int32)
+        n = len(empty)
+        if n == 0:
+            stats[EMPTY] = num_rollouts
+            return stats
+        # order[k, i] is the index into empty of the i-th move of rollout k
+        order = np.argsort(np.random.random((num_rollouts, n)), axis = 1)
+        ply = np.empty((num_rollouts, n), dtype = np.int32)
+        np.put_along_axis(ply, order, np.arange(n, dtype = np.int32)[None, :], axis = 1)
+        to_play = 1 if self.current_player == BLACK else -1
+        value = np.zeros((num_rollouts, self.maxpoint), dtype = np.int32)
+        value[:, self.board == BLACK] = 1
+        value[:, self.board == WHITE] = -1
+        value[:, empty] = np.where(ply % 2 == 0, to_play, -to_play)
+        # stones already on the board are played at ply -1
+        played = np.full((num_rollouts, self.maxpoint), -1, dtype = np.int32)
+        played[:, empty] = ply
+        windows = line_windows(self)
+        sums = value[:, windows].sum(axis = 2)
+        done = played[:, windows].max(axis = 2)
+        done[np.abs(sums) != 5] = n
+        end = done.argmin(axis = 1)
+        rows = np.arange(num_rollouts)
+        has_five = done[rows, end] < n
+        black_wins = has_five & (sums[rows, end] > 0)
+        stats[BLACK] = int(black_wins.sum())
+        stats[WHITE] = int(has_five.sum()) - stats[BLACK]
+        stats[EMPTY] = num_rollouts - stats[BLACK] - stats[WHITE]
+        return stats
+
     def count(self,point,otherpoint,step):
 
         if self.get_color(point) != self.get_color(otherpoint):
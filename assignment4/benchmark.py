@@ -0,0 +1,311 @@
+"""
+benchmark.py
+
+Playout and search throughput of the players, as JSON.
+Every benchmark runs the same fixed-seed workload on a set of reference
+positions: the empty board and the unfinished positions of
+assignment3-public-tests.gtp for the playouts, and the test games cut
+off with SOLVE_EMPTY empty points left for the solver.
+
+The player directories all have their own simple_board, board_util, ...
+modules, so each benchmark runs in a child process with its player
+directory first on sys.path.
+
+Usage: python3 benchmark.py [--playouts N] [--only NAME ...] [--output FILE]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+PUBLIC_TESTS = os.path.join(ROOT, 'assignment3', 'assignment3-public-tests.gtp')
+
+SEED = 496
+BOARD_SIZE = 7
+"""
+Empty points left on the solver positions. alphabeta.solve takes a few
+seconds with 12, but minutes with 15. dfpn.solve is much faster.
+"""
+SOLVE_EMPTY = 12
+COLUMN_LETTERS = "ABCDEFGHJKLMNOPQRSTUVWXYZ"
+
+def load_positions(filename=PUBLIC_TESTS):
+    """
+    Return the positions the commands of a GTP test file are run on, as
+    (label, size, [(color, move)]) with color 'b' or 'w' and move a
+    GTP point such as 'A7'. Each position is listed once.
+    """
+    positions = []
+    seen = set()
+    size = BOARD_SIZE
+    moves = []
+    with open(filename) as f:
+        for line in f:
+            words = line.split()
+            if not words or words[0].startswith('#'):
+                continue
+            if words[0] == 'boardsize':
+                size = int(words[1])
+                moves = []
+            elif words[0] == 'clear_board':
+                moves = []
+            elif words[0] == 'play':
+                moves.append((words[1].lower(), words[2].upper()))
+            elif words[0].isdigit():
+                key = (size, tuple(moves))
+                if key not in seen:
+                    seen.add(key)
+                    positions.append(('test{}'.format(words[0]), size, list(moves)))
+    return positions
+
+def point_of(move, size):
+    col = COLUMN_LETTERS.index(move[0]) + 1
+    row = int(move[1:])
+    return row * (size + 1) + col
+
+def build_board(board_class, size, moves):
+    from board_util import BLACK, WHITE
+    board = board_class(size)
+    for color, move in moves:
+        board.play_move_gomoku(point_of(move, size), BLACK if color == 'b' else WHITE)
+    return board
+
+def game_over(board):
+    return board.check_game_end_gomoku()[0] or len(board.empty_points) == 0
+
+def reference_positions(board_class):
+    """
+    Return (playout positions, solve positions) as lists of
+    (label, board). Playout positions are the empty board and the
+    unfinished test positions, solve positions are the test games
+    cut off with SOLVE_EMPTY empty points left.
+    """
+    playout = [('empty', board_class(BOARD_SIZE))]
+    solve = []
+    seen = set()
+    for label, size, moves in load_positions():
+        board = build_board(board_class, size, moves)
+        if not game_over(board):
+            playout.append((label, board))
+        cut = size * size - SOLVE_EMPTY
+        if len(moves) < cut or tuple(moves[:cut]) in seen:
+            continue
+        seen.add(tuple(moves[:cut]))
+        board = build_board(board_class, size, moves[:cut])
+        if not game_over(board):
+            solve.append(('{}@{}'.format(label, cut), board))
+    return playout, solve
+
+def seed(i):
+    random.seed(SEED + i)
+    np.random.seed(SEED + i)
+
+def measure(name, label, unit, run):
+    """
+    Time run(), which returns the amount of work it did in unit
+    """
+    start = time.perf_counter()
+    count = run()
+    seconds = time.perf_counter() - start
+    return {'benchmark': name, 'position': label, 'unit': unit,
+            'count': count, 'seconds': seconds,
+            'rate': count / seconds if seconds > 0 else None}
+
+def bench_simulate(name, playouts):
+    from simple_board import SimpleGoBoard
+    results = []
+    for i, (label, board) in enumerate(reference_positions(SimpleGoBoard)[0]):
+        seed(i)
+        moveNr = board.moveNumber()
+        def run():
+            for _ in range(playouts):
+                board.simulate()
+                board.resetToMoveNumber(moveNr)
+            return playouts
+        results.append(measure(name, label, 'playouts', run))
+    return results
+
+def bench_simulate_batch(name, playouts):
+    from simple_board import SimpleGoBoard
+    results = []
+    for i, (label, board) in enumerate(reference_positions(SimpleGoBoard)[0]):
+        seed(i)
+        def run():
+            board.simulate_batch(playouts)
+            return playouts
+        results.append(measure(name, label, 'playouts', run))
+    return results
+
+def bench_mysimulate(name, playouts):
+    from simple_board import SimpleGoBoard
+    results = []
+    for i, (label, board) in enumerate(reference_positions(SimpleGoBoard)[0]):
+        seed(i)
+        start = board.snapshot()
+        color = board.current_player
+        def run():
+            for _ in range(playouts):
+                board.mysimulate(color)
+                board.restore(start)
+            return playouts
+        results.append(measure(name, label, 'playouts', run))
+    return results
+
+def bench_do_playout(name, playouts, playout_policy):
+    from simple_board import SimpleGoBoard
+    module = __import__('Gomoku4' if os.path.exists('Gomoku4.py') else 'Gomoku3')
+    results = []
+    for i, (label, board) in enumerate(reference_positions(SimpleGoBoard)[0]):
+        seed(i)
+        player = module.GomokuSimulationPlayer(playout_policy=playout_policy)
+        def run():
+            for _ in range(playouts):
+                player._do_playout(board, board.current_player)
+            return playouts
+        results.append(measure(name, label, 'playouts', run))
+    return results
+
+def bench_mcts_playout(name, playouts, playout_policy):
+    from simple_board import SimpleGoBoard
+    from mcts import MCTS
+    results = []
+    for i, (label, board) in enumerate(reference_positions(SimpleGoBoard)[0]):
+        seed(i)
+        search = MCTS()
+        search.toplay = board.current_player
+        search.exploration = 0.4
+        search.playout_policy = playout_policy
+        def run():
+            for _ in range(playouts):
+                search._playout(board.gomoku_copy(), board.current_player)
+            return playouts
+        results.append(measure(name, label, 'playouts', run))
+    return results
+
+def bench_solve(name, playouts):
+    """
+    Nodes per second of a solve with empty transposition and move
+    ordering tables.
+    Every searched position is looked up in the table once, so its
+    lookup count is the node count.
+    """
+    from simple_board import SimpleGoBoard
+    import alphabeta
+    results = []
+    for i, (label, board) in enumerate(reference_positions(SimpleGoBoard)[1]):
+        seed(i)
+        def run():
+            alphabeta.tt.clear()
+            alphabeta.ordering.clear()
+            alphabeta.solve(board)
+            return alphabeta.tt.hits + alphabeta.tt.misses
+        results.append(measure(name, label, 'nodes', run))
+    return results
+
+def bench_dfpn(name, playouts):
+    """
+    Solved positions per second of df-pn with empty tables,
+    on the same positions as bench_solve
+    """
+    from simple_board import SimpleGoBoard
+    import dfpn
+    results = []
+    for i, (label, board) in enumerate(reference_positions(SimpleGoBoard)[1]):
+        seed(i)
+        def run():
+            for table in dfpn.tables.values():
+                table.clear()
+            dfpn.solve(board)
+            return 1
+        results.append(measure(name, label, 'positions', run))
+    return results
+
+"""
+name: (player directory, benchmark function, extra arguments)
+"""
+BENCHMARKS = {
+    'assignment3.simulate': ('../assignment3', bench_simulate, ()),
+    'assignment3.simulate_batch': ('../assignment3', bench_simulate_batch, ()),
+    'my_player.mysimulate': ('my_player', bench_mysimulate, ()),
+    'flat_mc_player.do_playout.random': ('flat_mc_player', bench_do_playout, ('random',)),
+    'flat_mc_player.do_playout.rule_based': ('flat_mc_player', bench_do_playout, ('rule_based',)),
+    'gomoku41.do_playout': ('gomoku41', bench_do_playout, ('rule_based',)),
+    'mcts.playout.random': ('mcts', bench_mcts_playout, ('random',)),
+    'mcts.playout.rule_based': ('mcts', bench_mcts_playout, ('rule_based',)),
+    'gomoku41.solve': ('gomoku41', bench_solve, ()),
+    'mcts.solve': ('mcts', bench_solve, ()),
+    'flat_mc_player.solve': ('flat_mc_player', bench_solve, ()),
+    'gomoku41.dfpn': ('gomoku41', bench_dfpn, ()),
+}
+
+def run_benchmark(name, playouts):
+    """
+    Run one benchmark in this process, which must not have imported
+    the modules of another player directory
+    """
+    directory, function, args = BENCHMARKS[name]
+    directory = os.path.normpath(os.path.join(HERE, directory))
+    sys.path.insert(0, directory)
+    os.chdir(directory)
+    return function(name, playouts, *args)
+
+def summarize(results):
+    total = {}
+    for r in results:
+        count, seconds = total.get(r['benchmark'], (0, 0.0))
+        total[r['benchmark']] = (count + r['count'], seconds + r['seconds'])
+    return {name: {'count': count, 'seconds': seconds,
+                   'rate': count / seconds if seconds > 0 else None}
+            for name, (count, seconds) in total.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Playout and search throughput of the players')
+    parser.add_argument('--playouts', type = int, default = 200,
+                        help = 'playouts per position and benchmark')
+    parser.add_argument('--only', nargs = '+', choices = sorted(BENCHMARKS),
+                        help = 'run only these benchmarks')
+    parser.add_argument('--output', help = 'write the JSON report to this file')
+    parser.add_argument('--child', help = argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        json.dump(run_benchmark(args.child, args.playouts), sys.stdout)
+        return
+
+    results = []
+    errors = {}
+    for name in args.only or list(BENCHMARKS):
+        sys.stderr.write('{}\n'.format(name))
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__),
+                               '--child', name, '--playouts', str(args.playouts)],
+                              stdout = subprocess.PIPE, stderr = subprocess.PIPE,
+                              universal_newlines = True)
+        if proc.returncode != 0:
+            errors[name] = proc.stderr.strip().splitlines()[-1:]
+            continue
+        results.extend(json.loads(proc.stdout))
+    report = {'python': platform.python_version(),
+              'machine': platform.machine(),
+              'seed': SEED,
+              'playouts': args.playouts,
+              'summary': summarize(results),
+              'results': results,
+              'errors': errors}
+    text = json.dumps(report, indent = 2, sort_keys = True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+if __name__ == '__main__':
+    main()
@@ -4,22 +4,23 @@
 
 from gtp_connection import GtpConnection
 from board_util import GoBoardUtil, EMPTY
-from simple_board import SimpleGoBoard
+from simple_board import GomokuBoard
+from bitboard import create_board, BOARD_BACKENDS
+from search_control import SearchControl
 
+import argparse
 import random
 import numpy as np
 
 def undo(board,move):
-    board.board[move]=EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
+    board.undoMove()
 
 def play_move(board, move, color):
     board.play_move_gomoku(move, color)
 
 def game_result(board):
     game_end, winner = board.check_game_end_gomoku()
-    moves = board.get_empty_points()
-    board_full = (len(moves) == 0)
+    board_full = (len(board.empty_points) == 0)
     if game_end:
         #return 1 if winner == board.current_player else -1
         return winner
@@ -45,11 +46,15 @@ class GomokuSimulationPlayer(object):
         self.name="Gomoku3"
         self.version = 3.0
         self.best_move=None
+        self.timelimit=60
     
     def set_playout_policy(self, playout_policy='random'):
         assert(playout_policy in ['random', 'rule_based'])
         self.playout_policy=playout_policy
 
+    def set_timelimit(self, timelimit):
+        self.timelimit=timelimit
+
     def _random_moves(self, board, color_to_play):
         return GoBoardUtil.generate_legal_moves_gomoku(board)
     
@@ -58,7 +63,7 @@ class GomokuSimulationPlayer(object):
             return "Random", self._random_moves(board, color_to_play)
         else:
             assert(self.playout_policy=='rule_based')
-            assert(isinstance(board, SimpleGoBoard))
+            assert(isinstance(board, GomokuBoard))
             ret=board.get_pattern_moves()
             if ret is None:
                 return "Random", self._random_moves(board, color_to_play)
@@ -69,8 +74,11 @@ class GomokuSimulationPlayer(object):
         res=game_result(board)
         simulation_moves=[]
         while(res is None):
-            _ , candidate_moves = self.policy_moves(board, board.current_player)
-            playout_move=random.choice(candidate_moves)
+            if self.playout_policy == 'random':
+                playout_move=board.random_empty_point()
+            else:
+                _ , candidate_moves = self.policy_moves(board, board.current_player)
+                playout_move=random.choice(candidate_moves)
             play_move(board, playout_move, board.current_player)
             simulation_moves.append(playout_move)
             res=game_result(board)
@@ -90,38 +98,44 @@ class GomokuSimulationPlayer(object):
         """
         moves=GoBoardUtil.generate_legal_moves_gomoku(board)
         toplay=board.current_player
-        best_result, best_move=-1.1, None
-        best_move=moves[0]
+        best_result=-1.1
+        control = SearchControl(self.timelimit)
+        control.update_best(moves[0])
         wins = np.zeros(len(moves))
         visits = np.zeros(len(moves))
-        while True:
-            for i, move in enumerate(moves):
-                play_move(board, move, toplay)
-                res=game_result(board)
-                if res == toplay:
-                    undo(board, move)
-                    #This move is a immediate win
-                    self.best_move=move
-                    return move
-                ret=self._do_playout(board, toplay)
-                wins[i] += ret
-                visits[i] += 1
-                win_rate = wins[i] / visits[i]
-                if win_rate > best_result:
-                    best_result=win_rate
-                    best_move=move
-                    self.best_move=best_move
+        i = 0
+        while control.time_left():
+            move = moves[i]
+            play_move(board, move, toplay)
+            res=game_result(board)
+            if res == toplay:
                 undo(board, move)
-        assert(best_move is not None)
-        return best_move
+                #This move is a immediate win
+                control.update_best(move)
+                break
+            ret=self._do_playout(board, toplay)
+            wins[i] += ret
+            visits[i] += 1
+            win_rate = wins[i] / visits[i]
+            if win_rate > best_result:
+                best_result=win_rate
+                control.update_best(move)
+            undo(board, move)
+            i = (i + 1) % len(moves)
+        self.best_move=control.best_move
+        return control.best_move
 
-def run():
+def run(board_backend='array'):
     """
     start the gtp connection and wait for commands.
+    board_backend is 'array' for SimpleGoBoard or 'bitboard' for BitboardGoBoard
     """
-    board = SimpleGoBoard(7)
+    board = create_board(7, board_backend)
     con = GtpConnection(GomokuSimulationPlayer(), board)
     con.start_connection()
 
 if __name__=='__main__':
-    run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board', choices = sorted(BOARD_BACKENDS), default = 'array',
+                        help = 'board representation')
+    run(parser.parse_args().board)
@@ -0,0 +1,57 @@
+"""
+move_ordering.py
+
+Move ordering for the alphabeta solver. The earlier a move that refutes
+a position is searched, the sooner alphabeta cuts off the other moves.
+Moves are ordered by
+1. their threat category in RULE_PATTERNS: win, block win, open four,
+   block open four
+2. killer moves: moves that caused a cutoff in another position with
+   the same move number
+3. the history heuristic: how much search the cutoffs of the move saved
+   so far, over all positions
+The killer and history tables are kept between solve calls.
+"""
+
+class MoveOrdering(object):
+
+    def __init__(self, num_killers=2):
+        """
+        Keeps the last num_killers cutoff moves of each move number
+        """
+        self.num_killers = num_killers
+        self.clear()
+
+    def clear(self):
+        self.killers = {}
+        self.history = {}
+
+    def order(self, board, moves, categories=None):
+        """
+        Return moves for the player to move on board, best first.
+        categories is board.rule_pattern_moves() if the caller has it.
+        """
+        if categories is None:
+            categories = board.rule_pattern_moves()
+        rank = {}
+        for i, category in enumerate(categories):
+            for m in category:
+                rank.setdefault(m, i)
+        killers = self.killers.get(len(board.moves), ())
+        color = board.current_player
+        last = len(categories)
+        return sorted(moves, key = lambda m: (rank.get(m, last), m not in killers,
+                                              -self.history.get((color, m), 0)))
+
+    def cutoff(self, board, move):
+        """
+        Record that move of the player to move on board caused a cutoff.
+        A cutoff with more empty points left saves more search, so it
+        weighs more in the history.
+        """
+        killers = self.killers.setdefault(len(board.moves), [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.num_killers:]
+        key = (board.current_player, move)
+        self.history[key] = self.history.get(key, 0) + len(board.empty_points) ** 2
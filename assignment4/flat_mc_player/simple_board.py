@@ -9,13 +9,161 @@ Implements a basic Go board with functions to:
 The board uses a 1-dimensional representation with padding
 """
 
+import random
 import numpy as np
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
                        PASS, is_black_white, coord_to_point, where1d, \
                        MAXSIZE, NULLPOINT
 import alphabeta
 
-class SimpleGoBoard(object):
+"""
+Zobrist keys, one random 64-bit number per (point, color) plus one per
+side to move. They only depend on the board size, so all boards of a
+size share the same table and their hashes can be compared.
+"""
+_zobrist_tables = {}
+
+def zobrist_table(maxpoint):
+    if maxpoint not in _zobrist_tables:
+        rng = random.Random(maxpoint)
+        stones = [[0, rng.getrandbits(64), rng.getrandbits(64)]
+                  for _ in range(maxpoint)]
+        to_play = [0, rng.getrandbits(64), rng.getrandbits(64)]
+        _zobrist_tables[maxpoint] = (stones, to_play)
+    return _zobrist_tables[maxpoint]
+
+"""
+Patterns of get_pattern_moves and list_solve_point, as
+{pattern string: distances of the moves from the end of the string}.
+x is the color to play, o the opponent, . empty and B the border.
+Earlier lists have preference.
+"""
+RULE_PATTERNS = [{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}}, #win
+                 {'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}}, #block win
+                 {'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}}, #make-four
+                 {'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{0,2,5},'.o.oo.':{0,3,5}, 'B.ooo..':{0}, '..ooo.B':{6},
+                  'x.ooo..':{0}, '..ooo.x':{6} #block-open-four
+                 }]
+
+SOLVE_PATTERNS = [{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}},
+                  {'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}},
+                  {'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}},
+                  {'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{2},'.o.oo.':{3}}]
+
+"""
+The longest pattern has 7 points, so whether a point is a pattern move
+only depends on the points up to 6 away in each direction
+"""
+LINE_RANGE = 6
+LINE_POWERS = 4 ** np.arange(2 * LINE_RANGE + 1, dtype = np.int64)
+
+"""
+Tables per board size, see line_indices
+"""
+_line_index_tables = {}
+
+def line_indices(board):
+    """
+    Return a (maxpoint, 4, 2 * LINE_RANGE + 1) array whose entry
+    [point, direction, k] is point + (k - LINE_RANGE) * step, for the
+    four pattern directions. Points outside the board array are replaced
+    by the border point 0.
+    """
+    if board.size not in _line_index_tables:
+        offsets = np.arange(-LINE_RANGE, LINE_RANGE + 1)
+        steps = np.array([1, board.NS, board.NS + 1, board.NS - 1])
+        points = np.arange(board.maxpoint)
+        lines = points[:, None, None] + steps[None, :, None] * offsets[None, None, :]
+        lines[(lines < 0) | (lines >= board.maxpoint)] = 0
+        _line_index_tables[board.size] = lines
+    return _line_index_tables[board.size]
+
+def line_pattern_lists(line, color, pattern_list):
+    """
+    Return a bit mask of the pattern lists in which the middle point of
+    line is a move for color. line holds the 2 * LINE_RANGE + 1 colors
+    of a line. Every string is only looked up in the first list that
+    has it.
+    """
+    chars = ''.join('.' if c == EMPTY else 'B' if c == BORDER else 'x' if c == color else 'o'
+                    for c in line)
+    mask = 0
+    for length in range(5, LINE_RANGE + 2):
+        for j in range(length):
+            have = chars[LINE_RANGE - j : LINE_RANGE - j + length]
+            for i, patterns in enumerate(pattern_list):
+                if have in patterns:
+                    if length - 1 - j in patterns[have]:
+                        mask |= 1 << i
+                    break
+    return mask
+
+"""
+Pattern list masks (for black, for white) of a point by the base 4 code
+of its line, one table per pattern list, shared by all boards and
+filled on the first use of a code. A table is emptied when it reaches
+PATTERN_TABLE_LIMIT codes, to bound its memory in long searches.
+"""
+PATTERN_TABLE_LIMIT = 1 << 18
+_RULE_TABLE = {}
+_SOLVE_TABLE = {}
+
+"""
+Data that only depends on the board size: the empty board array, its
+empty points, and the neighbor and diagonal lists of every point.
+All boards of a size share one BoardGeometry, so reset() and copy() do
+not rebuild them. Its fields must not be modified.
+"""
+class BoardGeometry(object):
+
+    def __init__(self, size):
+        self.size = size
+        self.NS = size + 1
+        self.maxpoint = size * size + 3 * (size + 1)
+        board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        self.row_starts = [row * self.NS + 1 for row in range(size + 1)]
+        for row in range(1, size + 1):
+            start = self.row_starts[row]
+            board[start : start + size] = EMPTY
+        self.empty_board = board
+        self.empty_points = [int(p) for p in where1d(board == EMPTY)]
+        self.empty_index = [-1] * self.maxpoint
+        for i, p in enumerate(self.empty_points):
+            self.empty_index[p] = i
+        self.neighbors = []
+        self.diag_neighbors = []
+        for point in range(self.maxpoint):
+            if board[point] == BORDER:
+                self.neighbors.append([])
+            else:
+                self.neighbors.append([nb for nb in
+                                       [point - 1, point + 1, point - self.NS, point + self.NS]
+                                       if board[nb] != BORDER])
+            self.diag_neighbors.append([point - self.NS - 1,
+                                        point - self.NS + 1,
+                                        point + self.NS - 1,
+                                        point + self.NS + 1])
+
+_geometries = {}
+
+def board_geometry(size):
+    if size not in _geometries:
+        _geometries[size] = BoardGeometry(size)
+    return _geometries[size]
+
+class GomokuBoard(object):
+    """
+    Board with only the state needed for Gomoku: the stones, the empty
+    points, the move stack, the side to move, the winner and the hash.
+    The fixed set of attributes in __slots__ keeps boards small and
+    attribute access fast, which matters for the many boards copied
+    by the searches.
+    """
+
+    __slots__ = ('size', 'NS', 'current_player', 'geometry', 'maxpoint',
+                 'board', 'empty_points', '_empty_index', 'moves',
+                 '_winner', '_win_move_nr', '_zobrist', '_zobrist_to_play',
+                 'hash')
 
     def get_color(self, point):
         return self.board[point]
@@ -23,50 +171,39 @@ class SimpleGoBoard(object):
     def pt(self, row, col):
         return coord_to_point(row, col, self.size)
 
-    def is_legal(self, point, color):
+    def get_empty_points(self):
         """
-        Check whether it is legal for color to play on point
+        Return:
+            The empty points on the board
         """
-        assert is_black_white(color)
-        # Special cases
-        if point == PASS:
-            return True
-        elif self.board[point] != EMPTY:
-            return False
-        if point == self.ko_recapture:
-            return False
-            
-        # General case: detect captures, suicide
-        opp_color = GoBoardUtil.opponent(color)
-        self.board[point] = color
-        legal = True
-        has_capture = self._detect_captures(point, opp_color)
-        if not has_capture and not self._stone_has_liberty(point):
-            block = self._block_of(point)
-            if not self._has_liberty(block): # suicide
-                legal = False
-        self.board[point] = EMPTY
-        return legal
+        return np.array(self.empty_points, dtype = np.int32)
 
-    def _detect_captures(self, point, opp_color):
+    def random_empty_point(self):
         """
-        Did move on point capture something?
+        Return a uniformly random empty point, or PASS if the board is full
         """
-        for nb in self.neighbors_of_color(point, opp_color):
-            if self._detect_capture(nb):
-                return True
-        return False
+        if not self.empty_points:
+            return PASS
+        return self.empty_points[random.randrange(len(self.empty_points))]
 
-    def get_empty_points(self):
+    def _remove_empty_point(self, point):
         """
-        Return:
-            The empty points on the board
+        Swap-remove point from empty_points, keeping _empty_index in sync
         """
-        return where1d(self.board == EMPTY)
+        i = self._empty_index[point]
+        last = self.empty_points.pop()
+        if last != point:
+            self.empty_points[i] = last
+            self._empty_index[last] = i
+        self._empty_index[point] = -1
+
+    def _add_empty_point(self, point):
+        self._empty_index[point] = len(self.empty_points)
+        self.empty_points.append(point)
 
     def __init__(self, size):
         """
-        Creates a Go board of given size
+        Creates a board of given size
         """
         assert 2 <= size <= MAXSIZE
         self.reset(size)
@@ -79,60 +216,329 @@ class SimpleGoBoard(object):
         """
         self.size = size
         self.NS = size + 1
-        self.WE = 1
-        self.ko_recapture = None
         self.current_player = BLACK
-        self.maxpoint = size * size + 3 * (size + 1)
-        self.board = np.full(self.maxpoint, BORDER, dtype = np.int32)
-        self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
-        self._initialize_empty_points(self.board)
-        self._initialize_neighbors()
+        self.geometry = board_geometry(size)
+        self.maxpoint = self.geometry.maxpoint
+        self.board = np.copy(self.geometry.empty_board)
+        # empty_points is kept up to date by play_move_gomoku and undoMove,
+        # _empty_index maps a point to its position in empty_points
+        self.empty_points = list(self.geometry.empty_points)
+        self._empty_index = list(self.geometry.empty_index)
+        self.moves = []
+        self._winner = None
+        self._win_move_nr = None
+        self._zobrist, self._zobrist_to_play = zobrist_table(self.maxpoint)
+        self.hash = 0
+
+    def hash_key(self):
+        """
+        Zobrist key of the position including the side to move
+        """
+        return self.hash ^ self._zobrist_to_play[self.current_player]
 
     def copy(self):
-        b = SimpleGoBoard(self.size)
-        assert b.NS == self.NS
-        assert b.WE == self.WE
-        b.ko_recapture = self.ko_recapture
+        """
+        Copy of the position. Plain values and the shared geometry are
+        taken over as they are, only the mutable state is cloned.
+        """
+        b = type(self).__new__(type(self))
+        self._copy_into(b)
+        return b
+
+    def gomoku_copy(self):
+        """
+        Copy of the position as a plain GomokuBoard, without the state
+        that subclasses add. Used by the searches, which only play
+        Gomoku moves on their copies.
+        """
+        b = GomokuBoard.__new__(GomokuBoard)
+        GomokuBoard._copy_into(self, b)
+        return b
+
+    def _copy_into(self, b):
+        b.size = self.size
+        b.NS = self.NS
         b.current_player = self.current_player
-        assert b.maxpoint == self.maxpoint
+        b.geometry = self.geometry
+        b.maxpoint = self.maxpoint
         b.board = np.copy(self.board)
-        return b
+        b.empty_points = list(self.empty_points)
+        b._empty_index = list(self._empty_index)
+        b.moves = list(self.moves)
+        b._winner = self._winner
+        b._win_move_nr = self._win_move_nr
+        b._zobrist = self._zobrist
+        b._zobrist_to_play = self._zobrist_to_play
+        b.hash = self.hash
 
     def row_start(self, row):
         assert row >= 1
         assert row <= self.size
-        return row * self.NS + 1
+        return self.geometry.row_starts[row]
         
-    def _initialize_empty_points(self, board):
+    def _point_to_coord(self, point):
         """
-        Fills points on the board with EMPTY
-        Argument
+        Transform point index to row, col.
+        
+        Arguments
         ---------
-        board: numpy array, filled with BORDER
-        """
-        for row in range(1, self.size + 1):
-            start = self.row_start(row)
-            board[start : start + self.size] = EMPTY
-
-    def _on_board_neighbors(self, point):
-        nbs = []
-        for nb in self._neighbors(point):
-            if self.board[nb] != BORDER:
-                nbs.append(nb)
-        return nbs
-            
-    def _initialize_neighbors(self):
+        point
+        
+        Returns
+        -------
+        x , y : int
+        coordination of the board  1<= x <=size, 1<= y <=size .
+        """
+        if point is None:
+            return 'pass'
+        row, col = divmod(point, self.NS)
+        return row, col
+
+    def is_legal_gomoku(self, point, color):
         """
-        precompute neighbor array.
-        For each point on the board, store its list of on-the-board neighbors
+            Check whether it is legal for color to play on point, for the game of gomoku
+            """
+        return self.board[point] == EMPTY
+    
+    def play_move_gomoku(self, point, color):
         """
-        self.neighbors = []
-        for point in range(self.maxpoint):
-            if self.board[point] == BORDER:
-                self.neighbors.append([])
+            Play a move of color on point, for the game of gomoku
+            Returns boolean: whether move was legal
+            """
+        assert is_black_white(color)
+        assert point != PASS
+        if self.board[point] != EMPTY:
+            return False
+        self.board[point] = color
+        self._remove_empty_point(point)
+        self.hash ^= self._zobrist[point][color]
+        self.moves.append(point)
+        if self._winner is None and self.point_check_game_end_gomoku(point):
+            self._winner = color
+            self._win_move_nr = len(self.moves)
+        self.current_player = GoBoardUtil.opponent(color)
+        return True
+
+    def undoMove(self):
+        """
+        Take back the last move played with play_move_gomoku
+        """
+        location = self.moves.pop()
+        self.hash ^= self._zobrist[location][self.board[location]]
+        if self._win_move_nr is not None and len(self.moves) < self._win_move_nr:
+            self._winner = None
+            self._win_move_nr = None
+        self.board[location] = EMPTY
+        self._add_empty_point(location)
+        self.current_player = GoBoardUtil.opponent(self.current_player)
+
+    def _point_direction_check_connect_gomoko(self, point, shift):
+        """
+        Check if the point has connect5 condition in a direction
+        for the game of Gomoko.
+        """
+        color = self.board[point]
+        count = 1
+        d = shift
+        p = point
+        while True:
+            p = p + d
+            if self.board[p] == color:
+                count = count + 1
+                if count >= 5:
+                    break
             else:
-                self.neighbors.append(self._on_board_neighbors(point))
+                break
+        d = -d
+        p = point
+        while True:
+            p = p + d
+            if self.board[p] == color:
+                count = count + 1
+                if count >= 5:
+                    break
+            else:
+                break
+        # the played stone may join two shorter lines into an overline
+        return count >= 5
+    
+    def point_check_game_end_gomoku(self, point):
+        """
+            Check if the point causes the game end for the game of Gomoko.
+            """
+        # check horizontal
+        if self._point_direction_check_connect_gomoko(point, 1):
+            return True
+        
+        # check vertical
+        if self._point_direction_check_connect_gomoko(point, self.NS):
+            return True
+        
+        # check y=x
+        if self._point_direction_check_connect_gomoko(point, self.NS + 1):
+            return True
+        
+        # check y=-x
+        if self._point_direction_check_connect_gomoko(point, self.NS - 1):
+            return True
         
+        return False
+    
+    @property
+    def winner(self):
+        """
+        The color that has five in a row, or None while the game is open.
+        Maintained incrementally by play_move_gomoku and undoMove.
+        """
+        return self._winner
+
+    def check_game_end_gomoku(self):
+        """
+            Check if the game ends for the game of Gomoku.
+            Only the last played stone can complete a five, so the result
+            is tracked in play_move_gomoku instead of rescanning all stones.
+            """
+        return self._winner is not None, self._winner
+
+    def solve(self, control=None):
+        result, move, drawMove = alphabeta.solve(self, control)
+        if move=="First":
+            if result==0:
+                return 'draw',drawMove
+            else:
+                winner='w' if self.current_player!=WHITE else 'b'
+                return winner,'NoMove'
+        elif move=="NoMove":
+            if result:
+                return 'draw', drawMove
+            else:
+                winner='w' if self.current_player!=WHITE else 'b'
+                return winner, move
+        else:
+            winner='w' if self.current_player==WHITE else 'b'
+            return winner, move
+
+    def match_patterns(self, pattern_list, table):
+        """
+        Find the moves of pattern_list for the player to move.
+        The lines through all empty points are gathered at once and their
+        base 4 codes looked up in table, the code table of pattern_list.
+        Returns one set of moves per pattern list.
+        """
+        moveSet = [set() for _ in pattern_list]
+        if not self.empty_points:
+            return moveSet
+        side = 0 if self.current_player == BLACK else 1
+        lines = self.board[line_indices(self)[self.empty_points]]
+        codes = lines @ LINE_POWERS
+        for point, point_lines, point_codes in zip(self.empty_points, lines, codes.tolist()):
+            mask = 0
+            for line, code in zip(point_lines, point_codes):
+                masks = table.get(code)
+                if masks is None:
+                    if len(table) >= PATTERN_TABLE_LIMIT:
+                        table.clear()
+                    masks = (line_pattern_lists(line, BLACK, pattern_list),
+                             line_pattern_lists(line, WHITE, pattern_list))
+                    table[code] = masks
+                mask |= masks[side]
+            for i in range(len(pattern_list)):
+                if mask >> i & 1:
+                    moveSet[i].add(point)
+        return moveSet
+
+    def get_pattern_moves(self):
+        """
+        1. direct winning point xxxx. x.xxx xx.xx
+        2. urgent blocking point xoooo.
+        3. wining in 2 step point
+        """
+        moveSet=self.match_patterns(RULE_PATTERNS, _RULE_TABLE)
+
+        i=0
+        while i<4 and not bool(moveSet[i]): i+=1
+        if i==4:
+            return None
+        else:
+            return i, list(moveSet[i])
+
+    def rule_pattern_moves(self):
+        """
+        Return the moves of every list of RULE_PATTERNS for the player
+        to move, as one set per list
+        """
+        return self.match_patterns(RULE_PATTERNS, _RULE_TABLE)
+            
+    def list_solve_point(self):
+        """
+        1. direct winning point xxxx. x.xxx xx.xx
+        2. urgent blocking point xoooo.
+        3. wining in 2 step point
+        """
+        moveSet=self.match_patterns(SOLVE_PATTERNS, _SOLVE_TABLE)
+        
+        i=0
+        while i<4 and not bool(moveSet[i]):
+            i+=1
+        if i==4:
+            return None
+        else:
+            return list(moveSet[i])
+
+
+class SimpleGoBoard(GomokuBoard):
+    """
+    GomokuBoard with the Go rules: captures, ko and eyes.
+    Used as the GTP board, which also answers Go commands.
+    """
+
+    def reset(self, size):
+        super().reset(size)
+        self.WE = 1
+        self.ko_recapture = None
+        self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
+        self.neighbors = self.geometry.neighbors
+
+    def copy(self):
+        b = super().copy()
+        b.__dict__.update(self.__dict__)
+        b.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
+        return b
+
+    def is_legal(self, point, color):
+        """
+        Check whether it is legal for color to play on point
+        """
+        assert is_black_white(color)
+        # Special cases
+        if point == PASS:
+            return True
+        elif self.board[point] != EMPTY:
+            return False
+        if point == self.ko_recapture:
+            return False
+            
+        # General case: detect captures, suicide
+        opp_color = GoBoardUtil.opponent(color)
+        self.board[point] = color
+        legal = True
+        has_capture = self._detect_captures(point, opp_color)
+        if not has_capture and not self._stone_has_liberty(point):
+            block = self._block_of(point)
+            if not self._has_liberty(block): # suicide
+                legal = False
+        self.board[point] = EMPTY
+        return legal
+
+    def _detect_captures(self, point, opp_color):
+        """
+        Did move on point capture something?
+        """
+        for nb in self.neighbors_of_color(point, opp_color):
+            if self._detect_capture(nb):
+                return True
+        return False
+
     def is_eye(self, point, color):
         """
         Check if point is a simple eye for color
@@ -149,7 +555,7 @@ class SimpleGoBoard(object):
             elif self.board[d] == opp_color:
                 false_count += 1
         return false_count <= 1 - at_edge # 0 at edge, 1 in center
-    
+
     def _is_surrounded(self, point, color):
         """
         check whether empty point is surrounded by stones of color.
@@ -217,7 +623,7 @@ class SimpleGoBoard(object):
         if self._stone_has_liberty(nb_point):
             return True # quick exit, no need to look at whole block
         return False
-        
+
     def _detect_capture(self, nb_point):
         """
         Check whether opponent block on nb_point is captured.
@@ -227,7 +633,7 @@ class SimpleGoBoard(object):
             return False
         opp_block = self._block_of(nb_point)
         return not self._has_liberty(opp_block)
-    
+
     def _detect_and_process_capture(self, nb_point):
         """
         Check whether opponent block on nb_point is captured.
@@ -295,231 +701,18 @@ class SimpleGoBoard(object):
             if self.get_color(nb) == color:
                 nbc.append(nb)
         return nbc
-        
+
     def find_neighbor_of_color(self, point, color):
         """ Return one neighbor of point of given color, or None """
         for nb in self.neighbors[point]:
             if self.get_color(nb) == color:
                 return nb
         return None
-        
+
     def _neighbors(self, point):
         """ List of all four neighbors of the point """
         return [point - 1, point + 1, point - self.NS, point + self.NS]
 
     def _diag_neighbors(self, point):
         """ List of all four diagonal neighbors of point """
-        return [point - self.NS - 1, 
-                point - self.NS + 1, 
-                point + self.NS - 1, 
-                point + self.NS + 1]
-    
-    def _point_to_coord(self, point):
-        """
-        Transform point index to row, col.
-        
-        Arguments
-        ---------
-        point
-        
-        Returns
-        -------
-        x , y : int
-        coordination of the board  1<= x <=size, 1<= y <=size .
-        """
-        if point is None:
-            return 'pass'
-        row, col = divmod(point, self.NS)
-        return row, col
-
-    def is_legal_gomoku(self, point, color):
-        """
-            Check whether it is legal for color to play on point, for the game of gomoku
-            """
-        return self.board[point] == EMPTY
-    
-    def play_move_gomoku(self, point, color):
-        """
-            Play a move of color on point, for the game of gomoku
-            Returns boolean: whether move was legal
-            """
-        assert is_black_white(color)
-        assert point != PASS
-        if self.board[point] != EMPTY:
-            return False
-        self.board[point] = color
-        self.current_player = GoBoardUtil.opponent(color)
-        return True
-        
-    def _point_direction_check_connect_gomoko(self, point, shift):
-        """
-        Check if the point has connect5 condition in a direction
-        for the game of Gomoko.
-        """
-        color = self.board[point]
-        count = 1
-        d = shift
-        p = point
-        while True:
-            p = p + d
-            if self.board[p] == color:
-                count = count + 1
-                if count == 5:
-                    break
-            else:
-                break
-        d = -d
-        p = point
-        while True:
-            p = p + d
-            if self.board[p] == color:
-                count = count + 1
-                if count == 5:
-                    break
-            else:
-                break
-        assert count <= 5
-        return count == 5
-    
-    def point_check_game_end_gomoku(self, point):
-        """
-            Check if the point causes the game end for the game of Gomoko.
-            """
-        # check horizontal
-        if self._point_direction_check_connect_gomoko(point, 1):
-            return True
-        
-        # check vertical
-        if self._point_direction_check_connect_gomoko(point, self.NS):
-            return True
-        
-        # check y=x
-        if self._point_direction_check_connect_gomoko(point, self.NS + 1):
-            return True
-        
-        # check y=-x
-        if self._point_direction_check_connect_gomoko(point, self.NS - 1):
-            return True
-        
-        return False
-    
-    def check_game_end_gomoku(self):
-        """
-            Check if the game ends for the game of Gomoku.
-            """
-        white_points = where1d(self.board == WHITE)
-        black_points = where1d(self.board == BLACK)
-        
-        for point in white_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, WHITE
-    
-        for point in black_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, BLACK
-
-        return False, None
-
-    def solve(self):
-        result, move, drawMove = alphabeta.solve(self)
-        if move=="First":
-            if result==0:
-                return 'draw',drawMove
-            else:
-                winner='w' if self.current_player!=WHITE else 'b'
-                return winner,'NoMove'
-        elif move=="NoMove":
-            if result:
-                return 'draw', drawMove
-            else:
-                winner='w' if self.current_player!=WHITE else 'b'
-                return winner, move
-        else:
-            winner='w' if self.current_player==WHITE else 'b'
-            return winner, move
-
-    def check_pattern(self,point,have,direction_x,direction_y,moveSet,patternList,color,flag):
-        for i in range(0,4):
-            if have in patternList[i]:
-                for dis in patternList[i][have]:
-                    moveSet[i].add(point-direction_x*(dis+1)-direction_y*self.NS*(dis+1))
-                #flag[0]=True
-                break
-        if (not (0<= point<len(self.board))) or len(have)==9:
-            return
-#if self.get_color(point)==BORDER or len(have)==7:
-#            return
-        piece=self.get_color(point)
-        if piece==EMPTY:
-            piece='.'
-        elif piece==color:
-            piece='x'
-        elif piece == BORDER:
-            piece='B'
-        else:
-            piece='o'
-        have+=piece
-        #print(GoBoardUtil.format_point(self._point_to_coord(point)),have,self.board[point])
-        self.check_pattern(point+direction_x+direction_y*self.NS,have,direction_x,direction_y,moveSet,patternList,color,flag)
-
-    def get_pattern_moves(self):
-        """
-        1. direct winning point xxxx. x.xxx xx.xx
-        2. urgent blocking point xoooo.
-        3. wining in 2 step point
-        """
-        moveSet=[set(),set(),set(),set()]
-        color=self.current_player
-
-        patternList=[{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}}, #win
-                     {'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}}, #block win
-                     {'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}}, #make-four
-                     {'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{0,2,5},'.o.oo.':{0,3,5}, 'B.ooo..':{0}, '..ooo.B':{6},
-                     'x.ooo..':{0}, '..ooo.x':{6} #block-open-four
-                     }]
-
-        direction_x=[1,0,1,-1]
-        direction_y=[0,1,1,1]
-        flag=[False]
-
-        for point in range(0, len(self.board)):
-            if flag[0]:
-                break
-            for direction in range(0,4):
-                    self.check_pattern(point,'',direction_x[direction],direction_y[direction],moveSet,patternList,color,flag)
-        
-        i=0
-        while i<4 and not bool(moveSet[i]): i+=1
-        if i==4:
-            return None
-        else:
-            return i, list(moveSet[i])
-            
-    def list_solve_point(self):
-        """
-        1. direct winning point xxxx. x.xxx xx.xx
-        2. urgent blocking point xoooo.
-        3. wining in 2 step point
-        """
-        moveSet=[set(),set(),set(),set()]
-        color=self.current_player
-
-        patternList=[{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}},{'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}},{'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}},{'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{2},'.o.oo.':{3}}]
-
-        direction_x=[1,0,1,-1]
-        direction_y=[0,1,1,1]
-        flag=[False]
-
-        for point in where1d(self.board!=BORDER):
-            if flag[0]:
-                break
-            for direction in range(0,4):
-                    self.check_pattern(point,'',direction_x[direction],direction_y[direction],moveSet,patternList,color,flag)
-        
-        i=0
-        while i<4 and not bool(moveSet[i]):
-            i+=1
-        if i==4:
-            return None
-        else:
-            return list(moveSet[i])
+        return self.geometry.diag_neighbors[point]
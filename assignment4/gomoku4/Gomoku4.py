@@ -5,22 +5,22 @@
 from gtp_connection import GtpConnection
 from board_util import GoBoardUtil, EMPTY
 from simple_board import SimpleGoBoard
+from bitboard import create_board, BOARD_BACKENDS
 from mcts import MCTS
 
+import argparse
 import random
 import numpy as np
 
 def undo(board,move):
-    board.board[move]=EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
+    board.undoMove()
 
 def play_move(board, move, color):
     board.play_move_gomoku(move, color)
 
 def game_result(board):
     game_end, winner = board.check_game_end_gomoku()
-    moves = board.get_empty_points()
-    board_full = (len(moves) == 0)
+    board_full = (len(board.empty_points) == 0)
     if game_end:
         #return 1 if winner == board.current_player else -1
         return winner
@@ -43,12 +43,25 @@ class Gomoku4(object):
         self.name="Gomoku4"
         self.version = 4.0
         self.best_move=None
+        self.num_workers = 1
+        self.timelimit = 60
 
         self.MCTS = MCTS()
 
     def reset(self):
         self.MCTS = MCTS()
 
+    def set_timelimit(self, timelimit):
+        self.timelimit = timelimit
+
+    def set_num_workers(self, num_workers):
+        """
+        Number of processes for the root parallel search, 1 searches in
+        this process only
+        """
+        assert(num_workers >= 1)
+        self.num_workers = num_workers
+
     def update(self, move):
         self.parent = self.MCTS._root 
         self.MCTS.update_with_move(move)
@@ -57,17 +70,28 @@ class Gomoku4(object):
         """
         The genmove function called by gtp_connection
         """
-        move = self.MCTS.get_move(board, color_to_play, self.n_simualtions_per_move, self.exploration)
+        if self.num_workers > 1:
+            move = self.MCTS.get_move_root_parallel(board, color_to_play,
+                    self.n_simualtions_per_move, self.exploration, self.num_workers,
+                    self.timelimit)
+            self.update(move)
+            return move
+        move = self.MCTS.get_move(board, color_to_play, self.n_simualtions_per_move, self.exploration,
+                self.timelimit)
         self.update(move)
         return move
 
-def run():
+def run(board_backend='array'):
     """
     start the gtp connection and wait for commands.
+    board_backend is 'array' for SimpleGoBoard or 'bitboard' for BitboardGoBoard
     """
-    board = SimpleGoBoard(7)
+    board = create_board(7, board_backend)
     con = GtpConnection(Gomoku4(), board)
     con.start_connection()
 
 if __name__=='__main__':
-    run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board', choices = sorted(BOARD_BACKENDS), default = 'array',
+                        help = 'board representation')
+    run(parser.parse_args().board)
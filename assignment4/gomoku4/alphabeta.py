@@ -1,99 +1,112 @@
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER
+from move_ordering import MoveOrdering
 #from profilehooks import profile
 
+"""
+Transposition table shared by all searches. It is kept between solve
+calls, so the work of an earlier, possibly timed out, solve is reused.
+"""
+tt = TranspositionTable()
+"""
+Killer and history tables, also kept between solve calls
+"""
+ordering = MoveOrdering()
+
+class SolveTimeout(Exception):
+    """
+    Raised by solve when its SearchControl runs out of time
+    """
+    pass
+
 def undo(board,move):
-    board.board[move]=EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
+    board.undoMove()
 
 def game_end(board):
     game_end, winner = board.check_game_end_gomoku()
-    moves = board.get_empty_points()
-    board_full = (len(moves) == 0)
+    board_full = (len(board.empty_points) == 0)
     if game_end:
         return 1 if winner == board.current_player else -1
     if board_full:
         return 0
     return None
 
-def alphabeta(board,alpha,beta):
+def alphabeta(board,alpha,beta,control=None):
     #print(GoBoardUtil.get_twoD_board(board),alpha,beta)
     result=game_end(board)
     if (result!=None):
         return result
+    if control is not None and not control.time_left():
+        raise SolveTimeout("unknown")
+    key=board.hash_key()
+    entry=tt.lookup(key)
+    if entry is not None:
+        value,flag=entry[:2]
+        if flag==EXACT:
+            return value
+        if flag==LOWER and value>=beta:
+            return beta
+        if flag==UPPER and value<=alpha:
+            return alpha
+    alpha_orig=alpha
     solvePoint=board.list_solve_point()
     if solvePoint:
         #print(solvePoint[0])
-        board.play_move_gomoku(solvePoint[0],board.current_player)
-        result=-alphabeta(board,-beta,-alpha)
+        moves=solvePoint[:1]
+    else:
+        moves=ordering.order(board,GoBoardUtil.generate_legal_moves_gomoku(board))
+    for m in moves:
+        board.play_move_gomoku(m,board.current_player)
+        result=-alphabeta(board,-beta,-alpha,control)
         if(result>alpha):
             alpha=result
-        undo(board,solvePoint[0])
+        undo(board,m)
         if(result>=beta):
+            ordering.cutoff(board,m)
+            tt.store(key,beta,LOWER,len(board.empty_points))
             return beta
-    else:
-        for m in GoBoardUtil.generate_legal_moves_gomoku(board):
-            board.play_move_gomoku(m,board.current_player)
-            result=-alphabeta(board,-beta,-alpha)
-            if(result>alpha):
-                alpha=result
-            undo(board,m)
-            if(result>=beta):
-                return beta
+    flag=EXACT if alpha>alpha_orig else UPPER
+    tt.store(key,alpha,flag,len(board.empty_points))
     return alpha
 
 #@profile
 """
-if have winning move, return _,winning_move
-else return have_draw,"NoMove"
+if have winning move, return _,winning_move,_
+else return have_draw,"NoMove",draw_move
+raises SolveTimeout when control runs out of time, with board unchanged
 """
-def solve(board):
+def solve(board,control=None):
     result=game_end(board)
     if (result!=None):
-        return result,"First"
+        return result,"First",None
     alpha,beta=-1,1
     haveDraw=False
+    drawMove=None
+    num_moves=len(board.moves)
     solvePoint=board.list_solve_point()
     if solvePoint:
         #print(solvePoint[0])
-        board.play_move_gomoku(solvePoint[0],board.current_player)
-        result=-alphabeta(board,-beta,-alpha)
-        undo(board,solvePoint[0])
+        moves=solvePoint[:1]
+    else:
+        moves=ordering.order(board,GoBoardUtil.generate_legal_moves_gomoku(board))
+    for m in moves:
+        board.play_move_gomoku(m,board.current_player)
+        try:
+            result=-alphabeta(board,-beta,-alpha,control)
+        except SolveTimeout:
+            # the search stopped halfway down, take back its moves too
+            while len(board.moves)>num_moves:
+                board.undoMove()
+            raise
+        #print(GoBoardUtil.get_twoD_board(board))
+        #print(result)
+        undo(board,m)
         if(result==1):
-            return True,solvePoint[0]
-        elif(result==0):
+            tt.store(board.hash_key(),1,EXACT,len(board.empty_points))
+            return True,m,None
+        elif(result==0 and not haveDraw):
             haveDraw=True
-    else: 
-        for m in GoBoardUtil.generate_legal_moves_gomoku(board):
-            board.play_move_gomoku(m,board.current_player)
-            result=-alphabeta(board,-beta,-alpha)
-            #print(GoBoardUtil.get_twoD_board(board))
-            #print(result)
-            undo(board,m)
-            if(result==1):
-                return True,m
-            elif(result==0):
-                haveDraw=True
-    return haveDraw,"NoMove"
-
-
-    """
-
-    for m in board.legal_moves():
-        history_set.add(str(board.get_twoD_board())+str(board.current_player))
-        board.move(m, board.current_player)
-        result,move=None, None
-        if board.end_of_game():
-            result,move = isSuccess(board, komi), "NoMove"
-        elif str(board.get_twoD_board())+str(board.current_player) in history_set:
-            board.undo_move()
-            continue
-        if result==None and move==None:
-            result, move = negamaxBoolean(board, komi, history_set)
-        success = not result
-        board.undo_move()
-
-        history_set.remove(str(board.get_twoD_board())+str(board.current_player))
-        if success:
-            return True, m
-    return False, "NoMove"
-    """
\ No newline at end of file
+            drawMove=m
+            # only a win can improve on the draw now
+            alpha=0
+    return haveDraw,"NoMove",drawMove
@@ -13,7 +13,8 @@ from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, PASS, \
                        MAXSIZE, coord_to_point
 import numpy as np
 import re
-import signal
+from search_control import SearchControl
+from alphabeta import SolveTimeout
 
 class GtpConnection():
 
@@ -31,7 +32,6 @@ class GtpConnection():
         self._debug_mode = debug_mode
         self.go_engine = go_engine
         self.board = board
-        signal.signal(signal.SIGALRM, self.handler)
         self.commands = {
             "protocol_version": self.protocol_version_cmd,
             "quit": self.quit_cmd,
@@ -57,7 +57,8 @@ class GtpConnection():
             "solve": self.solve_cmd,
             "list_solve_point": self.list_solve_point_cmd, # below is added for Gomoku3
             "policy": self.set_playout_policy, 
-            "policy_moves": self.display_pattern_moves
+            "policy_moves": self.display_pattern_moves,
+            "parallel": self.parallel_cmd
         }
         self.timelimit=59
 
@@ -71,7 +72,8 @@ class GtpConnection():
             "genmove": (1, 'Usage: genmove {w,b}'),
             "play": (2, 'Usage: play {b,w} MOVE'),
             "legal_moves": (1, 'Usage: legal_moves {w,b}'),
-            "policy":(1, 'Usage: set playout policy {random, rule_based}')
+            "policy":(1, 'Usage: set playout policy {random, rule_based}'),
+            "parallel": (1, 'Usage: parallel INT')
         }
     
     def set_playout_policy(self, args):
@@ -79,6 +81,21 @@ class GtpConnection():
         self.go_engine.set_playout_policy(playout_policy)
         self.respond()
 
+    def parallel_cmd(self, args):
+        """
+        Set the number of worker processes of the root parallel search
+        """
+        try:
+            num_workers = int(args[0])
+        except ValueError:
+            self.error('Usage: parallel INT')
+            return
+        if num_workers < 1:
+            self.error('Number of workers must be at least 1')
+            return
+        self.go_engine.set_num_workers(num_workers)
+        self.respond()
+
     def display_pattern_moves(self, args):
         game_end, winner = self.board.check_game_end_gomoku()
         color=self.board.current_player
@@ -285,17 +302,14 @@ class GtpConnection():
         self.timelimit = args[0]
         self.respond('')
 
-    def handler(self, signum, fram):
-        self.board = self.sboard
-        raise Exception("unknown")
-
     def solve_cmd(self, args):
+        """
+        Solve the position for the player to move, or answer unknown
+        when the timelimit runs out. The board is unchanged either way.
+        """
         try:
-            self.sboard = self.board.copy()
-            signal.alarm(int(self.timelimit)-1)
-            winner,move = self.board.solve()
-            self.board = self.sboard
-            signal.alarm(0)
+            control = SearchControl(int(self.timelimit))
+            winner,move = self.board.solve(control)
             if move != "NoMove":
                 if move == None:
                     self.respond('{} {}'.format(winner, self.board._point_to_coord(move)))
@@ -303,6 +317,8 @@ class GtpConnection():
                 self.respond('{} {}'.format(winner, format_point(point_to_coord(move, self.board.size))))
                 return 
             self.respond('{}'.format(winner))
+        except SolveTimeout:
+            self.respond('unknown')
         except Exception as e:
             self.respond('{}'.format(str(e)))
 
@@ -324,16 +340,8 @@ class GtpConnection():
         if board_is_full:
             self.respond("pass")
             return
-        move=None
-        try:
-            signal.alarm(int(self.timelimit))
-            self.sboard = self.board.copy()
-            move = self.go_engine.get_move(self.board, color)
-            self.board=self.sboard
-            signal.alarm(0)
-        except Exception as e:
-            sys.stderr.write("timelimit")
-            sys.stderr.flush()
+        self.go_engine.set_timelimit(int(self.timelimit))
+        move = self.go_engine.get_move(self.board, color)
 
         if move == PASS:
             self.respond("pass")
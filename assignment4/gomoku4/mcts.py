@@ -5,8 +5,10 @@ This function is loosely based on https://github.com/Rochester-NRT/RocAlphaGo/bl
 import os, sys
 import numpy as np
 import random
+import multiprocessing
 from board_util import GoBoardUtil, BLACK, WHITE, PASS, EMPTY
 from gtp_connection import point_to_coord, format_point
+from search_control import SearchControl
 
 PASS = 'pass'
 
@@ -21,21 +23,50 @@ def uct_val(node, child, exploration, max_flag):
         white = float(child._n_visits - child._black_wins)/child._n_visits + exploration*np.sqrt(np.log(node._n_visits)/child._n_visits)
         # print("white: " + str(white))
         return white
+
+def uct_scores(parent_visits, visits, black_wins, exploration, max_flag):
+    """
+    uct_val for all children of a node at once.
+    visits and black_wins are the arrays of child statistics. There is a
+    single log for the parent, and unvisited children score inf as in uct_val.
+    """
+    wins = black_wins if max_flag else visits - black_wins
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = wins/visits + exploration*np.sqrt(np.log(parent_visits)/visits)
+    scores[visits == 0] = np.inf
+    return scores
         
 
 def game_result(board):
     game_end, winner = board.check_game_end_gomoku()
-    moves = board.get_empty_points()
-    board_full = (len(moves) == 0)
+    board_full = (len(board.empty_points) == 0)
     if game_end:
         return winner
     if board_full:
         return 'draw'
     return None
 
+def _root_parallel_worker(args):
+    """
+    One process of MCTS.get_move_root_parallel: runs up to num_simulation
+    playouts of an independent search within the given seconds and returns
+    the root statistics as a list of (move, visits, black wins).
+    """
+    board, toplay, num_simulation, exploration, seconds, seed = args
+    random.seed(seed)
+    search = MCTS()
+    search.toplay = toplay
+    search.exploration = exploration
+    control = SearchControl(seconds, safety_margin = 0)
+    for _ in range(num_simulation):
+        if not control.time_left():
+            break
+        search._playout(board.copy(), toplay)
+    return [(move, int(node._n_visits), int(node._black_wins))
+            for move, node in search._root._children.items()]
+
 def undo(board,move):
-    board.board[move] = EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
+    board.undoMove()
 
 
 class TreeNode(object):
@@ -44,30 +75,69 @@ class TreeNode(object):
     """
     version = 0.22
     name = "MCTS Player"
-    def __init__(self, parent):
+    def __init__(self, parent, index=0):
         """
-        parent is set when a node gets expanded
+        parent is set when a node gets expanded.
+        The statistics of a node are stored in the _child_visits and
+        _child_black_wins arrays of its parent, at position index, so that
+        select can score all children at once. Only a root keeps its
+        own counts.
         """
         self._parent = parent
+        self._index = index
         self._children = {}  # a map from move to TreeNode
-        self._n_visits = 0
-        self._black_wins = 0
+        self._child_nodes = []
+        self._child_visits = np.zeros(0, dtype=int)
+        self._child_black_wins = np.zeros(0, dtype=int)
+        self._visits = 0
+        self._wins = 0
         # self._draw = 0
         self._expanded = False
         self._move = None
 
+    @property
+    def _n_visits(self):
+        if self._parent is None:
+            return self._visits
+        return self._parent._child_visits[self._index]
+
+    @property
+    def _black_wins(self):
+        if self._parent is None:
+            return self._wins
+        return self._parent._child_black_wins[self._index]
+
     def expand(self, board, color):
         """
         Expands tree by creating new children.
         """
         moves = board.get_empty_points()
-        for move in moves:
-            if move not in self._children:
-                if board.is_legal_gomoku(move, color):
-                    self._children[move] = TreeNode(self)
-                    self._children[move]._move = move
+        self.add_children([move for move in moves
+                           if move not in self._children
+                           and board.is_legal_gomoku(move, color)])
         self._expanded = True
 
+    def add_children(self, moves):
+        """
+        Add an unvisited child for each move.
+        """
+        for move in moves:
+            child = TreeNode(self, len(self._child_nodes))
+            child._move = move
+            self._children[move] = child
+            self._child_nodes.append(child)
+        n = len(moves)
+        self._child_visits = np.concatenate((self._child_visits, np.zeros(n, dtype=int)))
+        self._child_black_wins = np.concatenate((self._child_black_wins, np.zeros(n, dtype=int)))
+
+    def detach(self):
+        """
+        Make this node a root, keeping its statistics
+        """
+        self._visits = self._n_visits
+        self._wins = self._black_wins
+        self._parent = None
+
     def select(self, exploration, max_flag):
         """
         Select move among children that gives maximizes UCT. 
@@ -77,7 +147,9 @@ class TreeNode(object):
         Returns:
         A tuple of (move, next_node)
         """
-        return max(self._children.items(), key=lambda items:uct_val(self, items[1], exploration, max_flag))
+        scores = uct_scores(self._n_visits, self._child_visits, self._child_black_wins, exploration, max_flag)
+        child = self._child_nodes[int(np.argmax(scores))]
+        return child._move, child
         
     def update(self, leaf_value):
         """
@@ -92,8 +164,12 @@ class TreeNode(object):
         #     self._black_wins += leaf_value
         # elif leaf_value == 0:
         #     self._draw += 1
-        self._black_wins += leaf_value
-        self._n_visits += 1
+        if self._parent is None:
+            self._wins += leaf_value
+            self._visits += 1
+        else:
+            self._parent._child_black_wins[self._index] += leaf_value
+            self._parent._child_visits[self._index] += 1
 
     def update_recursive(self, leaf_value):
         """
@@ -168,9 +244,8 @@ class MCTS(object):
         """
         result = game_result(board)
         simulation_moves=[]
-        moves = GoBoardUtil.generate_legal_moves_gomoku(board)
         while(result is None):
-            move = moves.pop()
+            move = board.random_empty_point()
             board.play_move_gomoku(move, board.current_player)
             simulation_moves.append(move)
             result = game_result(board)
@@ -184,27 +259,29 @@ class MCTS(object):
         else:
             return 0
 
-    def get_move(self, board, toplay, num_simulation, exploration):
+    def get_move(self, board, toplay, num_simulation, exploration, timelimit=60):
         """
         Runs all playouts sequentially and returns the most visited move.
+        Stops early before timelimit seconds have passed.
         """
+        control = SearchControl(timelimit)
         if self.toplay != toplay:
             sys.stderr.write("Dumping the subtree! \n")
             sys.stderr.flush()
             self._root = TreeNode(None)
         self.toplay = toplay
         self.exploration = exploration
-        for _ in range(num_simulation):
-            try:
-                board_copy = board.copy()
-                self._playout(board_copy, toplay)
-            except Exception as e:
+        for i in range(num_simulation):
+            # always one playout, so the root has children to choose from
+            if i > 0 and not control.time_left():
                 break
+            board_copy = board.gomoku_copy()
+            self._playout(board_copy, toplay)
 
         # choose a move that has the most visit 
         moves_ls =  [(move, node._n_visits) for move, node in self._root._children.items()]
-        # if not moves_ls:
-        #     return None
+        if not moves_ls:
+            return GoBoardUtil.generate_legal_moves_gomoku(board)[0]
         moves_ls = sorted(moves_ls,key=lambda i:i[1],reverse=True)
         move = moves_ls[0]
         self.print_stat(board, self._root, toplay)
@@ -213,6 +290,35 @@ class MCTS(object):
         #     return None
         assert board.is_legal_gomoku(move[0], toplay)
         return move[0]
+
+    def get_move_root_parallel(self, board, toplay, num_simulation, exploration, num_workers, timelimit=60):
+        """
+        Root parallel search: num_workers processes each run num_simulation
+        playouts on an independent tree. The statistics of the root children
+        are summed over all workers and the most visited move is returned.
+        """
+        control = SearchControl(timelimit)
+        jobs = [(board.gomoku_copy(), toplay, num_simulation, exploration,
+                 control.remaining(), random.randrange(1 << 30))
+                for _ in range(num_workers)]
+        with multiprocessing.Pool(num_workers) as workers:
+            results = workers.map(_root_parallel_worker, jobs)
+        self._root = TreeNode(None)
+        self.toplay = toplay
+        self.exploration = exploration
+        for stats in results:
+            for move, n_visits, black_wins in stats:
+                if move not in self._root._children:
+                    self._root.add_children([move])
+                child = self._root._children[move]
+                self._root._child_visits[child._index] += n_visits
+                self._root._child_black_wins[child._index] += black_wins
+                self._root._visits += n_visits
+                self._root._wins += black_wins
+        move = max(self._root._children.items(), key=lambda i:i[1]._n_visits)[0]
+        self.print_stat(board, self._root, toplay)
+        assert board.is_legal_gomoku(move, toplay)
+        return move
         
     def update_with_move(self, last_move):
         """
@@ -221,9 +327,9 @@ class MCTS(object):
         """
         if last_move in self._root._children:
             self._root = self._root._children[last_move]
+            self._root.detach()
         else:
             self._root = TreeNode(None)
-        self._root._parent = None
         self.toplay = GoBoardUtil.opponent(self.toplay)
 
     def point_to_string(self, board_size, point):
@@ -256,11 +362,9 @@ class MCTS(object):
             sys.stderr.write("\nMove: {} Numebr of children {}, Number of visits: {}\n"
                 .format(pointString,len(node._children),node._n_visits))
             sys.stderr.flush()
-            moves_ls = []
             max_flag = color == BLACK
-            for move,child in node._children.items():
-                uctval = uct_val(node,child,self.exploration,max_flag)
-                moves_ls.append((move,uctval,child))
+            scores = uct_scores(node._n_visits, node._child_visits, node._child_black_wins, self.exploration, max_flag)
+            moves_ls = [(child._move, scores[i], child) for i, child in enumerate(node._child_nodes)]
             moves_ls = sorted(moves_ls,key=lambda i:i[1],reverse=True)
 
             if moves_ls:
@@ -306,10 +410,10 @@ class MCTS(object):
         stats=[]
         for move,node in root._children.items():
             if color == BLACK:
-                wins = node._black_wins
+                wins = int(node._black_wins)
             else:
-                wins = node._n_visits - node._black_wins
-            visits = node._n_visits
+                wins = int(node._n_visits - node._black_wins)
+            visits = int(node._n_visits)
             if visits:
                 win_rate = round(float(wins)/visits,2)    
             else:
@@ -0,0 +1,59 @@
+"""
+transposition_table.py
+
+Fixed size transposition table for the alphabeta solver and, in
+gomoku41, the negamax search. Positions are identified by a key of the
+board such as SimpleGoBoard.hash_key(), so a position reached through
+different move orders is only searched once.
+Entries are (value, flag, depth, move) in every player; the solver
+stores no move, so its entries hold None.
+"""
+
+"""
+Bound types of a stored value, relative to the alphabeta window
+the position was searched with.
+"""
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+class TranspositionTable(object):
+
+    def __init__(self, size_log2=20):
+        """
+        Creates an empty table with 2**size_log2 slots
+        """
+        self.size = 1 << size_log2
+        self.mask = self.size - 1
+        self.clear()
+
+    def clear(self):
+        self.keys = [None] * self.size
+        self.entries = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """
+        Return the (value, flag, depth, move) entry stored for key, or None
+        """
+        i = key & self.mask
+        if self.keys[i] == key:
+            self.hits += 1
+            return self.entries[i]
+        self.misses += 1
+        return None
+
+    def store(self, key, value, flag, depth, move=None):
+        """
+        Store a search result for key, with the best move found if any.
+        depth is a measure of the work that went into the result, the
+        number of empty points of the position for the solver: an
+        occupied slot is only overwritten by the same position or a
+        deeper search.
+        """
+        i = key & self.mask
+        old = self.keys[i]
+        if old is None or old == key or depth >= self.entries[i][2]:
+            self.keys[i] = key
+            self.entries[i] = (value, flag, depth, move)
@@ -2,38 +2,34 @@
 #/usr/local/bin/python3
 # Set the path to your python3 above
 
-from gtp_connection import GtpConnection,move_to_coord,coord_to_point,point_to_coord,format_point
+from gtp_connection import GtpConnection
 from board_util import GoBoardUtil, EMPTY
-from simple_board import SimpleGoBoard
-
+from simple_board import GomokuBoard
+from bitboard import create_board, BOARD_BACKENDS
+from search_control import SearchControl
+from policy_cache import PolicyCache
+from threat_search import vcf, vct
+from negamax import NegamaxSearch
+
+import argparse
 import random
 import numpy as np
 
-def undo(board,move):
+"""
+Part of the timelimit the VCF and VCT pre-check of get_move may use
+"""
+VCT_TIME_FRACTION = 0.2
 
-    if isinstance(move,str):
-        coord = move_to_coord(move,board.size)
-        point = coord_to_point(coord[0],coord[1],board.size)
-        board.board[point]=EMPTY
-        board.current_player=GoBoardUtil.opponent(board.current_player)
-    else:
-        board.board[move]=EMPTY
-        board.current_player=GoBoardUtil.opponent(board.current_player)
+def undo(board,move):
+    board.undoMove()
 
 def play_move(board, move, color):
-    #print(type(move))
-    if isinstance(move,str):
-        coord = move_to_coord(move,board.size)
-        point = coord_to_point(coord[0],coord[1],board.size)
-        board.play_move_gomoku(point, color)
-    else:
-        board.play_move_gomoku(move, color)
+    board.play_move_gomoku(move, color)
 
 
 def game_result(board):
     game_end, winner = board.check_game_end_gomoku()
-    moves = board.get_empty_points()
-    board_full = (len(moves) == 0)
+    board_full = (len(board.empty_points) == 0)
     if game_end:
         #return 1 if winner == board.current_player else -1
         return winner
@@ -47,11 +43,14 @@ class GomokuSimulationPlayer(object):
     then select the one with best win-rate.
     playout could be either random or rule_based (i.e., uses pre-defined patterns) 
     """
-    def __init__(self, n_simualtions_per_move=10, playout_policy='rule_based', board_size=7):
+    def __init__(self, n_simualtions_per_move=10, playout_policy='rule_based', board_size=7,
+                 engine='simulation'):
         assert(playout_policy in ['random', 'rule_based'])
+        assert(engine in ['simulation', 'negamax'])
         self.n_simualtions_per_move=n_simualtions_per_move
         self.board_size=board_size
         self.playout_policy=playout_policy
+        self.engine=engine
 
         #NOTE: pattern has preference, later pattern is ignored if an earlier pattern is found
         self.pattern_list=['Win', 'BlockWin', 'OpenFour', 'BlockOpenFour', 'Random']
@@ -59,12 +58,24 @@ class GomokuSimulationPlayer(object):
         self.name="Gomoku3"
         self.version = 3.0
         self.best_move=None
+        self.timelimit=60
+        self.policy_cache = PolicyCache()
 
     
     def set_playout_policy(self, playout_policy='random'):
         assert(playout_policy in ['random', 'rule_based'])
         self.playout_policy=playout_policy
 
+    def set_engine(self, engine='simulation'):
+        """
+        simulation: flat Monte Carlo, negamax: iterative deepening negamax
+        """
+        assert(engine in ['simulation', 'negamax'])
+        self.engine=engine
+
+    def set_timelimit(self, timelimit):
+        self.timelimit=timelimit
+
     def _random_moves(self, board, color_to_play):
         return GoBoardUtil.generate_legal_moves_gomoku(board)
     
@@ -73,7 +84,7 @@ class GomokuSimulationPlayer(object):
             return "Random", self._random_moves(board, color_to_play)
         else:
             assert(self.playout_policy=='rule_based')
-            assert(isinstance(board, SimpleGoBoard))
+            assert(isinstance(board, GomokuBoard))
             ret=board.get_pattern_moves()
             if ret is None:
                 return "Random", self._random_moves(board, color_to_play)
@@ -81,52 +92,37 @@ class GomokuSimulationPlayer(object):
             return self.pattern_list[movetype_id], moves
 
 
-    def legalMoves(self,board):
-        moves = GoBoardUtil.generate_legal_moves_gomoku(board)
-        gtp_moves = []
-        for move in moves:
-            coords = point_to_coord(move, board.size)
-            gtp_moves.append(format_point(coords))
-
-        return gtp_moves
-
     def my_policy_moves(self,board,color):
-
-        points = GoBoardUtil.generate_legal_moves_gomoku(board)
-        moves = self.legalMoves(board)
-        self.move_to_point=dict(zip(moves,points))
-        self.point_to_move=dict(zip(points,moves))
-
-        empty_moves = self.legalMoves(board)
-        win_moves = []
-        block_win_moves = []
-        open_four_moves = []
-        block_open_four_moves = []
-        open_three_moves = []
-        steps = [1,board.NS,board.NS-1,board.NS+1]
-        for move in empty_moves:
-            for step in steps:
-                point = self.move_to_point[move]
-                if board.five_in_row(point,board.current_player,step):
-                    win_moves.append(move)
-                elif board.five_in_row(point,GoBoardUtil.opponent(board.current_player),step):
-                    block_win_moves.append(move)
-                elif board.OpenFour(point,board.current_player,step):
-                    open_four_moves.append(move)
-                elif board.BlockOpenFour(point,GoBoardUtil.opponent(board.current_player),step):
-                    block_open_four_moves.append(move)
-
-        move_types=["Win ","BlockWin ","OpenFour ","BlockOpenFour ","Random "]
-        moves=[win_moves,block_win_moves,open_four_moves,block_open_four_moves,empty_moves]
+        """
+        Return the move type and the list of candidate points
+        for the player to move. The moves of each type are classified
+        by the compiled RULE_PATTERNS of board.rule_pattern_moves.
+        """
+        categories = board.rule_pattern_moves()
+        move_types=["Win ","BlockWin ","OpenFour ","BlockOpenFour "]
         for i in range(len(move_types)):
-            if moves[i]:
-                return move_types,moves[i]
+            if categories[i]:
+                return move_types[i],sorted(categories[i])
+        # the playout picks one at random, so there is no need to shuffle
+        return "Random ",list(board.empty_points)
+
+    def cached_policy_moves(self, board):
+        """
+        my_policy_moves for the player to move.
+        Results are kept in policy_cache by position.
+        """
+        key = board.hash_key()
+        ret = self.policy_cache.lookup(key)
+        if ret is None:
+            ret = self.my_policy_moves(board, board.current_player)
+            self.policy_cache.store(key, ret)
+        return ret
     
     def _do_playout(self, board, color_to_play):
         res=game_result(board)
         simulation_moves=[]
         while(res is None):
-            _ , candidate_moves = self.my_policy_moves(board, board.current_player)
+            _ , candidate_moves = self.cached_policy_moves(board)
             #print(candidate_moves)
             playout_move=random.choice(candidate_moves)
             play_move(board, playout_move, board.current_player)
@@ -142,45 +138,70 @@ class GomokuSimulationPlayer(object):
             assert(res == GoBoardUtil.opponent(color_to_play))
             return -1.0
 
+    def threat_move(self, board):
+        """
+        Tactical pre-check of get_move: a forced win by continuous fours,
+        or else by continuous threats within part of the timelimit
+        """
+        budget = SearchControl(self.timelimit * VCT_TIME_FRACTION, safety_margin = 0)
+        move = vcf(board, control = budget)
+        if move is None:
+            move = vct(board, control = budget)
+        return move
+
     def get_move(self, board, color_to_play):
         """
         The genmove function called by gtp_connection
         """
-        moves=GoBoardUtil.generate_legal_moves_gomoku(board)
+        moves=board.unique_moves(GoBoardUtil.generate_legal_moves_gomoku(board))
         #moves = pending_moves
         toplay=board.current_player
-        best_result, best_move=-1.1, None
-        best_move=moves[0]
+        best_result=-1.1
+        control = SearchControl(self.timelimit)
+        move = self.threat_move(board)
+        if move is not None:
+            self.best_move = move
+            return move
+        control.update_best(moves[0])
+        if self.engine == 'negamax':
+            NegamaxSearch(control).search(board)
+            self.best_move=control.best_move
+            return control.best_move
         wins = np.zeros(len(moves))
         visits = np.zeros(len(moves))
-        while True:
-            for i, move in enumerate(moves):
-                play_move(board, move, toplay)
-                res=game_result(board)
-                if res == toplay:
-                    undo(board, move)
-                    #This move is a immediate win
-                    self.best_move=move
-                    return move
-                ret=self._do_playout(board, toplay)
-                wins[i] += ret
-                visits[i] += 1
-                win_rate = wins[i] / visits[i]
-                if win_rate > best_result:
-                    best_result=win_rate
-                    best_move=move
-                    self.best_move=best_move
+        i = 0
+        while control.time_left():
+            move = moves[i]
+            play_move(board, move, toplay)
+            res=game_result(board)
+            if res == toplay:
                 undo(board, move)
-        assert(best_move is not None)
-        return best_move
-
-def run():
+                #This move is a immediate win
+                control.update_best(move)
+                break
+            ret=self._do_playout(board, toplay)
+            wins[i] += ret
+            visits[i] += 1
+            win_rate = wins[i] / visits[i]
+            if win_rate > best_result:
+                best_result=win_rate
+                control.update_best(move)
+            undo(board, move)
+            i = (i + 1) % len(moves)
+        self.best_move=control.best_move
+        return control.best_move
+
+def run(board_backend='array'):
     """
     start the gtp connection and wait for commands.
+    board_backend is 'array' for SimpleGoBoard or 'bitboard' for BitboardGoBoard
     """
-    board = SimpleGoBoard(7)
+    board = create_board(7, board_backend)
     con = GtpConnection(GomokuSimulationPlayer(), board)
     con.start_connection()
 
 if __name__=='__main__':
-    run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board', choices = sorted(BOARD_BACKENDS), default = 'array',
+                        help = 'board representation')
+    run(parser.parse_args().board)
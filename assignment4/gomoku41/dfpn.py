@@ -0,0 +1,237 @@
+"""
+dfpn.py
+
+Depth-first proof-number search (df-pn) for the solve command.
+Every node has a proof number, the least number of leaves that still
+have to be shown to be wins for the attacker, and a disproof number,
+the same for showing they are not. The search always descends into the
+child with the smallest of these numbers, so it follows the cheapest
+proof instead of searching moves in order like alphabeta.
+
+Values are kept as (phi, delta) from the view of the player to move:
+(proof, disproof) number when the attacker moves, (disproof, proof)
+number when the defender moves. phi = 0 means the player to move gets
+what it wants, delta = 0 that it does not.
+
+A Gomoku position has three results, so solve runs two searches: first
+whether the player to move wins, then whether the opponent wins. Both
+tables are kept between calls, so a solve that runs out of time is
+continued by the next one on the same game.
+"""
+
+from board_util import GoBoardUtil, BLACK, WHITE
+from threat_search import Threats
+
+INF = 1 << 30
+
+class ProofTable(object):
+
+    def __init__(self, size_log2=20):
+        """
+        Creates an empty table with 2**size_log2 slots
+        """
+        self.size = 1 << size_log2
+        self.mask = self.size - 1
+        self.clear()
+
+    def clear(self):
+        self.keys = [None] * self.size
+        self.entries = [None] * self.size
+
+    def lookup(self, key):
+        """
+        Return the (phi, delta, work) entry stored for key, or None
+        """
+        i = key & self.mask
+        if self.keys[i] == key:
+            return self.entries[i]
+        return None
+
+    def store(self, key, phi, delta, work):
+        """
+        Store the numbers of key. work is the number of nodes searched
+        below it: an occupied slot is only overwritten by the same
+        position or one that took at least as much work.
+        """
+        i = key & self.mask
+        old = self.keys[i]
+        if old is None or old == key or work >= self.entries[i][2]:
+            self.keys[i] = key
+            self.entries[i] = (phi, delta, work)
+
+"""
+One table per attacker, kept between solve calls
+"""
+tables = {BLACK: ProofTable(), WHITE: ProofTable()}
+
+class DfpnSearch(object):
+
+    def __init__(self, table, attacker, control=None):
+        """
+        Search whether attacker wins. The search stops early when
+        control, a SearchControl, runs out of time.
+        """
+        self.table = table
+        self.attacker = attacker
+        self.control = control
+        self.nodes = 0
+        self.aborted = False
+
+    def _time_left(self):
+        if self.control is not None and not self.control.time_left():
+            self.aborted = True
+        return not self.aborted
+
+    def _expand(self, board):
+        """
+        Return ((phi, delta), None) for a decided position, or
+        (None, moves) with the moves worth searching
+        """
+        toplay = board.current_player
+        # a draw is a loss for the attacker
+        draw = (INF, 0) if toplay == self.attacker else (0, INF)
+        if board.check_game_end_gomoku()[0]:
+            return (INF, 0), None
+        num_empty = len(board.empty_points)
+        if num_empty == 0:
+            return draw, None
+        own = Threats(board, toplay)
+        if own.win_points:
+            return (0, INF), None
+        opp = Threats(board, GoBoardUtil.opponent(toplay))
+        if len(opp.win_points) > 1:
+            return (INF, 0), None
+        if opp.win_points:
+            return None, list(opp.win_points)
+        if own.double_four_moves():
+            return (0, INF), None
+        attacker = own if toplay == self.attacker else opp
+        attacker_moves = (num_empty + 1) // 2 if toplay == self.attacker else num_empty // 2
+        if attacker.moves_to_five is None or attacker.moves_to_five > attacker_moves:
+            return draw, None
+        double_fours = opp.double_four_moves()
+        if double_fours:
+            stops = set.intersection(*double_fours.values()) | own.four_points
+            return None, sorted(stops)
+        return None, list(board.empty_points)
+
+    def value(self, board):
+        """
+        (phi, delta) of board as stored in the table, (1, 1) if unknown
+        """
+        entry = self.table.lookup(board.hash_key())
+        if entry is None:
+            return 1, 1
+        return entry[0], entry[1]
+
+    def mid(self, board, phi_th, delta_th):
+        """
+        Search board until its phi reaches phi_th or its delta reaches
+        delta_th, and return its (phi, delta)
+        """
+        start = self.nodes
+        self.nodes += 1
+        key = board.hash_key()
+        value, moves = self._expand(board)
+        if value is not None:
+            self.table.store(key, value[0], value[1], 1)
+            return value
+        keys = [board.hash_key_after(m) for m in moves]
+        # numbers of the children searched from here, which the table
+        # may not have kept
+        searched = {}
+        color = board.current_player
+        while True:
+            phi = INF
+            delta = 0
+            best = 0
+            delta2 = INF
+            best_phi = 1
+            for i, k in enumerate(keys):
+                entry = self.table.lookup(k)
+                if entry is not None:
+                    c_phi, c_delta = entry[:2]
+                else:
+                    c_phi, c_delta = searched.get(i, (1, 1))
+                delta = min(delta + c_phi, INF)
+                if c_delta < phi:
+                    delta2 = phi
+                    phi = c_delta
+                    best = i
+                    best_phi = c_phi
+                elif c_delta < delta2:
+                    delta2 = c_delta
+            if phi >= phi_th or delta >= delta_th or not self._time_left():
+                break
+            child_phi_th = min(delta_th - delta + best_phi, INF)
+            child_delta_th = min(phi_th, delta2 + 1)
+            board.play_move_gomoku(moves[best], color)
+            searched[best] = self.mid(board, child_phi_th, child_delta_th)
+            board.undoMove()
+        self.table.store(key, phi, delta, self.nodes - start)
+        return phi, delta
+
+    def prove(self, board):
+        """
+        Search board to the end, or until the time runs out.
+        Returns True if the player to move gets what it wants,
+        False if not and None if unknown.
+        """
+        phi, delta = self.mid(board, INF, INF)
+        if phi == 0:
+            return True
+        if delta == 0:
+            return False
+        return None
+
+    def best_move(self, board):
+        """
+        A move to a child that was shown to be lost for its player to
+        move, after prove(board) returned True
+        """
+        color = board.current_player
+        moves = self._expand(board)[1]
+        if moves is None:
+            # decided without search: by a double four, or as a draw
+            moves = sorted(Threats(board, color).double_four_moves()) or \
+                    list(board.empty_points)
+        for m in moves:
+            board.play_move_gomoku(m, color)
+            phi, delta = self.value(board)
+            if phi != 0 and delta != 0:
+                # the child's entry was replaced, search it again
+                phi, delta = self.mid(board, INF, INF)
+            board.undoMove()
+            if delta == 0:
+                return m
+        return None
+
+def solve(board, control=None):
+    """
+    Solve board for the player to move.
+    Returns ('win', winning move), ('draw', drawing move), ('loss', None)
+    or ('unknown', None) when control ran out of time. The move is None
+    if the game is already over.
+    """
+    toplay = board.current_player
+    opponent = GoBoardUtil.opponent(toplay)
+    if board.check_game_end_gomoku()[0]:
+        return 'loss', None
+    if len(board.empty_points) == 0:
+        return 'draw', None
+    wins = Threats(board, toplay).win_points
+    if wins:
+        return 'win', min(wins)
+    search = DfpnSearch(tables[toplay], toplay, control)
+    result = search.prove(board)
+    if result is None:
+        return 'unknown', None
+    if result:
+        return 'win', search.best_move(board)
+    search = DfpnSearch(tables[opponent], opponent, control)
+    result = search.prove(board)
+    if result is None:
+        return 'unknown', None
+    if result:
+        return 'draw', search.best_move(board)
+    return 'loss', None
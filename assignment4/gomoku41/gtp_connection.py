@@ -12,7 +12,9 @@ from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, PASS, \
                        MAXSIZE, coord_to_point
 import numpy as np
 import re
-import signal
+from search_control import SearchControl
+from threat_search import ThreatSearch
+import dfpn
 
 class GtpConnection():
 
@@ -30,7 +32,6 @@ class GtpConnection():
         self._debug_mode = debug_mode
         self.go_engine = go_engine
         self.board = board
-        signal.signal(signal.SIGALRM, self.handler)
         self.commands = {
             "protocol_version": self.protocol_version_cmd,
             "quit": self.quit_cmd,
@@ -56,7 +57,11 @@ class GtpConnection():
             "solve": self.solve_cmd,
             "list_solve_point": self.list_solve_point_cmd, # below is added for Gomoku3
             "policy": self.set_playout_policy, 
-            "policy_moves": self.display_pattern_moves
+            "engine": self.set_engine,
+            "policy_moves": self.display_pattern_moves,
+            "policy_cache": self.policy_cache_cmd,
+            "vcf": self.vcf_cmd,
+            "vct": self.vct_cmd
         }
         self.timelimit=60
 
@@ -70,18 +75,54 @@ class GtpConnection():
             "genmove": (1, 'Usage: genmove {w,b}'),
             "play": (2, 'Usage: play {b,w} MOVE'),
             "legal_moves": (1, 'Usage: legal_moves {w,b}'),
-            "policy":(1, 'Usage: set playout policy {random, rule_based}')
+            "policy":(1, 'Usage: set playout policy {random, rule_based}'),
+            "engine":(1, 'Usage: engine {simulation, negamax}')
         }
-        points = GoBoardUtil.generate_legal_moves_gomoku(self.board)
-        moves = self.legalMoves()
-        self.move_to_point=dict(zip(moves,points))
-        self.point_to_move=dict(zip(points,moves))
     
     def set_playout_policy(self, args):
         playout_policy=args[0]
         self.go_engine.set_playout_policy(playout_policy)
         self.respond()
 
+    def set_engine(self, args):
+        engine=args[0]
+        if engine not in ['simulation', 'negamax']:
+            self.error(self.argmap["engine"][1])
+            return
+        self.go_engine.set_engine(engine)
+        self.respond()
+
+    def policy_cache_cmd(self, args):
+        """
+        Show the hit and miss counts of the rollout policy cache
+        """
+        cache = self.go_engine.policy_cache
+        self.respond('hits {} misses {} size {} capacity {}'.format(
+            cache.hits, cache.misses, len(cache), cache.capacity))
+
+    def vcf_cmd(self, args):
+        """
+        Winning move by continuous fours for the player to move, or none
+        """
+        self.threat_search_respond(False)
+
+    def vct_cmd(self, args):
+        """
+        Winning move by continuous fours and threes for the player to move, or none
+        """
+        self.threat_search_respond(True)
+
+    def threat_search_respond(self, use_threes):
+        control = SearchControl(int(self.timelimit))
+        search = ThreatSearch(use_threes, control = control)
+        move = search.search(self.board)
+        if move is not None:
+            self.respond(format_point(point_to_coord(move, self.board.size)))
+        elif search.aborted:
+            self.respond('unknown')
+        else:
+            self.respond('none')
+
     def display_pattern_moves(self, args):
         game_end, winner = self.board.check_game_end_gomoku()
         color=self.board.current_player
@@ -181,10 +222,6 @@ class GtpConnection():
         Reset the board to empty board of given size
         """
         self.board.reset(size)
-        points = GoBoardUtil.generate_legal_moves_gomoku(self.board)
-        moves = self.legalMoves()
-        self.move_to_point=dict(zip(moves,points))
-        self.point_to_move=dict(zip(points,moves))
 
     def board2d(self):
         return str(GoBoardUtil.get_twoD_board(self.board))
@@ -292,26 +329,20 @@ class GtpConnection():
         self.timelimit = args[0]
         self.respond('')
 
-    def handler(self, signum, fram):
-        self.board = self.sboard
-        raise Exception("unknown")
-
     def solve_cmd(self, args):
-        try:
-            self.sboard = self.board.copy()
-            signal.alarm(int(self.timelimit)-1)
-            winner,move = self.board.solve()
-            self.board = self.sboard
-            signal.alarm(0)
-            if move != "NoMove":
-                if move == None:
-                    self.respond('{} {}'.format(winner, self.board._point_to_coord(move)))
-                    return 
-                self.respond('{} {}'.format(winner, format_point(point_to_coord(move, self.board.size))))
-                return 
-            self.respond('{}'.format(winner))
-        except Exception as e:
-            self.respond('{}'.format(str(e)))
+        """
+        Solve the position for the player to move with df-pn.
+        Work done before the timelimit is kept for the next solve.
+        """
+        control = SearchControl(int(self.timelimit))
+        result, move = dfpn.solve(self.board, control)
+        toplay = 'b' if self.board.current_player == BLACK else 'w'
+        opponent = 'w' if toplay == 'b' else 'b'
+        winner = {'win': toplay, 'loss': opponent, 'draw': 'draw', 'unknown': 'unknown'}[result]
+        if move is None:
+            self.respond(winner)
+        else:
+            self.respond('{} {}'.format(winner, format_point(point_to_coord(move, self.board.size))))
 
     def genmove_cmd(self, args):
         """
@@ -331,15 +362,8 @@ class GtpConnection():
         if board_is_full:
             self.respond("pass")
             return
-        move=None
-        try:
-            signal.alarm(int(self.timelimit))
-            self.sboard = self.board.copy()
-            move = self.go_engine.get_move(self.board, color)
-            self.board=self.sboard
-            signal.alarm(0)
-        except Exception as e:
-            move=self.go_engine.best_move
+        self.go_engine.set_timelimit(int(self.timelimit))
+        move = self.go_engine.get_move(self.board, color)
 
         if move == PASS:
             self.respond("pass")
@@ -431,42 +455,6 @@ class GtpConnection():
     def list_solve_point_cmd(self, args):
         self.respond(self.board.list_solve_point())
 
-    def legalMoves(self):
-        moves = GoBoardUtil.generate_legal_moves_gomoku(self.board)
-        gtp_moves = []
-        for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
-
-        return gtp_moves
-
-    def policy_moves(self):
-
-        empty_moves = self.legalMoves()
-        win_moves = []
-        block_win_moves = []
-        open_four_moves = []
-        block_open_four_moves = []
-        open_three_moves = []
-        steps = [1,self.board.NS,self.board.NS-1,self.board.NS+1]
-        for move in empty_moves:
-            for step in steps:
-                point = self.move_to_point[move]
-                if self.board.five_in_row(point,self.board.current_player,step):
-                    win_moves.append(move)
-                elif self.board.five_in_row(point,GoBoardUtil.opponent(self.board.current_player),step):
-                    block_win_moves.append(move)
-                elif self.board.OpenFour(point,self.board.current_player,step):
-                    open_four_moves.append(move)
-                elif self.board.BlockOpenFour(point,GoBoardUtil.opponent(self.board.current_player),step):
-                    block_open_four_moves.append(move)
-
-        move_types=["Win ","BlockWin ","OpenFour ","BlockOpenFour ","OpenThree","Random "]
-        moves=[win_moves,block_win_moves,open_four_moves,block_open_four_moves,open_three_moves,empty_moves]
-        for i in range(len(move_types)):
-            if moves[i]:
-                return moves[i]
-
 
 def point_to_coord(point, boardsize):
     """
@@ -0,0 +1,221 @@
+"""
+negamax.py
+
+Iterative deepening negamax for genmove.
+Unlike alphabeta.solve, the search stops at a depth limit and scores the
+positions there with a static evaluation, so it gives a move on any
+board. It searches depth 1, 2, ... until the SearchControl runs out of
+time and plays the best move of the deepest finished search.
+
+Each depth starts with an aspiration window around the score of the
+previous one, and is searched again with the full window if the score
+falls outside. A transposition table and the killer and history tables
+of MoveOrdering are kept between the searches and between moves.
+The table is keyed by canonical_key, with the best move stored in the
+orientation of the canonical position.
+"""
+
+import numpy as np
+from board_util import BLACK, WHITE, EMPTY, MAXSIZE
+from simple_board import pattern_windows
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER
+from move_ordering import MoveOrdering
+
+"""
+Score of a win for the player to move, less the number of moves to it,
+so nearer wins score higher
+"""
+WIN = 1000000
+INFINITY = 2 * WIN
+
+"""
+Scores at least this far from 0 are wins or losses found by the search
+"""
+WIN_BOUND = WIN - MAXSIZE * MAXSIZE - 1
+
+"""
+Score of a line of 5 points holding k stones of one color and no
+stones of the other, indexed by k. A line with a border point counts for
+neither color. Open shapes lie on more such lines than closed ones, so
+an open three scores more than a closed three.
+"""
+LINE_SCORES = np.array([0, 1, 10, 100, 1000, 0], dtype = np.int64)
+
+"""
+Half width of the aspiration window
+"""
+ASPIRATION = 50
+
+"""
+Candidate moves are the empty points within this distance of a stone
+"""
+CANDIDATE_DISTANCE = 2
+
+tt = TranspositionTable(18)
+ordering = MoveOrdering()
+
+def score_to_tt(value, ply):
+    """
+    Win and loss scores count moves from the root. The table stores them
+    counted from the position itself, so that they hold at any ply.
+    """
+    if value >= WIN_BOUND:
+        return value + ply
+    if value <= -WIN_BOUND:
+        return value - ply
+    return value
+
+def score_from_tt(value, ply):
+    """
+    Inverse of score_to_tt for a position found at ply
+    """
+    if value >= WIN_BOUND:
+        return value - ply
+    if value <= -WIN_BOUND:
+        return value + ply
+    return value
+
+def evaluate(board):
+    """
+    Static score of board for the player to move: the LINE_SCORES of
+    its lines minus those of the opponent
+    """
+    stones = board.board[pattern_windows(board, 5)]
+    black = (stones == BLACK).sum(axis = 1)
+    white = (stones == WHITE).sum(axis = 1)
+    empty = (stones == EMPTY).sum(axis = 1)
+    score = int(LINE_SCORES[black[black + empty == 5]].sum()) - \
+            int(LINE_SCORES[white[white + empty == 5]].sum())
+    return score if board.current_player == BLACK else -score
+
+def candidate_moves(board):
+    """
+    Return the empty points near the stones on board, or the center of
+    an empty board
+    """
+    stones = np.flatnonzero((board.board == BLACK) | (board.board == WHITE))
+    if len(stones) == 0:
+        center = (board.size + 1) // 2
+        return [board.pt(center, center)]
+    d = CANDIDATE_DISTANCE
+    offsets = np.array([row * board.NS + col for row in range(-d, d + 1)
+                        for col in range(-d, d + 1) if row or col])
+    near = (stones[:, None] + offsets[None, :]).ravel()
+    near = near[(near >= 0) & (near < len(board.board))]
+    near = np.unique(near[board.board[near] == EMPTY])
+    return [int(p) for p in near]
+
+class NegamaxSearch(object):
+
+    def __init__(self, control):
+        """
+        Search until control, a SearchControl, runs out of time
+        """
+        self.control = control
+        self.nodes = 0
+        self.aborted = False
+        self.root_move = None
+
+    def _time_left(self):
+        if not self.aborted and not self.control.time_left():
+            self.aborted = True
+        return not self.aborted
+
+    def negamax(self, board, depth, alpha, beta, ply):
+        """
+        Score of board for the player to move, searched depth moves deep.
+        Scores outside (alpha, beta) are only bounds. The result is
+        meaningless once self.aborted is set.
+        """
+        self.nodes += 1
+        if board.check_game_end_gomoku()[0]:
+            return ply - WIN
+        if len(board.empty_points) == 0:
+            return 0
+        if not self._time_left():
+            return 0
+        categories = board.rule_pattern_moves()
+        if categories[0]:
+            if ply == 0:
+                self.root_move = min(categories[0])
+            return WIN - ply - 1
+        if depth == 0:
+            return evaluate(board)
+
+        key, symmetry = board.canonical_key()
+        entry = tt.lookup(key)
+        tt_move = None
+        if entry is not None:
+            value, flag, entry_depth, tt_move = entry
+            value = score_from_tt(value, ply)
+            if tt_move is not None:
+                tt_move = board.transform_point(tt_move, symmetry, inverse = True)
+            if entry_depth >= depth and ply > 0:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER and value >= beta:
+                    return value
+                if flag == UPPER and value <= alpha:
+                    return value
+
+        alpha_orig = alpha
+        if categories[1]:
+            moves = list(categories[1])
+        else:
+            moves = candidate_moves(board) or list(board.empty_points)
+        moves = board.unique_moves(ordering.order(board, moves, categories))
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        color = board.current_player
+        best = -INFINITY
+        best_move = None
+        for m in moves:
+            board.play_move_gomoku(m, color)
+            value = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.undoMove()
+            if self.aborted:
+                return 0
+            if value > best:
+                best = value
+                best_move = m
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                ordering.cutoff(board, m)
+                break
+        if best <= alpha_orig:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        tt.store(key, score_to_tt(best, ply), flag, depth,
+                 board.transform_point(best_move, symmetry))
+        if ply == 0:
+            self.root_move = best_move
+        return best
+
+    def search(self, board):
+        """
+        Iterative deepening from board. The best move of every finished
+        depth goes to control.update_best. Returns the score of the
+        deepest finished search, or None if no depth finished.
+        """
+        score = None
+        for depth in range(1, len(board.empty_points) + 1):
+            if score is None:
+                alpha, beta = -INFINITY, INFINITY
+            else:
+                alpha, beta = score - ASPIRATION, score + ASPIRATION
+            value = self.negamax(board, depth, alpha, beta, 0)
+            if not self.aborted and (value <= alpha or value >= beta):
+                value = self.negamax(board, depth, -INFINITY, INFINITY, 0)
+            if self.aborted:
+                break
+            score = value
+            self.control.update_best(self.root_move)
+            if abs(score) >= WIN - len(board.empty_points) - 1:
+                # the game is decided, deeper searches find nothing new
+                break
+        return score
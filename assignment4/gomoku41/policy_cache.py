@@ -0,0 +1,49 @@
+"""
+policy_cache.py
+
+Bounded LRU cache of rollout policy results.
+Positions are identified by SimpleGoBoard.hash_key(), which includes the
+side to move. Playouts pass through the same positions near the root
+again and again, so their policy moves are only computed once.
+"""
+
+from collections import OrderedDict
+
+class PolicyCache(object):
+
+    def __init__(self, capacity=1 << 16):
+        """
+        Creates an empty cache holding at most capacity positions
+        """
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, key):
+        """
+        Return the value stored for key, or None
+        """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def store(self, key, value):
+        """
+        Store value for key, dropping the least recently used entry
+        if the cache is full
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last = False)
@@ -9,13 +9,192 @@ Implements a basic Go board with functions to:
 The board uses a 1-dimensional representation with padding
 """
 
+import random
 import numpy as np
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
                        PASS, is_black_white, coord_to_point, where1d, \
                        MAXSIZE, NULLPOINT
 import alphabeta
 
-class SimpleGoBoard(object):
+"""
+Zobrist keys, one random 64-bit number per (point, color) plus one per
+side to move. They only depend on the board size, so all boards of a
+size share the same table and their hashes can be compared.
+"""
+_zobrist_tables = {}
+
+def zobrist_table(maxpoint):
+    if maxpoint not in _zobrist_tables:
+        rng = random.Random(maxpoint)
+        stones = [[0, rng.getrandbits(64), rng.getrandbits(64)]
+                  for _ in range(maxpoint)]
+        to_play = [0, rng.getrandbits(64), rng.getrandbits(64)]
+        _zobrist_tables[maxpoint] = (stones, to_play)
+    return _zobrist_tables[maxpoint]
+
+"""
+The zobrist stone keys of zobrist_table as a (maxpoint, 4) numpy array
+indexed by point and board value, with 0 for EMPTY and BORDER
+"""
+_zobrist_arrays = {}
+
+def zobrist_array(maxpoint):
+    if maxpoint not in _zobrist_arrays:
+        stones, _ = zobrist_table(maxpoint)
+        table = np.zeros((maxpoint, 4), dtype = np.uint64)
+        for point, keys in enumerate(stones):
+            table[point, BLACK] = keys[BLACK]
+            table[point, WHITE] = keys[WHITE]
+        _zobrist_arrays[maxpoint] = table
+    return _zobrist_arrays[maxpoint]
+
+"""
+Patterns of get_pattern_moves and list_solve_point, as
+{pattern string: distances of the moves from the end of the string}.
+x is the color to play, o the opponent, . empty and B the border.
+Earlier lists have preference.
+"""
+RULE_PATTERNS = [{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}}, #win
+                 {'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}}, #block win
+                 {'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}}, #make-four
+                 {'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{0,2,5},'.o.oo.':{0,3,5}, 'B.ooo..':{0}, '..ooo.B':{6},
+                  'x.ooo..':{0}, '..ooo.x':{6} #block-open-four
+                 },
+                 {'..xx..':{1,4},'.x.x.':{2}} #make-open-three
+                 ]
+
+SOLVE_PATTERNS = [{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}},
+                  {'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}},
+                  {'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}},
+                  {'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{2},'.o.oo.':{3}}]
+
+PATTERN_CODES = {'.': 0, 'x': 1, 'o': 2, 'B': 3}
+
+def compile_patterns(pattern_list):
+    """
+    Encode the pattern strings as base 4 numbers, digit j being the code
+    of character j. Returns {length: (is_pattern, {code: (list index,
+    distances)})}, is_pattern being a boolean array over all 4**length
+    codes. A string in several lists only counts for the first.
+    """
+    compiled = {}
+    for i, patterns in enumerate(pattern_list):
+        for have, dists in patterns.items():
+            code = sum(PATTERN_CODES[c] * 4**j for j, c in enumerate(have))
+            by_code = compiled.setdefault(len(have), {})
+            if code not in by_code:
+                by_code[code] = (i, sorted(dists))
+    result = {}
+    for length, by_code in compiled.items():
+        is_pattern = np.zeros(4 ** length, dtype = bool)
+        is_pattern[list(by_code)] = True
+        result[length] = (is_pattern, by_code)
+    return result
+
+_RULE_PATTERNS = compile_patterns(RULE_PATTERNS)
+_SOLVE_PATTERNS = compile_patterns(SOLVE_PATTERNS)
+
+"""
+Point index tables of all lines of points per board size, see pattern_windows
+"""
+_pattern_window_tables = {}
+
+def pattern_windows(board, length):
+    """
+    Return a (W, length) array with the points of every line of length
+    points in the four directions. Lines may contain border points but
+    stay inside the board array.
+    """
+    key = (board.size, length)
+    if key not in _pattern_window_tables:
+        windows = []
+        for step in (1, board.NS, board.NS + 1, board.NS - 1):
+            for start in range(board.maxpoint - (length - 1) * step):
+                windows.append(range(start, start + length * step, step))
+        _pattern_window_tables[key] = np.array(windows, dtype = np.int32).reshape(-1, length)
+    return _pattern_window_tables[key]
+
+"""
+Data that only depends on the board size: the empty board array, its
+empty points, and the neighbor and diagonal lists of every point.
+All boards of a size share one BoardGeometry, so reset() and copy() do
+not rebuild them. Its fields must not be modified.
+"""
+class BoardGeometry(object):
+
+    def __init__(self, size):
+        self.size = size
+        self.NS = size + 1
+        self.maxpoint = size * size + 3 * (size + 1)
+        board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        self.row_starts = [row * self.NS + 1 for row in range(size + 1)]
+        for row in range(1, size + 1):
+            start = self.row_starts[row]
+            board[start : start + size] = EMPTY
+        self.empty_board = board
+        self.empty_points = [int(p) for p in where1d(board == EMPTY)]
+        self.empty_index = [-1] * self.maxpoint
+        for i, p in enumerate(self.empty_points):
+            self.empty_index[p] = i
+        self.neighbors = []
+        self.diag_neighbors = []
+        for point in range(self.maxpoint):
+            if board[point] == BORDER:
+                self.neighbors.append([])
+            else:
+                self.neighbors.append([nb for nb in
+                                       [point - 1, point + 1, point - self.NS, point + self.NS]
+                                       if board[nb] != BORDER])
+            self.diag_neighbors.append([point - self.NS - 1,
+                                        point - self.NS + 1,
+                                        point + self.NS - 1,
+                                        point + self.NS + 1])
+        self.symmetries = self._symmetries()
+        self.inverse_symmetries = np.argsort(self.symmetries, axis = 1).astype(np.int32)
+
+    def _symmetries(self):
+        """
+        The 8 symmetries of the square board as an (8, maxpoint) array:
+        symmetries[t][point] is the point that point moves to under
+        symmetry t. Symmetry 0 is the identity. Border points stay where
+        they are.
+        """
+        n = self.size
+        maps = [lambda r, c: (r, c),
+                lambda r, c: (c, n + 1 - r),
+                lambda r, c: (n + 1 - r, n + 1 - c),
+                lambda r, c: (n + 1 - c, r),
+                lambda r, c: (r, n + 1 - c),
+                lambda r, c: (n + 1 - r, c),
+                lambda r, c: (c, r),
+                lambda r, c: (n + 1 - c, n + 1 - r)]
+        symmetries = np.tile(np.arange(self.maxpoint, dtype = np.int32), (len(maps), 1))
+        for t, f in enumerate(maps):
+            for r in range(1, n + 1):
+                for c in range(1, n + 1):
+                    symmetries[t, r * self.NS + c] = coord_to_point(*f(r, c), n)
+        return symmetries
+
+_geometries = {}
+
+def board_geometry(size):
+    if size not in _geometries:
+        _geometries[size] = BoardGeometry(size)
+    return _geometries[size]
+
+class GomokuBoard(object):
+    """
+    Board with only the state needed for Gomoku: the stones, the empty
+    points, the move stack, the side to move, the winner and the hash.
+    The fixed set of attributes in __slots__ keeps boards small and
+    attribute access fast, which matters for the many boards copied
+    by the searches.
+    """
+
+    __slots__ = ('size', 'NS', 'current_player', 'geometry', 'maxpoint',
+                 'board', 'empty_points', '_empty_index', 'moves',
+                 '_winner', '_win_move_nr', '_zobrist', '_zobrist_to_play',
+                 'hash', '_symmetric_hashes')
 
     def get_color(self, point):
         try:
@@ -26,50 +205,39 @@ class SimpleGoBoard(object):
     def pt(self, row, col):
         return coord_to_point(row, col, self.size)
 
-    def is_legal(self, point, color):
+    def get_empty_points(self):
         """
-        Check whether it is legal for color to play on point
+        Return:
+            The empty points on the board
         """
-        assert is_black_white(color)
-        # Special cases
-        if point == PASS:
-            return True
-        elif self.board[point] != EMPTY:
-            return False
-        if point == self.ko_recapture:
-            return False
-            
-        # General case: detect captures, suicide
-        opp_color = GoBoardUtil.opponent(color)
-        self.board[point] = color
-        legal = True
-        has_capture = self._detect_captures(point, opp_color)
-        if not has_capture and not self._stone_has_liberty(point):
-            block = self._block_of(point)
-            if not self._has_liberty(block): # suicide
-                legal = False
-        self.board[point] = EMPTY
-        return legal
+        return np.array(self.empty_points, dtype = np.int32)
 
-    def _detect_captures(self, point, opp_color):
+    def random_empty_point(self):
         """
-        Did move on point capture something?
+        Return a uniformly random empty point, or PASS if the board is full
         """
-        for nb in self.neighbors_of_color(point, opp_color):
-            if self._detect_capture(nb):
-                return True
-        return False
+        if not self.empty_points:
+            return PASS
+        return self.empty_points[random.randrange(len(self.empty_points))]
 
-    def get_empty_points(self):
+    def _remove_empty_point(self, point):
         """
-        Return:
-            The empty points on the board
+        Swap-remove point from empty_points, keeping _empty_index in sync
         """
-        return where1d(self.board == EMPTY)
+        i = self._empty_index[point]
+        last = self.empty_points.pop()
+        if last != point:
+            self.empty_points[i] = last
+            self._empty_index[last] = i
+        self._empty_index[point] = -1
+
+    def _add_empty_point(self, point):
+        self._empty_index[point] = len(self.empty_points)
+        self.empty_points.append(point)
 
     def __init__(self, size):
         """
-        Creates a Go board of given size
+        Creates a board of given size
         """
         assert 2 <= size <= MAXSIZE
         self.reset(size)
@@ -82,241 +250,123 @@ class SimpleGoBoard(object):
         """
         self.size = size
         self.NS = size + 1
-        self.WE = 1
-        self.ko_recapture = None
         self.current_player = BLACK
-        self.maxpoint = size * size + 3 * (size + 1)
-        self.board = np.full(self.maxpoint, BORDER, dtype = np.int32)
-        self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
-        self._initialize_empty_points(self.board)
-        self._initialize_neighbors()
-
-    def copy(self):
-        b = SimpleGoBoard(self.size)
-        assert b.NS == self.NS
-        assert b.WE == self.WE
-        b.ko_recapture = self.ko_recapture
-        b.current_player = self.current_player
-        assert b.maxpoint == self.maxpoint
-        b.board = np.copy(self.board)
-        return b
+        self.geometry = board_geometry(size)
+        self.maxpoint = self.geometry.maxpoint
+        self.board = np.copy(self.geometry.empty_board)
+        # empty_points is kept up to date by play_move_gomoku and undoMove,
+        # _empty_index maps a point to its position in empty_points
+        self.empty_points = list(self.geometry.empty_points)
+        self._empty_index = list(self.geometry.empty_index)
+        self.moves = []
+        self._winner = None
+        self._win_move_nr = None
+        self._zobrist, self._zobrist_to_play = zobrist_table(self.maxpoint)
+        self.hash = 0
+        # (hash, symmetric_hashes()) of the last position it was asked for
+        self._symmetric_hashes = None
 
-    def row_start(self, row):
-        assert row >= 1
-        assert row <= self.size
-        return row * self.NS + 1
-        
-    def _initialize_empty_points(self, board):
-        """
-        Fills points on the board with EMPTY
-        Argument
-        ---------
-        board: numpy array, filled with BORDER
-        """
-        for row in range(1, self.size + 1):
-            start = self.row_start(row)
-            board[start : start + self.size] = EMPTY
-
-    def _on_board_neighbors(self, point):
-        nbs = []
-        for nb in self._neighbors(point):
-            if self.board[nb] != BORDER:
-                nbs.append(nb)
-        return nbs
-            
-    def _initialize_neighbors(self):
+    def hash_key(self):
         """
-        precompute neighbor array.
-        For each point on the board, store its list of on-the-board neighbors
+        Zobrist key of the position including the side to move
         """
-        self.neighbors = []
-        for point in range(self.maxpoint):
-            if self.board[point] == BORDER:
-                self.neighbors.append([])
-            else:
-                self.neighbors.append(self._on_board_neighbors(point))
-        
-    def is_eye(self, point, color):
-        """
-        Check if point is a simple eye for color
-        """
-        if not self._is_surrounded(point, color):
-            return False
-        # Eye-like shape. Check diagonals to detect false eye
-        opp_color = GoBoardUtil.opponent(color)
-        false_count = 0
-        at_edge = 0
-        for d in self._diag_neighbors(point):
-            if self.board[d] == BORDER:
-                at_edge = 1
-            elif self.board[d] == opp_color:
-                false_count += 1
-        return false_count <= 1 - at_edge # 0 at edge, 1 in center
-    
-    def _is_surrounded(self, point, color):
+        return self.hash ^ self._zobrist_to_play[self.current_player]
+
+    def hash_key_after(self, point):
         """
-        check whether empty point is surrounded by stones of color.
+        hash_key() of the position after the player to move plays on
+        point, without playing the move
         """
-        for nb in self.neighbors[point]:
-            nb_color = self.board[nb]
-            if nb_color != color:
-                return False
-        return True
-
-    def _stone_has_liberty(self, stone):
-        lib = self.find_neighbor_of_color(stone, EMPTY)
-        return lib != None
+        color = self.current_player
+        return self.hash ^ self._zobrist[point][color] ^ \
+               self._zobrist_to_play[GoBoardUtil.opponent(color)]
 
-    def _get_liberty(self, block):
+    def symmetric_hashes(self):
         """
-        Find any liberty of the given block.
-        Returns None in case there is no liberty.
-        block is a numpy boolean array
+        Zobrist hashes of the stones of the position under each of the
+        8 symmetries, as in BoardGeometry.symmetries. Entry 0 is self.hash.
         """
-        for stone in where1d(block):
-            lib = self.find_neighbor_of_color(stone, EMPTY)
-            if lib != None:
-                return lib
-        return None
+        if self._symmetric_hashes is None or self._symmetric_hashes[0] != self.hash:
+            table = zobrist_array(self.maxpoint)
+            hashes = np.bitwise_xor.reduce(table[self.geometry.symmetries, self.board], axis = 1)
+            self._symmetric_hashes = (self.hash, hashes)
+        return self._symmetric_hashes[1]
 
-    def _has_liberty(self, block):
+    def canonical_key(self):
         """
-        Check if the given block has any liberty.
-        Also updates the liberty_of array.
-        block is a numpy boolean array
+        Return (key, symmetry). All 8 symmetric versions of a position
+        get the same key: hash_key() of the version with the smallest
+        stone hash, which is the image of the position under symmetry.
+        Use it for tables whose entries do not depend on orientation,
+        and transform_point to map stored moves.
         """
-        lib = self._get_liberty(block)
-        if lib != None:
-            assert self.get_color(lib) == EMPTY
-            for stone in where1d(block):
-                self.liberty_of[stone] = lib
-            return True
-        return False
+        hashes = self.symmetric_hashes()
+        symmetry = int(np.argmin(hashes))
+        return int(hashes[symmetry]) ^ self._zobrist_to_play[self.current_player], symmetry
 
-    def _block_of(self, stone):
+    def transform_point(self, point, symmetry, inverse=False):
         """
-        Find the block of given stone
-        Returns a board of boolean markers which are set for
-        all the points in the block 
+        The point that point moves to under symmetry, or with inverse
+        the point that moves to point
         """
-        marker = np.full(self.maxpoint, False, dtype = bool)
-        pointstack = [stone]
-        color = self.get_color(stone)
-        assert is_black_white(color)
-        marker[stone] = True
-        while pointstack:
-            p = pointstack.pop()
-            neighbors = self.neighbors_of_color(p, color)
-            for nb in neighbors:
-                if not marker[nb]:
-                    marker[nb] = True
-                    pointstack.append(nb)
-        return marker
+        if inverse:
+            return int(self.geometry.inverse_symmetries[symmetry][point])
+        return int(self.geometry.symmetries[symmetry][point])
 
-    def _fast_liberty_check(self, nb_point):
-        lib = self.liberty_of[nb_point]
-        if lib != NULLPOINT and self.get_color(lib) == EMPTY:
-            return True # quick exit, block has a liberty  
-        if self._stone_has_liberty(nb_point):
-            return True # quick exit, no need to look at whole block
-        return False
-        
-    def _detect_capture(self, nb_point):
+    def unique_moves(self, moves):
         """
-        Check whether opponent block on nb_point is captured.
-        Returns boolean.
+        Drop the moves that lead to the same position as another move up
+        to symmetry, which is only possible if the position itself is
+        symmetric. Of each such group only the smallest point is kept.
         """
-        if self._fast_liberty_check(nb_point):
-            return False
-        opp_block = self._block_of(nb_point)
-        return not self._has_liberty(opp_block)
-    
-    def _detect_and_process_capture(self, nb_point):
+        hashes = self.symmetric_hashes()
+        invariant = np.flatnonzero(hashes == hashes[0])
+        if len(invariant) == 1:
+            return moves
+        images = self.geometry.symmetries[invariant]
+        return [m for m in moves if images[:, m].min() == m]
+
+    def copy(self):
         """
-        Check whether opponent block on nb_point is captured.
-        If yes, remove the stones.
-        Returns the stone if only a single stone was captured,
-            and returns None otherwise.
-        This result is used in play_move to check for possible ko
+        Copy of the position. Plain values and the shared geometry are
+        taken over as they are, only the mutable state is cloned.
         """
-        if self._fast_liberty_check(nb_point):
-            return None
-        opp_block = self._block_of(nb_point)
-        if self._has_liberty(opp_block):
-            return None
-        captures = list(where1d(opp_block))
-        self.board[captures] = EMPTY
-        self.liberty_of[captures] = NULLPOINT
-        single_capture = None 
-        if len(captures) == 1:
-            single_capture = nb_point
-        return single_capture
+        b = type(self).__new__(type(self))
+        self._copy_into(b)
+        return b
 
-    def play_move(self, point, color):
+    def gomoku_copy(self):
         """
-        Play a move of color on point
-        Returns boolean: whether move was legal
+        Copy of the position as a plain GomokuBoard, without the state
+        that subclasses add. Used by the searches, which only play
+        Gomoku moves on their copies.
         """
-        assert is_black_white(color)
-        # Special cases
-        if point == PASS:
-            self.ko_recapture = None
-            self.current_player = GoBoardUtil.opponent(color)
-            return True
-        elif self.board[point] != EMPTY:
-            return False
-        if point == self.ko_recapture:
-            return False
-            
-        # General case: deal with captures, suicide, and next ko point
-        opp_color = GoBoardUtil.opponent(color)
-        in_enemy_eye = self._is_surrounded(point, opp_color)
-        self.board[point] = color
-        single_captures = []
-        neighbors = self.neighbors[point]
-        for nb in neighbors:
-            if self.board[nb] == opp_color:
-                single_capture = self._detect_and_process_capture(nb)
-                if single_capture != None:
-                    single_captures.append(single_capture)
-        if not self._stone_has_liberty(point):
-            # check suicide of whole block
-            block = self._block_of(point)
-            if not self._has_liberty(block): # undo suicide move
-                self.board[point] = EMPTY
-                return False
-        self.ko_recapture = None
-        if in_enemy_eye and len(single_captures) == 1:
-            self.ko_recapture = single_captures[0]
-        self.current_player = GoBoardUtil.opponent(color)
-        return True
+        b = GomokuBoard.__new__(GomokuBoard)
+        GomokuBoard._copy_into(self, b)
+        return b
 
-    def neighbors_of_color(self, point, color):
-        """ List of neighbors of point of given color """
-        nbc = []
-        for nb in self.neighbors[point]:
-            if self.get_color(nb) == color:
-                nbc.append(nb)
-        return nbc
-        
-    def find_neighbor_of_color(self, point, color):
-        """ Return one neighbor of point of given color, or None """
-        for nb in self.neighbors[point]:
-            if self.get_color(nb) == color:
-                return nb
-        return None
-        
-    def _neighbors(self, point):
-        """ List of all four neighbors of the point """
-        return [point - 1, point + 1, point - self.NS, point + self.NS]
+    def _copy_into(self, b):
+        b.size = self.size
+        b.NS = self.NS
+        b.current_player = self.current_player
+        b.geometry = self.geometry
+        b.maxpoint = self.maxpoint
+        b.board = np.copy(self.board)
+        b.empty_points = list(self.empty_points)
+        b._empty_index = list(self._empty_index)
+        b.moves = list(self.moves)
+        b._winner = self._winner
+        b._win_move_nr = self._win_move_nr
+        b._zobrist = self._zobrist
+        b._zobrist_to_play = self._zobrist_to_play
+        b.hash = self.hash
+        b._symmetric_hashes = self._symmetric_hashes
 
-    def _diag_neighbors(self, point):
-        """ List of all four diagonal neighbors of point """
-        return [point - self.NS - 1, 
-                point - self.NS + 1, 
-                point + self.NS - 1, 
-                point + self.NS + 1]
-    
+    def row_start(self, row):
+        assert row >= 1
+        assert row <= self.size
+        return self.geometry.row_starts[row]
+        
     def _point_to_coord(self, point):
         """
         Transform point index to row, col.
@@ -351,9 +401,28 @@ class SimpleGoBoard(object):
         if self.board[point] != EMPTY:
             return False
         self.board[point] = color
+        self._remove_empty_point(point)
+        self.hash ^= self._zobrist[point][color]
+        self.moves.append(point)
+        if self._winner is None and self.point_check_game_end_gomoku(point):
+            self._winner = color
+            self._win_move_nr = len(self.moves)
         self.current_player = GoBoardUtil.opponent(color)
         return True
-        
+
+    def undoMove(self):
+        """
+        Take back the last move played with play_move_gomoku
+        """
+        location = self.moves.pop()
+        self.hash ^= self._zobrist[location][self.board[location]]
+        if self._win_move_nr is not None and len(self.moves) < self._win_move_nr:
+            self._winner = None
+            self._win_move_nr = None
+        self.board[location] = EMPTY
+        self._add_empty_point(location)
+        self.current_player = GoBoardUtil.opponent(self.current_player)
+
     def _point_direction_check_connect_gomoko(self, point, shift):
         """
         Check if the point has connect5 condition in a direction
@@ -367,7 +436,7 @@ class SimpleGoBoard(object):
             p = p + d
             if self.board[p] == color:
                 count = count + 1
-                if count == 5:
+                if count >= 5:
                     break
             else:
                 break
@@ -377,12 +446,12 @@ class SimpleGoBoard(object):
             p = p + d
             if self.board[p] == color:
                 count = count + 1
-                if count == 5:
+                if count >= 5:
                     break
             else:
                 break
-        assert count <= 5
-        return count == 5
+        # the played stone may join two shorter lines into an overline
+        return count >= 5
     
     def point_check_game_end_gomoku(self, point):
         """
@@ -406,22 +475,21 @@ class SimpleGoBoard(object):
         
         return False
     
+    @property
+    def winner(self):
+        """
+        The color that has five in a row, or None while the game is open.
+        Maintained incrementally by play_move_gomoku and undoMove.
+        """
+        return self._winner
+
     def check_game_end_gomoku(self):
         """
             Check if the game ends for the game of Gomoku.
+            Only the last played stone can complete a five, so the result
+            is tracked in play_move_gomoku instead of rescanning all stones.
             """
-        white_points = where1d(self.board == WHITE)
-        black_points = where1d(self.board == BLACK)
-        
-        for point in white_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, WHITE
-    
-        for point in black_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, BLACK
-
-        return False, None
+        return self._winner is not None, self._winner
 
     def solve(self):
         result, move, drawMove = alphabeta.solve(self)
@@ -441,29 +509,26 @@ class SimpleGoBoard(object):
             winner='w' if self.current_player==WHITE else 'b'
             return winner, move
 
-    def check_pattern(self,point,have,direction_x,direction_y,moveSet,patternList,color,flag):
-        for i in range(0,5):
-            if have in patternList[i]:
-                for dis in patternList[i][have]:
-                    moveSet[i].add(point-direction_x*(dis+1)-direction_y*self.NS*(dis+1))
-                #flag[0]=True
-                break
-        if (not (0<= point<len(self.board))) or len(have)==9:
-            return
-#if self.get_color(point)==BORDER or len(have)==7:
-#            return
-        piece=self.get_color(point)
-        if piece==EMPTY:
-            piece='.'
-        elif piece==color:
-            piece='x'
-        elif piece == BORDER:
-            piece='B'
-        else:
-            piece='o'
-        have+=piece
-        #print(GoBoardUtil.format_point(self._point_to_coord(point)),have,self.board[point])
-        self.check_pattern(point+direction_x+direction_y*self.NS,have,direction_x,direction_y,moveSet,patternList,color,flag)
+    def match_patterns(self, compiled, num_lists):
+        """
+        Find the moves of compiled patterns for the player to move.
+        All lines of each pattern length are gathered from the board at
+        once and their base 4 codes looked up in the patterns.
+        Returns one set of moves for each of the num_lists pattern lists.
+        """
+        moveSet=[set() for _ in range(num_lists)]
+        relative = np.array([PATTERN_CODES['.'], PATTERN_CODES['o'],
+                             PATTERN_CODES['o'], PATTERN_CODES['B']], dtype = np.int64)
+        relative[self.current_player] = PATTERN_CODES['x']
+        codes = relative[self.board]
+        for length, (is_pattern, by_code) in compiled.items():
+            windows = pattern_windows(self, length)
+            keys = codes[windows] @ (4 ** np.arange(length, dtype = np.int64))
+            for w in np.flatnonzero(is_pattern[keys]):
+                i, dists = by_code[int(keys[w])]
+                for dis in dists:
+                    moveSet[i].add(int(windows[w, length - 1 - dis]))
+        return moveSet
 
     def get_pattern_moves(self):
         """
@@ -471,27 +536,7 @@ class SimpleGoBoard(object):
         2. urgent blocking point xoooo.
         3. wining in 2 step point
         """
-        moveSet=[set(),set(),set(),set(),set()]
-        color=self.current_player
-
-        patternList=[{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}}, #win
-                     {'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}}, #block win
-                     {'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}}, #make-four
-                     {'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{0,2,5},'.o.oo.':{0,3,5}, 'B.ooo..':{0}, '..ooo.B':{6},
-                     'x.ooo..':{0}, '..ooo.x':{6} #block-open-four
-                     },
-                     {'..xx..':{1,4},'.x.x.':{2}} #make-open-three
-                     ]
-
-        direction_x=[1,0,1,-1]
-        direction_y=[0,1,1,1]
-        flag=[False]
-
-        for point in range(0, len(self.board)):
-            if flag[0]:
-                break
-            for direction in range(0,4):
-                    self.check_pattern(point,'',direction_x[direction],direction_y[direction],moveSet,patternList,color,flag)
+        moveSet=self.match_patterns(_RULE_PATTERNS, len(RULE_PATTERNS))
         
         i=0
         while i<5 and not bool(moveSet[i]): i+=1
@@ -500,26 +545,20 @@ class SimpleGoBoard(object):
         else:
             return i, list(moveSet[i])
             
+    def rule_pattern_moves(self):
+        """
+        Return the moves of every list of RULE_PATTERNS for the player
+        to move, as one set per list
+        """
+        return self.match_patterns(_RULE_PATTERNS, len(RULE_PATTERNS))
+
     def list_solve_point(self):
         """
         1. direct winning point xxxx. x.xxx xx.xx
         2. urgent blocking point xoooo.
         3. wining in 2 step point
         """
-        moveSet=[set(),set(),set(),set()]
-        color=self.current_player
-
-        patternList=[{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}},{'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}},{'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}},{'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{2},'.o.oo.':{3}}]
-
-        direction_x=[1,0,1,-1]
-        direction_y=[0,1,1,1]
-        flag=[False]
-
-        for point in where1d(self.board!=BORDER):
-            if flag[0]:
-                break
-            for direction in range(0,4):
-                    self.check_pattern(point,'',direction_x[direction],direction_y[direction],moveSet,patternList,color,flag)
+        moveSet=self.match_patterns(_SOLVE_PATTERNS, len(SOLVE_PATTERNS))
         
         i=0
         while i<4 and not bool(moveSet[i]):
@@ -636,3 +675,235 @@ class SimpleGoBoard(object):
             return True
 
         return False
+
+
+class SimpleGoBoard(GomokuBoard):
+    """
+    GomokuBoard with the Go rules: captures, ko and eyes.
+    Used as the GTP board, which also answers Go commands.
+    """
+
+    def reset(self, size):
+        super().reset(size)
+        self.WE = 1
+        self.ko_recapture = None
+        self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
+        self.neighbors = self.geometry.neighbors
+
+    def copy(self):
+        b = super().copy()
+        b.__dict__.update(self.__dict__)
+        b.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
+        return b
+
+    def is_legal(self, point, color):
+        """
+        Check whether it is legal for color to play on point
+        """
+        assert is_black_white(color)
+        # Special cases
+        if point == PASS:
+            return True
+        elif self.board[point] != EMPTY:
+            return False
+        if point == self.ko_recapture:
+            return False
+            
+        # General case: detect captures, suicide
+        opp_color = GoBoardUtil.opponent(color)
+        self.board[point] = color
+        legal = True
+        has_capture = self._detect_captures(point, opp_color)
+        if not has_capture and not self._stone_has_liberty(point):
+            block = self._block_of(point)
+            if not self._has_liberty(block): # suicide
+                legal = False
+        self.board[point] = EMPTY
+        return legal
+
+    def _detect_captures(self, point, opp_color):
+        """
+        Did move on point capture something?
+        """
+        for nb in self.neighbors_of_color(point, opp_color):
+            if self._detect_capture(nb):
+                return True
+        return False
+
+    def is_eye(self, point, color):
+        """
+        Check if point is a simple eye for color
+        """
+        if not self._is_surrounded(point, color):
+            return False
+        # Eye-like shape. Check diagonals to detect false eye
+        opp_color = GoBoardUtil.opponent(color)
+        false_count = 0
+        at_edge = 0
+        for d in self._diag_neighbors(point):
+            if self.board[d] == BORDER:
+                at_edge = 1
+            elif self.board[d] == opp_color:
+                false_count += 1
+        return false_count <= 1 - at_edge # 0 at edge, 1 in center
+
+    def _is_surrounded(self, point, color):
+        """
+        check whether empty point is surrounded by stones of color.
+        """
+        for nb in self.neighbors[point]:
+            nb_color = self.board[nb]
+            if nb_color != color:
+                return False
+        return True
+
+    def _stone_has_liberty(self, stone):
+        lib = self.find_neighbor_of_color(stone, EMPTY)
+        return lib != None
+
+    def _get_liberty(self, block):
+        """
+        Find any liberty of the given block.
+        Returns None in case there is no liberty.
+        block is a numpy boolean array
+        """
+        for stone in where1d(block):
+            lib = self.find_neighbor_of_color(stone, EMPTY)
+            if lib != None:
+                return lib
+        return None
+
+    def _has_liberty(self, block):
+        """
+        Check if the given block has any liberty.
+        Also updates the liberty_of array.
+        block is a numpy boolean array
+        """
+        lib = self._get_liberty(block)
+        if lib != None:
+            assert self.get_color(lib) == EMPTY
+            for stone in where1d(block):
+                self.liberty_of[stone] = lib
+            return True
+        return False
+
+    def _block_of(self, stone):
+        """
+        Find the block of given stone
+        Returns a board of boolean markers which are set for
+        all the points in the block 
+        """
+        marker = np.full(self.maxpoint, False, dtype = bool)
+        pointstack = [stone]
+        color = self.get_color(stone)
+        assert is_black_white(color)
+        marker[stone] = True
+        while pointstack:
+            p = pointstack.pop()
+            neighbors = self.neighbors_of_color(p, color)
+            for nb in neighbors:
+                if not marker[nb]:
+                    marker[nb] = True
+                    pointstack.append(nb)
+        return marker
+
+    def _fast_liberty_check(self, nb_point):
+        lib = self.liberty_of[nb_point]
+        if lib != NULLPOINT and self.get_color(lib) == EMPTY:
+            return True # quick exit, block has a liberty  
+        if self._stone_has_liberty(nb_point):
+            return True # quick exit, no need to look at whole block
+        return False
+
+    def _detect_capture(self, nb_point):
+        """
+        Check whether opponent block on nb_point is captured.
+        Returns boolean.
+        """
+        if self._fast_liberty_check(nb_point):
+            return False
+        opp_block = self._block_of(nb_point)
+        return not self._has_liberty(opp_block)
+
+    def _detect_and_process_capture(self, nb_point):
+        """
+        Check whether opponent block on nb_point is captured.
+        If yes, remove the stones.
+        Returns the stone if only a single stone was captured,
+            and returns None otherwise.
+        This result is used in play_move to check for possible ko
+        """
+        if self._fast_liberty_check(nb_point):
+            return None
+        opp_block = self._block_of(nb_point)
+        if self._has_liberty(opp_block):
+            return None
+        captures = list(where1d(opp_block))
+        self.board[captures] = EMPTY
+        self.liberty_of[captures] = NULLPOINT
+        single_capture = None 
+        if len(captures) == 1:
+            single_capture = nb_point
+        return single_capture
+
+    def play_move(self, point, color):
+        """
+        Play a move of color on point
+        Returns boolean: whether move was legal
+        """
+        assert is_black_white(color)
+        # Special cases
+        if point == PASS:
+            self.ko_recapture = None
+            self.current_player = GoBoardUtil.opponent(color)
+            return True
+        elif self.board[point] != EMPTY:
+            return False
+        if point == self.ko_recapture:
+            return False
+            
+        # General case: deal with captures, suicide, and next ko point
+        opp_color = GoBoardUtil.opponent(color)
+        in_enemy_eye = self._is_surrounded(point, opp_color)
+        self.board[point] = color
+        single_captures = []
+        neighbors = self.neighbors[point]
+        for nb in neighbors:
+            if self.board[nb] == opp_color:
+                single_capture = self._detect_and_process_capture(nb)
+                if single_capture != None:
+                    single_captures.append(single_capture)
+        if not self._stone_has_liberty(point):
+            # check suicide of whole block
+            block = self._block_of(point)
+            if not self._has_liberty(block): # undo suicide move
+                self.board[point] = EMPTY
+                return False
+        self.ko_recapture = None
+        if in_enemy_eye and len(single_captures) == 1:
+            self.ko_recapture = single_captures[0]
+        self.current_player = GoBoardUtil.opponent(color)
+        return True
+
+    def neighbors_of_color(self, point, color):
+        """ List of neighbors of point of given color """
+        nbc = []
+        for nb in self.neighbors[point]:
+            if self.get_color(nb) == color:
+                nbc.append(nb)
+        return nbc
+
+    def find_neighbor_of_color(self, point, color):
+        """ Return one neighbor of point of given color, or None """
+        for nb in self.neighbors[point]:
+            if self.get_color(nb) == color:
+                return nb
+        return None
+
+    def _neighbors(self, point):
+        """ List of all four neighbors of the point """
+        return [point - 1, point + 1, point - self.NS, point + self.NS]
+
+    def _diag_neighbors(self, point):
+        """ List of all four diagonal neighbors of point """
+        return self.geometry.diag_neighbors[point]
@@ -0,0 +1,184 @@
+"""
+threat_search.py
+
+Threat space search for a forced win of the player to move.
+Instead of all moves, the attacker only tries moves that make a four
+(VCF, victory by continuous fours) or a four or a three (VCT, victory
+by continuous threats), and the defender only tries the replies that
+stop the threat. This tree is much narrower than the full game tree,
+so forced wins a dozen moves deep are found in a fraction of a second.
+
+Threats are read from the lines of 5 points of simple_board.pattern_windows:
+a line with k stones of a color and 5 - k empty points is a four for
+k = 4 (its empty point wins), a three for k = 3 (each of its empty
+points makes a four) and a two for k = 2 (each empty point makes a three).
+"""
+
+from board_util import GoBoardUtil, EMPTY
+from simple_board import pattern_windows
+
+"""
+Default limits of a search: attacker moves along a line, and nodes
+"""
+MAX_DEPTH = 10
+MAX_NODES = 100000
+
+class Threats(object):
+    """
+    The threats of one color on a board
+    """
+    def __init__(self, board, color):
+        windows = pattern_windows(board, 5)
+        stones = board.board[windows]
+        own = (stones == color).sum(axis = 1)
+        empty = (stones == EMPTY).sum(axis = 1)
+        self.win_points = self._points(windows, stones, (own == 4) & (empty == 1))
+        self.four_points = self._points(windows, stones, (own == 3) & (empty == 2))
+        self.three_points = self._points(windows, stones, (own == 2) & (empty == 3))
+        # fewest stones color still needs for a five, None if no line is open
+        open_lines = (own + empty) == 5
+        self.moves_to_five = int(empty[open_lines].min()) if open_lines.any() else None
+        # the points that win after playing each four point
+        self._wins_after = {}
+        for line in windows[(own == 3) & (empty == 2)]:
+            a, b = [int(p) for p in line if board.board[p] == EMPTY]
+            self._wins_after.setdefault(a, set()).add(b)
+            self._wins_after.setdefault(b, set()).add(a)
+
+    @staticmethod
+    def _points(windows, stones, mask):
+        return set(int(p) for p in windows[mask][stones[mask] == EMPTY])
+
+    def double_four_moves(self):
+        """
+        Return {move: points that stop it} for the moves that make two
+        fours at once, which cannot both be blocked. Such a move is
+        stopped by playing on it or on one of the points it would win on.
+        """
+        return {m: wins | {m} for m, wins in self._wins_after.items()
+                if len(wins) >= 2}
+
+class ThreatSearch(object):
+
+    def __init__(self, use_threes=False, max_depth=MAX_DEPTH,
+                 max_nodes=MAX_NODES, control=None):
+        """
+        use_threes selects VCT instead of VCF. The search gives up after
+        max_nodes nodes, or when control, a SearchControl, runs out of time.
+        """
+        self.use_threes = use_threes
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.control = control
+        self.nodes = 0
+        self.aborted = False
+        """
+        Results of attacker nodes by board.hash_key(): a winning move, or
+        the depth a search without a win had left
+        """
+        self.wins = {}
+        self.fails = {}
+
+    def search(self, board):
+        """
+        Return a move that wins by continuous threats for the player to
+        move on board, or None. None also means the search was aborted,
+        see self.aborted. board is returned unchanged.
+        """
+        self.nodes = 0
+        self.aborted = False
+        attacker = board.current_player
+        if self._attack(board, attacker, self.max_depth):
+            return self.wins[board.hash_key()]
+        return None
+
+    def _budget_left(self):
+        self.nodes += 1
+        if self.nodes > self.max_nodes or \
+           (self.control is not None and not self.control.time_left()):
+            self.aborted = True
+        return not self.aborted
+
+    def _attack(self, board, attacker, depth):
+        """
+        Attacker to move: True if one of its threats wins
+        """
+        if board.check_game_end_gomoku()[0] or len(board.empty_points) == 0:
+            return False
+        key = board.hash_key()
+        if key in self.wins:
+            return True
+        if self.fails.get(key, -1) >= depth:
+            return False
+        own = Threats(board, attacker)
+        if own.win_points:
+            self.wins[key] = min(own.win_points)
+            return True
+        if depth == 0 or not self._budget_left():
+            return False
+        defender = GoBoardUtil.opponent(attacker)
+        opp = Threats(board, defender)
+        if len(opp.win_points) > 1:
+            moves = []
+        elif opp.win_points:
+            moves = list(opp.win_points)
+        else:
+            moves = sorted(own.four_points)
+            if self.use_threes:
+                moves += sorted(own.three_points - own.four_points)
+        for m in moves:
+            board.play_move_gomoku(m, attacker)
+            win = self._defend(board, attacker, depth - 1)
+            board.undoMove()
+            if win:
+                self.wins[key] = m
+                return True
+            if self.aborted:
+                return False
+        self.fails[key] = depth
+        return False
+
+    def _defend(self, board, attacker, depth):
+        """
+        Defender to move after a threat: True if every reply loses
+        """
+        if board.check_game_end_gomoku()[0]:
+            return True
+        if len(board.empty_points) == 0:
+            return False
+        defender = GoBoardUtil.opponent(attacker)
+        opp = Threats(board, defender)
+        if opp.win_points:
+            return False
+        own = Threats(board, attacker)
+        if len(own.win_points) > 1:
+            return True
+        if own.win_points:
+            replies = list(own.win_points)
+        elif self.use_threes:
+            double_fours = own.double_four_moves()
+            if not double_fours:
+                return False
+            replies = set.intersection(*double_fours.values()) | opp.four_points
+            replies = sorted(replies)
+        else:
+            return False
+        for r in replies:
+            board.play_move_gomoku(r, defender)
+            win = self._attack(board, attacker, depth)
+            board.undoMove()
+            if not win:
+                return False
+        return True
+
+def vcf(board, max_depth=MAX_DEPTH, max_nodes=MAX_NODES, control=None):
+    """
+    Winning move by continuous fours for the player to move, or None
+    """
+    return ThreatSearch(False, max_depth, max_nodes, control).search(board)
+
+def vct(board, max_depth=MAX_DEPTH, max_nodes=MAX_NODES, control=None):
+    """
+    Winning move by continuous fours and threes for the player to move, or None
+    """
+    return ThreatSearch(True, max_depth, max_nodes, control).search(board)
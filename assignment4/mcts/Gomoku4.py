@@ -5,11 +5,13 @@
 from gtp_connection import GtpConnection
 from board_util import GoBoardUtil, EMPTY
 from simple_board import SimpleGoBoard
+from bitboard import create_board, BOARD_BACKENDS
 
+import argparse
 import random
 import numpy as np
 
-from mcts import MCTS
+from mcts import MCTS, PoolMCTS
 
 class GomokuSimulationPlayer(object):
     """
@@ -17,8 +19,13 @@ class GomokuSimulationPlayer(object):
     then select the one with best win-rate.
     playout could be either random or rule_based (i.e., uses pre-defined patterns) 
     """
-    def __init__(self, n_simualtions_per_move=100, playout_policy='random', board_size=7, exploration=0.4):
+    def __init__(self, n_simualtions_per_move=100, playout_policy='random', board_size=7, exploration=0.4, tree_store='nodes'):
+        """
+        tree_store selects the MCTS tree representation: 'nodes' uses one
+        TreeNode object per node, 'pool' the preallocated arrays of PoolMCTS.
+        """
         assert(playout_policy in ['random', 'rule_based'])
+        assert(tree_store in ['nodes', 'pool'])
         self.n_simualtions_per_move=n_simualtions_per_move
         self.board_size=board_size
         self.playout_policy=playout_policy
@@ -31,11 +38,20 @@ class GomokuSimulationPlayer(object):
         self.best_move=None
 
         self.parent = None
-        self.MCTS = MCTS()
+        self.tree_store = tree_store
+        self.MCTS = self._new_search()
         self.exploration = exploration
+        self.num_workers = 1
+        self.parallel_mode = 'root'
+        self.timelimit = 60
+
+    def _new_search(self):
+        if self.tree_store == 'pool':
+            return PoolMCTS()
+        return MCTS()
 
     def reset(self):
-        self.MCTS = MCTS()
+        self.MCTS = self._new_search()
 
     def update(self, move):
         self.parent = self.MCTS._root 
@@ -45,22 +61,76 @@ class GomokuSimulationPlayer(object):
         assert(playout_policy in ['random', 'rule_based'])
         self.playout_policy=playout_policy
 
+    def set_timelimit(self, timelimit):
+        self.timelimit=timelimit
+
+    def set_tree_store(self, tree_store='nodes'):
+        """
+        Switch the MCTS tree representation, see __init__.
+        The tree of the current game is dropped.
+        """
+        assert(tree_store in ['nodes', 'pool'])
+        assert(tree_store == 'nodes' or self.parallel_mode == 'root')
+        self.tree_store=tree_store
+        self.reset()
+
+    def set_num_workers(self, num_workers):
+        """
+        Number of processes for the parallel search, 1 searches in
+        this process only
+        """
+        assert(num_workers >= 1)
+        self.num_workers=num_workers
+
+    def set_parallel_mode(self, parallel_mode='root'):
+        """
+        'root' merges independent searches, 'tree' shares one tree and
+        only runs the rollouts in the worker processes. The tree parallel
+        search needs the TreeNode tree.
+        """
+        assert(parallel_mode in ['root', 'tree'])
+        assert(parallel_mode == 'root' or self.tree_store == 'nodes')
+        self.parallel_mode=parallel_mode
+
     def get_move(self, board, color_to_play):
+        if self.num_workers > 1 and self.parallel_mode == 'tree':
+            move = self.MCTS.get_move_tree_parallel(board,
+                    color_to_play,
+                    num_workers = self.num_workers,
+                    exploration = self.exploration,
+                    playout_policy = self.playout_policy,
+                    timelimit = self.timelimit)
+            self.update(move)
+            return move
+        if self.num_workers > 1:
+            move = self.MCTS.get_move_root_parallel(board,
+                    color_to_play,
+                    num_workers = self.num_workers,
+                    exploration = self.exploration,
+                    playout_policy = self.playout_policy,
+                    timelimit = self.timelimit)
+            self.update(move)
+            return move
         move = self.MCTS.get_move(board,
                 color_to_play,
                 num_simulation = self.n_simualtions_per_move,
                 exploration = self.exploration, 
-                playout_policy = self.playout_policy)
+                playout_policy = self.playout_policy,
+                timelimit = self.timelimit)
         self.update(move)
         return move
 
-def run():
+def run(board_backend='array'):
     """
     start the gtp connection and wait for commands.
+    board_backend is 'array' for SimpleGoBoard or 'bitboard' for BitboardGoBoard
     """
-    board = SimpleGoBoard(7)
+    board = create_board(7, board_backend)
     con = GtpConnection(GomokuSimulationPlayer(), board)
     con.start_connection()
 
 if __name__=='__main__':
-    run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board', choices = sorted(BOARD_BACKENDS), default = 'array',
+                        help = 'board representation')
+    run(parser.parse_args().board)
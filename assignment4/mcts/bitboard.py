@@ -0,0 +1,108 @@
+"""
+bitboard.py
+
+SimpleGoBoard with the stones of each color also kept as a Python int
+bitboard, bit p standing for point p of the padded 1-dimensional board.
+Because of the padding a line of stones never wraps from one row into
+the next, so lines in all four directions can be found with shifts and
+ands on the whole board. The numpy board is still maintained, so all
+other code of SimpleGoBoard works unchanged on a BitboardGoBoard.
+"""
+
+from board_util import BLACK, WHITE, EMPTY
+from simple_board import SimpleGoBoard
+
+class BitboardGoBoard(SimpleGoBoard):
+
+    def reset(self, size):
+        super().reset(size)
+        # stones[color] is the bitboard of color, stones[EMPTY] stays 0
+        self.stones = [0, 0, 0]
+        self._steps = [1, self.NS, self.NS + 1, self.NS - 1]
+
+    def copy(self):
+        b = super().copy()
+        b.stones = list(self.stones)
+        return b
+
+    def gomoku_copy(self):
+        """
+        The searches get a BitboardGoBoard as well, the bitboard win
+        checks are the point of this backend
+        """
+        return self.copy()
+
+    def play_move_gomoku(self, point, color):
+        """
+            Play a move of color on point, for the game of gomoku
+            Returns boolean: whether move was legal
+            """
+        if self.board[point] != EMPTY:
+            return False
+        # set the bit first, the win check in the base class reads it.
+        # point may be a numpy integer, whose shift would overflow.
+        self.stones[color] |= 1 << int(point)
+        return super().play_move_gomoku(point, color)
+
+    def undoMove(self):
+        location = int(self.moves[-1])
+        self.stones[self.board[location]] &= ~(1 << location)
+        super().undoMove()
+
+    def _five_through(self, stones, point, step):
+        """
+        Is point part of 5 or more stones in a row of the bitboard stones,
+        in the line with the given step
+        """
+        # bit q of fives is set if q, q + step, ..., q + 4 * step are all stones
+        pairs = stones & (stones >> step)
+        fours = pairs & (pairs >> 2 * step)
+        fives = fours & (stones >> 4 * step)
+        # a five containing point starts at one of point - 4 * step ... point
+        for k in range(5):
+            start = point - k * step
+            if start >= 0 and fives >> start & 1:
+                return True
+        return False
+
+    def point_check_game_end_gomoku(self, point):
+        """
+            Check if the point causes the game end for the game of Gomoko.
+            """
+        point = int(point)
+        stones = self.stones[self.board[point]]
+        for step in self._steps:
+            if self._five_through(stones, point, step):
+                return True
+        return False
+
+    def has_five(self, color):
+        """
+        Does color have 5 or more stones in a row anywhere on the board
+        """
+        stones = self.stones[color]
+        for step in self._steps:
+            pairs = stones & (stones >> step)
+            if pairs & (pairs >> 2 * step) & (stones >> 4 * step):
+                return True
+        return False
+
+    def five_in_row(self, point, color, step):
+        """
+        Would a stone of color on the empty point make 5 in a row in the
+        line with the given step
+        """
+        point = int(point)
+        return self._five_through(self.stones[color] | 1 << point, point, abs(step))
+
+"""
+Board classes selectable through the board_backend option of run()
+"""
+BOARD_BACKENDS = {'array': SimpleGoBoard, 'bitboard': BitboardGoBoard}
+
+def create_board(size, board_backend='array'):
+    """
+    Create an empty board of the given size with the selected backend
+    """
+    assert board_backend in BOARD_BACKENDS
+    return BOARD_BACKENDS[board_backend](size)
@@ -118,10 +118,7 @@ class GoBoardUtil(object):
         generate a list of all legal moves on the board for gomoku, where
         all empty positions are legal.
         """
-        moves = board.get_empty_points()
-        legal_moves = []
-        for move in moves:
-            legal_moves.append(move)
+        legal_moves = list(board.empty_points)
         shuffle(legal_moves)
         return legal_moves
             
@@ -130,11 +127,7 @@ class GoBoardUtil(object):
         """
         Generate a random move for the game of Gomoku.
         """
-        moves = board.get_empty_points()
-        if len(moves) == 0:
-            return PASS
-        np.random.shuffle(moves)
-        return moves[0]
+        return board.random_empty_point()
 
     @staticmethod       
     def generate_random_move(board, color, use_eye_filter):
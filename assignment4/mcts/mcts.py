@@ -5,11 +5,19 @@ This function is loosely based on https://github.com/Rochester-NRT/RocAlphaGo/bl
 import os, sys
 import numpy as np
 import random
+import multiprocessing
+import collections
 from board_util import GoBoardUtil, EMPTY, BLACK, WHITE
-from simple_board import SimpleGoBoard
+from simple_board import GomokuBoard
 from gtp_connection import point_to_coord, format_point
+from node_pool import NodePool
+from search_control import SearchControl
 
-import time
+"""
+Number of lost playouts a descent adds to each node on its path in the
+tree parallel search, until the result of its rollout is backed up
+"""
+VIRTUAL_LOSS = 1
 
 def uct_val(node, child, exploration, max_flag): 
     if child._n_visits == 0:
@@ -19,17 +27,74 @@ def uct_val(node, child, exploration, max_flag):
     else:
         return float(child._n_visits - child._n_wins)/child._n_visits + exploration*np.sqrt(np.log(node._n_visits)/child._n_visits)
 
+def uct_scores(parent_visits, visits, wins, exploration, max_flag):
+    """
+    uct_val for all children of a node at once.
+    visits and wins are the arrays of child statistics. There is a single
+    log for the parent, and unvisited children score inf as in uct_val.
+    """
+    if not max_flag:
+        wins = visits - wins
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = wins/visits + exploration*np.sqrt(np.log(parent_visits)/visits)
+    scores[visits == 0] = np.inf
+    return scores
+
+def _root_parallel_worker(args):
+    """
+    One process of MCTS.get_move_root_parallel: runs an independent search
+    on its own board for the given time and returns the root statistics
+    as a list of (move, visits, wins).
+    """
+    search_class, board, color, exploration, playout_policy, seconds, seed = args
+    random.seed(seed)
+    search = search_class()
+    search.toplay = color
+    search.exploration = exploration
+    search.playout_policy = playout_policy
+    control = SearchControl(seconds, safety_margin = 0)
+    while control.time_left():
+        search._playout(board.copy(), color)
+    return search._root_stats()
+
+"""
+Rollout state of a tree parallel worker process, set by _init_rollout_worker
+"""
+_rollout_search = None
+_rollout_board = None
+
+def _init_rollout_worker(board, toplay, playout_policy):
+    """
+    Pool initializer of MCTS.get_move_tree_parallel: keeps the root board
+    and the rollout settings in the worker, so a job only needs the moves
+    from the root to its leaf.
+    """
+    global _rollout_search, _rollout_board
+    random.seed()
+    _rollout_search = MCTS()
+    _rollout_search.toplay = toplay
+    _rollout_search.playout_policy = playout_policy
+    _rollout_board = board
+
+def _rollout_worker(moves):
+    """
+    Play moves from the root board of the worker and return the value
+    of a rollout from there
+    """
+    board = _rollout_board.copy()
+    for move in moves:
+        board.play_move_gomoku(move, board.current_player)
+    return _rollout_search._evaluate_rollout(board)
+
 def undo(board,move):
-    board.board[move]=EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
+    board.undoMove()
 
 def play_move(board, move, color):
     board.play_move_gomoku(move, color)
 
 def game_result(board):
     game_end, winner = board.check_game_end_gomoku()
-    moves = board.get_empty_points()
-    board_full = (len(moves) == 0)
+    board_full = (len(board.empty_points) == 0)
     if game_end:
         #return 1 if winner == board.current_player else -1
         return winner
@@ -43,28 +108,60 @@ class TreeNode(object):
     """
     version = 0.22
     name = "MCTS Player"
-    def __init__(self, parent):
+    def __init__(self, parent, index=0):
         """
-        parent is set when a node gets expanded
+        parent is set when a node gets expanded.
+        The statistics of a node are stored in the _child_visits and
+        _child_wins arrays of its parent, at position index, so that
+        select can score all children at once. Only a root keeps its
+        own counts.
         """
         self._parent = parent
+        self._index = index
         self._children = {}  # a map from move to TreeNode
-        self._n_visits = 0
-        self._n_wins = 0
+        self._child_nodes = []
+        self._child_visits = np.zeros(0)
+        self._child_wins = np.zeros(0)
+        self._visits = 0
+        self._wins = 0
         self._expanded = False
         self._move = None
 
+    @property
+    def _n_visits(self):
+        if self._parent is None:
+            return self._visits
+        return self._parent._child_visits[self._index]
+
+    @property
+    def _n_wins(self):
+        if self._parent is None:
+            return self._wins
+        return self._parent._child_wins[self._index]
+
     def expand(self, board, color):
         """
         Expands tree by creating new children.
         """
-        moves = GoBoardUtil.generate_legal_moves_gomoku(board)
+        moves = board.unique_moves(GoBoardUtil.generate_legal_moves_gomoku(board))
         for move in moves:
             if move not in self._children:
-                self._children[move] = TreeNode(self)
-                self._children[move]._move = move
+                child = TreeNode(self, len(self._child_nodes))
+                child._move = move
+                self._children[move] = child
+                self._child_nodes.append(child)
+        self._child_visits = np.zeros(len(self._child_nodes))
+        self._child_wins = np.zeros(len(self._child_nodes))
         self._expanded = True
 
+    def detach(self):
+        """
+        Make this node a root, keeping its statistics
+        """
+        self._visits = self._n_visits
+        self._wins = self._n_wins
+        self._parent = None
+
     def select(self, exploration, max_flag):
         """
         Select move among children that gives maximizes UCT. 
@@ -74,30 +171,54 @@ class TreeNode(object):
         Returns:
         A tuple of (move, next_node)
         """
-        return max(self._children.items(), key=lambda items:uct_val(self, items[1], exploration, max_flag))
+        scores = uct_scores(self._n_visits, self._child_visits, self._child_wins, exploration, max_flag)
+        child = self._child_nodes[int(np.argmax(scores))]
+        return child._move, child
         
-    def update(self, leaf_value):
+    def update(self, leaf_value, n=1):
         """
         Update node values from leaf evaluation.
         Arguments:
         leaf_value -- the value of subtree evaluation from the current player's perspective.
+        n -- number of playouts with this value, negative to take them back.
         
         Returns:
         None
         """
-        self._n_wins += leaf_value
-        self._n_visits += 1
+        if self._parent is None:
+            self._wins += n*leaf_value
+            self._visits += n
+        else:
+            self._parent._child_wins[self._index] += n*leaf_value
+            self._parent._child_visits[self._index] += n
+
+    def add_virtual_loss(self, loss_value):
+        """
+        Count VIRTUAL_LOSS pending playouts with value loss_value on this
+        node and its ancestors, so concurrent descents of the tree parallel
+        search choose other paths.
+        loss_value is the value of a loss for the player that moved into
+        this node; it alternates between 0 and 1 along the path.
+        """
+        if self._parent:
+            self._parent.add_virtual_loss(1.0 - loss_value)
+        self.update(loss_value, VIRTUAL_LOSS)
 
-    def update_recursive(self, leaf_value):
+    def update_recursive(self, leaf_value, loss_value=None):
         """
         Like a call to update(), but applied recursively for all ancestors.
+        If loss_value is given, the virtual loss added by add_virtual_loss()
+        with the same loss_value is taken back first.
 
         Note: it is important that this happens from the root downward so that 'parent' visit
         counts are correct.
         """
         # If it is not root, this node's parent should be updated first.
         if self._parent:
-            self._parent.update_recursive(leaf_value)
+            self._parent.update_recursive(leaf_value,
+                None if loss_value is None else 1.0 - loss_value)
+        if loss_value is not None:
+            self.update(loss_value, -VIRTUAL_LOSS)
         self.update(leaf_value)
 
     def is_leaf(self):
@@ -112,7 +233,7 @@ class TreeNode(object):
 
 class MCTS(object):
     def __init__(self):
-        self._root = TreeNode(None)
+        self._new_tree()
         self.toplay = self.int_to_color(BLACK)
         self.pattern_list=['Win', 'BlockWin', 'OpenFour', 'BlockOpenFour', 'Random']
 
@@ -150,6 +271,31 @@ class MCTS(object):
         # Update value and visit count of nodes in this traversal.
         node.update_recursive(leaf_value)
 
+    def _descend(self, board, color):
+        """
+        Selection and expansion of _playout for the tree parallel search.
+        Plays the selected path on board and adds a virtual loss to it.
+
+        Returns:
+        A tuple of (leaf node, moves from the root, loss value of the leaf)
+        """
+        node = self._root
+        if not node._expanded:
+            node.expand(board, color)
+        moves = []
+        while not node.is_leaf():
+            max_flag = color == self.toplay
+            move, node = node.select(self.exploration, max_flag)
+            board.play_move_gomoku(move, color)
+            color = GoBoardUtil.opponent(color)
+            moves.append(move)
+        if not node._expanded:
+            node.expand(board, color)
+        # the player who moved into the leaf is the opponent of color
+        loss_value = 1.0 if color == self.toplay else 0.0
+        node.add_virtual_loss(loss_value)
+        return node, moves, loss_value
+
     def _random_moves(self, board, color_to_play):
         return GoBoardUtil.generate_legal_moves_gomoku(board)
 
@@ -158,7 +304,7 @@ class MCTS(object):
             return "Random", self._random_moves(board, color_to_play)
         else:
             assert(self.playout_policy=='rule_based')
-            assert(isinstance(board, SimpleGoBoard))
+            assert(isinstance(board, GomokuBoard))
             ret=board.get_pattern_moves()
             if ret is None:
                 return "Random", self._random_moves(board, color_to_play)
@@ -174,8 +320,11 @@ class MCTS(object):
         res=game_result(board)
         simulation_moves=[]
         while(res is None):
-            _ , candidate_moves = self.policy_moves(board, board.current_player)
-            playout_move=random.choice(candidate_moves)
+            if self.playout_policy == 'random':
+                playout_move=board.random_empty_point()
+            else:
+                _ , candidate_moves = self.policy_moves(board, board.current_player)
+                playout_move=random.choice(candidate_moves)
             play_move(board, playout_move, board.current_player)
             simulation_moves.append(playout_move)
             res=game_result(board)
@@ -191,38 +340,118 @@ class MCTS(object):
             color_to_play,
             num_simulation,
             exploration = 0.4, 
-            playout_policy = 'random'):
+            playout_policy = 'random',
+            timelimit = 60):
         """
         Runs all playouts sequentially and returns the most visited move.
+        The search stops before timelimit seconds have passed.
         """
-
-        start = time.time()
+        control = SearchControl(timelimit)
 
         if self.toplay != color_to_play:
             sys.stderr.write("Dumping the subtree! \n")
             sys.stderr.flush()
-            self._root = TreeNode(None)
+            self._new_tree()
         self.toplay = color_to_play
         self.exploration = exploration
         self.playout_policy = playout_policy
-        #for n in range(num_simulation):
-        while True:
-            board_copy = board.copy()
+        # always one playout, so the root has children to choose from
+        board_copy = board.gomoku_copy()
+        self._playout(board_copy, color_to_play)
+        while control.time_left():
+            board_copy = board.gomoku_copy()
             self._playout(board_copy, color_to_play)
-
-            if (time.time() - start > 58.0):
-                break
         # choose a move that has the most visit 
-        moves_ls =  [(move, node._n_visits) for move, node in self._root._children.items()]
+        moves_ls = self._root_visits()
         if not moves_ls:
-            return None
+            return GoBoardUtil.generate_legal_moves_gomoku(board)[0]
         moves_ls = sorted(moves_ls,key=lambda i:i[1],reverse=True)
         move = moves_ls[0]
         #self.print_stat(board, self._root, color_to_play)
         #self.good_print(board,self._root,self.toplay,10)
         #assert board.is_legal(move[0], color_to_play)
         return move[0]
+
+    def get_move_root_parallel(self,
+            board,
+            color_to_play,
+            num_workers,
+            exploration = 0.4,
+            playout_policy = 'random',
+            timelimit = 60):
+        """
+        Root parallel search: num_workers processes each search their own
+        copy of the board until the deadline with an independent tree.
+        The visits and wins of the root children are summed over all
+        workers and the most visited move is returned.
+        The merged search has no tree below the root, so the next move
+        starts from a new tree.
+        """
+        control = SearchControl(timelimit)
+        jobs = [(type(self), board.gomoku_copy(), color_to_play, exploration,
+                 playout_policy, control.remaining(), random.randrange(1 << 30))
+                for _ in range(num_workers)]
+        with multiprocessing.Pool(num_workers) as workers:
+            results = workers.map(_root_parallel_worker, jobs)
+        visits = {}
+        wins = {}
+        for stats in results:
+            for move, n, w in stats:
+                visits[move] = visits.get(move, 0) + n
+                wins[move] = wins.get(move, 0) + w
+        self._new_tree()
+        self.toplay = color_to_play
+        self.exploration = exploration
+        self.playout_policy = playout_policy
+        if not visits:
+            return None
+        return max(visits, key=lambda move: visits[move])
         
+    def get_move_tree_parallel(self,
+            board,
+            color_to_play,
+            num_workers,
+            exploration = 0.4,
+            playout_policy = 'random',
+            timelimit = 60):
+        """
+        Tree parallel search: selection, expansion and backup run in this
+        process on the shared tree, the rollouts run in num_workers worker
+        processes. Up to 2 * num_workers descents are in flight at a time,
+        each holding a virtual loss on its path until its rollout returns.
+        Unlike the root parallel search, the tree is kept for the next move.
+        """
+        control = SearchControl(timelimit)
+
+        if self.toplay != color_to_play:
+            sys.stderr.write("Dumping the subtree! \n")
+            sys.stderr.flush()
+            self._new_tree()
+        self.toplay = color_to_play
+        self.exploration = exploration
+        self.playout_policy = playout_policy
+        pending = collections.deque()
+        with multiprocessing.Pool(num_workers, _init_rollout_worker,
+                (board.gomoku_copy(), color_to_play, playout_policy)) as workers:
+            while True:
+                while len(pending) < 2 * num_workers and control.time_left():
+                    board_copy = board.gomoku_copy()
+                    node, moves, loss_value = self._descend(board_copy, color_to_play)
+                    if game_result(board_copy) is not None:
+                        # nothing to simulate at the end of the game
+                        node.update_recursive(self._evaluate_rollout(board_copy), loss_value)
+                        continue
+                    pending.append((node, loss_value,
+                        workers.apply_async(_rollout_worker, (moves,))))
+                if not pending:
+                    break
+                node, loss_value, result = pending.popleft()
+                node.update_recursive(result.get(), loss_value)
+        moves_ls = self._root_visits()
+        if not moves_ls:
+            return None
+        return max(moves_ls, key=lambda i:i[1])[0]
+
     def update_with_move(self, last_move):
         """
         Step forward in the tree, keeping everything we already know about the subtree, assuming
@@ -230,11 +459,26 @@ class MCTS(object):
         """
         if last_move in self._root._children:
             self._root = self._root._children[last_move]
+            self._root.detach()
         else:
-            self._root = TreeNode(None)
-        self._root._parent = None
+            self._new_tree()
         self.toplay = GoBoardUtil.opponent(self.toplay)
 
+    def _new_tree(self):
+        self._root = TreeNode(None)
+
+    def _root_stats(self):
+        """
+        List of (move, visits, wins) for the children of the root
+        """
+        return [(move, node._n_visits, node._n_wins) for move, node in self._root._children.items()]
+
+    def _root_visits(self):
+        """
+        List of (move, number of visits) for the children of the root
+        """
+        return [(move, visits) for move, visits, _ in self._root_stats()]
+
     def int_to_color(self, i):
         """convert number representing player color to the appropriate character """
         int_to_color = {BLACK:"b", WHITE:"w"}
@@ -242,3 +486,70 @@ class MCTS(object):
            return int_to_color[i] 
         except:
             raise ValueError("Provided integer value for color is invalid")
+
+
+class PoolMCTS(MCTS):
+    """
+    MCTS on a tree stored in a NodePool instead of TreeNode objects.
+    Nodes are integer ids into the pool arrays. The pool has a fixed
+    capacity; when it is full, leaves are no longer expanded and the
+    playouts keep refining the existing tree.
+    """
+    def __init__(self, capacity=1 << 21):
+        self.pool = NodePool(capacity)
+        MCTS.__init__(self)
+
+    def _new_tree(self):
+        self._root = self.pool.new_root()
+
+    def _root_stats(self):
+        pool = self.pool
+        return [(int(pool.move[c]), pool.visits[c], pool.wins[c]) for c in pool.children(self._root)]
+
+    def _select(self, node, max_flag):
+        """
+        Return the child of node that maximizes UCT, see uct_scores
+        """
+        pool = self.pool
+        ids = pool.children(node)
+        scores = uct_scores(pool.visits[node],
+                            pool.visits[ids.start:ids.stop],
+                            pool.wins[ids.start:ids.stop],
+                            self.exploration, max_flag)
+        return ids.start + int(np.argmax(scores))
+
+    def _playout(self, board, color):
+        """
+        Same as MCTS._playout. The visited nodes are collected on the way
+        down and updated together at the end.
+        """
+        pool = self.pool
+        node = self._root
+        if not pool.is_expanded(node):
+            pool.expand(node, board.unique_moves(GoBoardUtil.generate_legal_moves_gomoku(board)))
+        path = [node]
+        while pool.num_children[node] > 0:
+            max_flag = color == self.toplay
+            node = self._select(node, max_flag)
+            board.play_move_gomoku(int(pool.move[node]), color)
+            color = GoBoardUtil.opponent(color)
+            path.append(node)
+        if not pool.is_expanded(node):
+            pool.expand(node, board.unique_moves(GoBoardUtil.generate_legal_moves_gomoku(board)))
+
+        assert board.current_player == color
+        leaf_value = self._evaluate_rollout(board)
+        pool.visits[path] += 1
+        pool.wins[path] += leaf_value
+
+    def update_with_move(self, last_move):
+        """
+        Step forward in the tree. The subtree of last_move is moved to the
+        front of the pool, the rest of the pool becomes free again.
+        """
+        child = self.pool.find_child(self._root, last_move)
+        if child < 0:
+            self._new_tree()
+        else:
+            self._root = self.pool.compact(child)
+        self.toplay = GoBoardUtil.opponent(self.toplay)
@@ -0,0 +1,128 @@
+"""
+node_pool.py
+
+Array based storage for an MCTS tree.
+Instead of one TreeNode object per node, all node data lives in
+preallocated parallel numpy arrays, indexed by an integer node id.
+The children of a node are allocated as one contiguous block, so the
+statistics of all children of a node are the slices
+visits[first:first + n] and wins[first:first + n].
+"""
+
+import numpy as np
+
+"""
+num_children value of a node that has not been expanded yet
+"""
+NOT_EXPANDED = -1
+
+class NodePool(object):
+
+    def __init__(self, capacity=1 << 21):
+        """
+        Allocates room for capacity nodes, about 32 bytes per node.
+        The pool never grows: once it is full, expand() fails and
+        the search continues with the tree it has.
+        """
+        self.capacity = capacity
+        self.visits = np.zeros(capacity, dtype = np.float64)
+        self.wins = np.zeros(capacity, dtype = np.float64)
+        self.first_child = np.zeros(capacity, dtype = np.int32)
+        self.num_children = np.full(capacity, NOT_EXPANDED, dtype = np.int32)
+        self.move = np.zeros(capacity, dtype = np.int32)
+        self.parent = np.full(capacity, -1, dtype = np.int32)
+        self.size = 0
+
+    def new_root(self):
+        """
+        Drop all nodes and return the id of a fresh root
+        """
+        self.size = 0
+        return self.allocate(1)
+
+    def allocate(self, n):
+        """
+        Allocate n consecutive nodes.
+        Returns the id of the first one, or -1 if the pool is full.
+        """
+        first = self.size
+        if first + n > self.capacity:
+            return -1
+        end = first + n
+        self.visits[first:end] = 0
+        self.wins[first:end] = 0
+        self.first_child[first:end] = 0
+        self.num_children[first:end] = NOT_EXPANDED
+        self.move[first:end] = 0
+        self.parent[first:end] = -1
+        self.size = end
+        return first
+
+    def expand(self, node, moves):
+        """
+        Create one child of node for each move.
+        Returns False if the pool has no room for them.
+        """
+        n = len(moves)
+        first = self.allocate(n)
+        if first < 0:
+            return False
+        self.move[first:first + n] = moves
+        self.parent[first:first + n] = node
+        self.first_child[node] = first
+        self.num_children[node] = n
+        return True
+
+    def is_expanded(self, node):
+        return self.num_children[node] != NOT_EXPANDED
+
+    def children(self, node):
+        """
+        Return the range of child ids of node
+        """
+        n = max(int(self.num_children[node]), 0)
+        first = int(self.first_child[node])
+        return range(first, first + n)
+
+    def find_child(self, node, move):
+        """
+        Return the id of the child of node reached by move, or -1
+        """
+        ids = self.children(node)
+        if len(ids) == 0:
+            return -1
+        hits = np.flatnonzero(self.move[ids.start:ids.stop] == move)
+        if len(hits) == 0:
+            return -1
+        return ids.start + int(hits[0])
+
+    def compact(self, root):
+        """
+        Move the subtree below root to the front of the pool and release
+        every other node, so the nodes of the old tree can be reused.
+        Sibling blocks are copied whole, in breadth first order.
+        Returns the new id of root, which is always 0.
+        """
+        old_ids = [root]
+        blocks = []
+        head = 0
+        while head < len(old_ids):
+            node = old_ids[head]
+            head += 1
+            n = int(self.num_children[node])
+            if n > 0:
+                first = int(self.first_child[node])
+                blocks.append((head - 1, len(old_ids), n))
+                old_ids.extend(range(first, first + n))
+        order = np.array(old_ids, dtype = np.int64)
+        size = len(order)
+        self.visits[:size] = self.visits[order]
+        self.wins[:size] = self.wins[order]
+        self.num_children[:size] = self.num_children[order]
+        self.move[:size] = self.move[order]
+        self.parent[0] = -1
+        for new_parent, new_first, n in blocks:
+            self.first_child[new_parent] = new_first
+            self.parent[new_first:new_first + n] = new_parent
+        self.size = size
+        return 0
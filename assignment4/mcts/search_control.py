@@ -0,0 +1,57 @@
+"""
+search_control.py
+
+Time control for the anytime search of the players.
+Instead of interrupting the search with SIGALRM, the search loop asks
+the controller before every playout whether there is time left, so a
+playout is never cut off halfway and the board is always restored.
+The controller also keeps the best move found so far.
+"""
+
+import time
+
+"""
+Seconds kept back from the timelimit for finishing the last playout
+and answering the GTP command. At most SAFETY_FRACTION of the timelimit
+is kept back, so a short timelimit still leaves time to search.
+"""
+SAFETY_MARGIN = 1.0
+SAFETY_FRACTION = 0.1
+
+class SearchControl(object):
+
+    def __init__(self, timelimit, safety_margin=SAFETY_MARGIN, check_every=1):
+        """
+        The search may run until timelimit - safety_margin seconds from
+        now, with safety_margin capped at SAFETY_FRACTION * timelimit.
+        The clock is read once every check_every playouts, which can be
+        raised when playouts are very fast.
+        """
+        safety_margin = min(safety_margin, SAFETY_FRACTION * timelimit)
+        self.deadline = time.monotonic() + max(timelimit - safety_margin, 0)
+        self.check_every = check_every
+        self.playouts = 0
+        self.best_move = None
+        self._expired = False
+
+    def time_left(self):
+        """
+        Called once before each playout, returns False when the search
+        has to stop
+        """
+        if self._expired:
+            return False
+        if self.playouts % self.check_every == 0 and time.monotonic() >= self.deadline:
+            self._expired = True
+            return False
+        self.playouts += 1
+        return True
+
+    def remaining(self):
+        """
+        Seconds until the deadline
+        """
+        return max(self.deadline - time.monotonic(), 0)
+
+    def update_best(self, move):
+        self.best_move = move
@@ -2,11 +2,13 @@
 #/usr/local/bin/python3
 # Set the path to your python3 above
 
-from gtp_connection import GtpConnection,move_to_coord,coord_to_point
+from gtp_connection import GtpConnection
 from board_util import GoBoardUtil,EMPTY, BLACK, WHITE
 from simple_board import SimpleGoBoard
+from bitboard import create_board, BOARD_BACKENDS
+from search_control import SearchControl
+import argparse
 import numpy as np
-import copy
 
 class SimulationPlayer(object):
     def __init__(self):
@@ -20,16 +22,26 @@ class SimulationPlayer(object):
         self.c = 2
         self.time = 1
         self.bestMove = None
+        self.timelimit = 60
+
+    def set_timelimit(self, timelimit):
+        self.timelimit = timelimit
 
     def name(self):
         return "Simulation Player ({0} sim.)".format(self.numSimulations)
 
     def genmove(self,moves,state,color):
+        """
+        UCB over the candidate points in moves, returns the best point
+        """
         assert not state.endOfGame()
         moveNr = len(moves)
         self.numSimulations = moveNr*100
         if moveNr == 1:
             return moves[0]
+        control = SearchControl(self.timelimit)
+        # all simulations run on state itself and are undone by restore
+        start = state.snapshot()
 
         #agent init
         self.moves = moves
@@ -40,11 +52,9 @@ class SimulationPlayer(object):
         self.preAction = self._choose_action()
         self.count[self.preAction] +=1
         self.time += 1
-        coord = move_to_coord(self.preAction,state.size)
-        point = coord_to_point(coord[0],coord[1],state.size)
-        copy_board = copy.deepcopy(state)
-        copy_board.play_move_gomoku(point,color)
-        reward = copy_board.mysimulate(color)
+        state.play_move_gomoku(self.preAction,color)
+        reward = state.mysimulate(color)
+        state.restore(start)
         self.avg_rewards[self.preAction]+=((reward-self.avg_rewards[self.preAction])/self.count[self.preAction])
         
 
@@ -55,14 +65,14 @@ class SimulationPlayer(object):
 
         #agent step
         for _ in range(self.numSimulations):
+            if not control.time_left():
+                break
             self.preAction = self._choose_action()
             self.count[self.preAction] +=1
             self.time += 1
-            coord = move_to_coord(self.preAction,state.size)
-            point = coord_to_point(coord[0],coord[1],state.size)
-            copy_board = copy.deepcopy(state)
-            copy_board.play_move_gomoku(point,color)
-            reward = copy_board.mysimulate(color)
+            state.play_move_gomoku(self.preAction,color)
+            reward = state.mysimulate(color)
+            state.restore(start)
             self.avg_rewards[self.preAction]+=((reward-self.avg_rewards[self.preAction])/self.count[self.preAction])
             #update self.bestMove
             if self.avg_rewards[self.preAction] > self.avg_rewards[self.bestMove]:
@@ -92,10 +102,7 @@ class SimulationPlayer(object):
 
     def simulate(self, state, move, color):
         stats = [0] * 3
-        #convert the last move to the index point
-        coord = move_to_coord(move,state.size)
-        point = coord_to_point(coord[0],coord[1],state.size)
-        state.play_move_gomoku(point,color)
+        state.play_move_gomoku(move,color)
         moveNr = state.moveNumber()
         for _ in range(self.numSimulations):
             winner, _ = state.simulate()
@@ -109,13 +116,17 @@ class SimulationPlayer(object):
             eval = 1 - eval
         return eval
     
-def run():
+def run(board_backend='array'):
     """
     start the gtp connection and wait for commands.
+    board_backend is 'array' for SimpleGoBoard or 'bitboard' for BitboardGoBoard
     """
-    board = SimpleGoBoard(7)
+    board = create_board(7, board_backend)
     con = GtpConnection(SimulationPlayer(), board)
     con.start_connection()
 
 if __name__=='__main__':
-    run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--board', choices = sorted(BOARD_BACKENDS), default = 'array',
+                        help = 'board representation')
+    run(parser.parse_args().board)
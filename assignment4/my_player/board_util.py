@@ -16,6 +16,16 @@ BORDER = 3
 
 def is_black_white(color):
     return color == BLACK or color == WHITE
+"""
+Threat flags of an empty point for one color in one direction,
+as computed by the pattern functions of SimpleGoBoard, see threats()
+"""
+FIVE = 1
+OPEN_FOUR = 2
+BLOCK_OPEN_FOUR = 4
+OPEN_THREE = 8
+DEAD_FOUR = 16
+
 """
 Encoding of special pass move
 """
@@ -117,10 +127,7 @@ class GoBoardUtil(object):
         generate a list of all legal moves on the board for gomoku, where
         all empty positions are legal.
         """
-        moves = board.get_empty_points()
-        legal_moves = []
-        for move in moves:
-            legal_moves.append(move)
+        legal_moves = list(board.empty_points)
         return legal_moves
             
     @staticmethod
@@ -128,11 +135,7 @@ class GoBoardUtil(object):
         """
         Generate a random move for the game of Gomoku.
         """
-        moves = board.get_empty_points()
-        if len(moves) == 0:
-            return PASS
-        np.random.shuffle(moves)
-        return moves[0]
+        return board.random_empty_point()
 
     @staticmethod       
     def generate_random_move(board, color, use_eye_filter):
@@ -9,10 +9,10 @@ at the University of Edinburgh.
 import traceback
 from sys import stdin, stdout, stderr
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, PASS, \
-                       MAXSIZE, coord_to_point
+                       MAXSIZE, coord_to_point, FIVE, OPEN_FOUR, \
+                       BLOCK_OPEN_FOUR, OPEN_THREE, DEAD_FOUR
 import numpy as np
 import re
-import signal
 
 class GtpConnection():
 
@@ -31,7 +31,6 @@ class GtpConnection():
         self.go_engine = go_engine
         self.board = board
         self.policy_type = "rule_based"
-        #signal.signal(signal.SIGALRM, self.handler)
         self.commands = {
             "protocol_version": self.protocol_version_cmd,
             "quit": self.quit_cmd,
@@ -55,7 +54,8 @@ class GtpConnection():
             "gogui-analyze_commands": self.gogui_analyze_cmd,
             "policy_moves": self.policy_moves_cmd,
             "policy": self.policy_cmd,
-            "count":self.count_color_cmd
+            "count":self.count_color_cmd,
+            "timelimit": self.timelimit_cmd
         }
         self.timelimit = 60
         self.open = False
@@ -71,9 +71,6 @@ class GtpConnection():
             "legal_moves": (1, 'Usage: legal_moves {w,b}')
         }
         self.all_points = GoBoardUtil.generate_legal_moves_gomoku(self.board)
-        moves = self.legalMoves()
-        self.move_to_point=dict(zip(moves,self.all_points))
-        self.point_to_move=dict(zip(self.all_points,moves))
     
     def write(self, data):
         stdout.write(data) 
@@ -153,10 +150,6 @@ class GtpConnection():
         Reset the board to empty board of given size
         """
         self.board.reset(size)
-        points = GoBoardUtil.generate_legal_moves_gomoku(self.board)
-        moves = self.legalMoves()
-        self.move_to_point=dict(zip(moves,points))
-        self.point_to_move=dict(zip(points,moves))
         self.open = False
 
     def board2d(self):
@@ -339,14 +332,15 @@ class GtpConnection():
                      )
 
     #####Assignment 3 starts here##############################
-    def legalMoves(self):
-        moves = GoBoardUtil.generate_legal_moves_gomoku(self.board)
-        gtp_moves = []
-        for move in moves:
-            coords = point_to_coord(move, self.board.size)
-            gtp_moves.append(format_point(coords))
+    def legal_points(self):
+        return GoBoardUtil.generate_legal_moves_gomoku(self.board)
 
-        return gtp_moves
+    def format_points(self, points):
+        """
+        Return the GTP strings of a list of points, sorted
+        """
+        return sorted(format_point(point_to_coord(point, self.board.size))
+                      for point in points)
 
     def policy_cmd(self,args):
         self.policy_type = args[0]
@@ -389,8 +383,7 @@ class GtpConnection():
     def count_color_cmd(self,color):
         color = BLACK if color == 'b' else WHITE
         count = 0
-        empty_moves = self.legalMoves()
-        empty_points=[self.move_to_point[move] for move in empty_moves]
+        empty_points = self.legal_points()
         self.respond(str(empty_points))
         for point in empty_points:
             if self.board.get_color(point) == color:
@@ -399,14 +392,18 @@ class GtpConnection():
         self.respond(str(count))
 
     def policy_moves(self):
+        """
+        Return the move type and the list of candidate points
+        for the player to move
+        """
 
         #Opening
         
         if self.count_color(BLACK) == 0:
-            return "First Move, ",["D4"]
+            return "First Move, ",[self.board.pt(4, 4)]
 
         if self.count_color(BLACK) == 1 and self.board.get_color(36) == EMPTY and self.board.current_player == WHITE:
-            return "First Move, ",["D4"]
+            return "First Move, ",[self.board.pt(4, 4)]
 
 
         if self.count_color(self.board.current_player) == 1 and self.count_color(GoBoardUtil.opponent(self.board.current_player)) >= 1:
@@ -416,9 +413,9 @@ class GtpConnection():
             #if direction == "vert_hori":
             pointsA = self.board.StraightOpening(my_position)
             #print(pointsA)
-            return "Opening ",[self.point_to_move[point] for point in pointsA]
+            return "Opening ",list(pointsA)
         
-        empty_moves = self.legalMoves()
+        empty_points = self.legal_points()
         win_moves=[]
         block_win_moves=[]
         open_four_moves=[]
@@ -429,26 +426,32 @@ class GtpConnection():
         double_dead_four = []
         block_dead_four = []
         
-        steps = [1,self.board.NS,self.board.NS-1,self.board.NS+1]
-        for move in empty_moves:
-            for step in steps:
-                point = self.move_to_point[move]
-                if self.board.five_in_row(point,self.board.current_player,step):
-                    win_moves.append(move)
-                elif self.board.five_in_row(point,GoBoardUtil.opponent(self.board.current_player),step):
-                    block_win_moves.append(move)
-                elif self.board.OpenFour(point,self.board.current_player,step):
-                    open_four_moves.append(move)
-                elif self.board.BlockOpenFour(point,GoBoardUtil.opponent(self.board.current_player),step):
-                    block_open_four_moves.append(move)
-                elif self.board.OpenThree(point,self.board.current_player,step):
-                    open_three_moves.append(move)
-                elif self.board.OpenThree(point,GoBoardUtil.opponent(self.board.current_player),step):
-                    block_open_three.append(move)
-                elif self.board.DeadFour(point,self.board.current_player,step):
-                    double_dead_four.append(move)
-                elif self.board.DeadFour(point,GoBoardUtil.opponent(self.board.current_player),step):
-                    block_dead_four.append(move)
+        # threats[point, direction, color] has the flags of five_in_row,
+        # OpenFour, BlockOpenFour, OpenThree and DeadFour, kept up to date
+        # by the board
+        threats = self.board.threats()
+        me = self.board.current_player
+        opp = GoBoardUtil.opponent(me)
+        for point in empty_points:
+            for direction in range(4):
+                mine = threats[point, direction, me]
+                theirs = threats[point, direction, opp]
+                if mine & FIVE:
+                    win_moves.append(point)
+                elif theirs & FIVE:
+                    block_win_moves.append(point)
+                elif mine & OPEN_FOUR:
+                    open_four_moves.append(point)
+                elif theirs & BLOCK_OPEN_FOUR:
+                    block_open_four_moves.append(point)
+                elif mine & OPEN_THREE:
+                    open_three_moves.append(point)
+                elif theirs & OPEN_THREE:
+                    block_open_three.append(point)
+                elif mine & DEAD_FOUR:
+                    double_dead_four.append(point)
+                elif theirs & DEAD_FOUR:
+                    block_dead_four.append(point)
 
 
         dead_four_open_three = set(double_dead_four).intersection(set(open_three_moves))
@@ -459,16 +462,16 @@ class GtpConnection():
 
         #print(double_dead_four)
         move_types=["Win ","BlockWin ","OpenFour ","BlockOpenFour ","DoubleDeadFour","DeadFourOpenThree ","DoubleOpenThree","BlockDoubleDeadFour ","BlockDoubleThree","OpenThree ","Random "]
-        moves=[win_moves,block_win_moves,open_four_moves,block_open_four_moves,double_dead_four,dead_four_open_three,double_open_three,block_dead_four,block_open_three,open_three_moves,empty_moves]
+        moves=[win_moves,block_win_moves,open_four_moves,block_open_four_moves,double_dead_four,dead_four_open_three,double_open_three,block_dead_four,block_open_three,open_three_moves,empty_points]
         for i in range(len(move_types)):
             if moves[i]:
                 return move_types[i],moves[i]
 
     def policy_moves_cmd(self,args):
         
-        move_type,moves = self.policy_moves()
-        if moves:
-            move_as_string = ' '.join(sorted(moves))
+        move_type,points = self.policy_moves()
+        if points:
+            move_as_string = ' '.join(self.format_points(points))
             self.respond(move_type+move_as_string)
         else:
             self.respond(" ")
@@ -481,34 +484,25 @@ class GtpConnection():
         board_color = args[0].lower()
         color = color_to_int(board_color)
         game_end, winner = self.board.check_game_end_gomoku()
-        if game_end or len(self.legalMoves()) == 0:
+        if game_end or len(self.legal_points()) == 0:
             if winner == color:
                 self.respond("pass")
-            elif len(self.legalMoves()) == 0:
+            elif len(self.legal_points()) == 0:
                 self.respond("pass")
             else:
                 self.respond("resign")
             return
-        signal.signal(signal.SIGALRM, signal_handler)
-        signal.alarm(self.timelimit)
-        try:
-            move_type,pending_moves = self.policy_moves()
-            move = self.go_engine.genmove(pending_moves,self.board, color)
-            signal.alarm(0)
-        except Exception as e:
-            move = self.go_engine.bestMove
+        self.go_engine.set_timelimit(int(self.timelimit))
+        move_type,pending_moves = self.policy_moves()
+        point = self.go_engine.genmove(pending_moves,self.board, color)
 
-        if move == PASS:
+        if point == PASS:
             self.respond("pass")
             return
-        coord = move_to_coord(move,self.board.size)
-        point = coord_to_point(coord[0],coord[1],self.board.size)
         if self.board.is_legal_gomoku(point, color):
             self.board.play_move_gomoku(point, color)
-            self.respond(move)
+            self.respond(format_point(point_to_coord(point, self.board.size)))
 
-def signal_handler(signum, frame):
-    raise Exception("Timed out!")
             
 def point_to_coord(point, boardsize):
     """
@@ -13,10 +13,98 @@ import random
 import numpy as np
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
                        PASS, is_black_white, coord_to_point, where1d, \
-                       MAXSIZE, NULLPOINT
+                       MAXSIZE, NULLPOINT, FIVE, OPEN_FOUR, BLOCK_OPEN_FOUR, \
+                       OPEN_THREE, DEAD_FOUR
 
 from gtp_connection import point_to_coord,format_point
 
+"""
+A stone can only change the threats of points up to this distance along
+its lines, the farthest point looked at by BlockOpenFour
+"""
+THREAT_RANGE = 6
+
+"""
+Base 4 digit values of the 2 * THREAT_RANGE + 1 points of a line
+"""
+LINE_POWERS = 4 ** np.arange(2 * THREAT_RANGE + 1, dtype = np.int64)
+
+"""
+Tables per board size, see line_indices
+"""
+_line_index_tables = {}
+
+def line_indices(board):
+    """
+    Return a (maxpoint, 4, 2 * THREAT_RANGE + 1) array whose entry
+    [point, direction, k] is the point that the pattern functions read
+    at point + (k - THREAT_RANGE) * step. Like get_color, a negative
+    point wraps around and a point past the end reads as the border
+    point 0.
+    """
+    if board.size not in _line_index_tables:
+        offsets = np.arange(-THREAT_RANGE, THREAT_RANGE + 1)
+        steps = np.array([1, board.NS, board.NS - 1, board.NS + 1])
+        points = np.arange(board.maxpoint)
+        lines = points[:, None, None] + steps[None, :, None] * offsets[None, None, :]
+        lines[lines < 0] += board.maxpoint
+        lines[lines >= board.maxpoint] = 0
+        _line_index_tables[board.size] = lines
+    return _line_index_tables[board.size]
+
+"""
+Threat flags (black, white) of an empty point by the base 4 code of
+its line. The flags only depend on the line, so the table is shared
+by all boards. It is filled on the first use of a code, as a complete
+table would have 4**13 entries, and emptied when it reaches
+THREAT_TABLE_LIMIT codes.
+"""
+THREAT_TABLE_LIMIT = 1 << 18
+_threat_table = {}
+
+"""
+Data that only depends on the board size: the empty board array, its
+empty points, and the neighbor and diagonal lists of every point.
+All boards of a size share one BoardGeometry, so reset() and copy() do
+not rebuild them. Its fields must not be modified.
+"""
+class BoardGeometry(object):
+
+    def __init__(self, size):
+        self.size = size
+        self.NS = size + 1
+        self.maxpoint = size * size + 3 * (size + 1)
+        board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        self.row_starts = [row * self.NS + 1 for row in range(size + 1)]
+        for row in range(1, size + 1):
+            start = self.row_starts[row]
+            board[start : start + size] = EMPTY
+        self.empty_board = board
+        self.empty_points = [int(p) for p in where1d(board == EMPTY)]
+        self.empty_index = [-1] * self.maxpoint
+        for i, p in enumerate(self.empty_points):
+            self.empty_index[p] = i
+        self.neighbors = []
+        self.diag_neighbors = []
+        for point in range(self.maxpoint):
+            if board[point] == BORDER:
+                self.neighbors.append([])
+            else:
+                self.neighbors.append([nb for nb in
+                                       [point - 1, point + 1, point - self.NS, point + self.NS]
+                                       if board[nb] != BORDER])
+            self.diag_neighbors.append([point - self.NS - 1,
+                                        point - self.NS + 1,
+                                        point + self.NS - 1,
+                                        point + self.NS + 1])
+
+_geometries = {}
+
+def board_geometry(size):
+    if size not in _geometries:
+        _geometries[size] = BoardGeometry(size)
+    return _geometries[size]
+
 class SimpleGoBoard(object):
 
     def get_color(self, point):
@@ -67,7 +155,30 @@ class SimpleGoBoard(object):
         Return:
             The empty points on the board
         """
-        return where1d(self.board == EMPTY)
+        return np.array(self.empty_points, dtype = np.int32)
+
+    def random_empty_point(self):
+        """
+        Return a uniformly random empty point, or PASS if the board is full
+        """
+        if not self.empty_points:
+            return PASS
+        return self.empty_points[random.randrange(len(self.empty_points))]
+
+    def _remove_empty_point(self, point):
+        """
+        Swap-remove point from empty_points, keeping _empty_index in sync
+        """
+        i = self._empty_index[point]
+        last = self.empty_points.pop()
+        if last != point:
+            self.empty_points[i] = last
+            self._empty_index[last] = i
+        self._empty_index[point] = -1
+
+    def _add_empty_point(self, point):
+        self._empty_index[point] = len(self.empty_points)
+        self.empty_points.append(point)
 
     def __init__(self, size):
         """
@@ -89,58 +200,46 @@ class SimpleGoBoard(object):
         self.WE = 1
         self.ko_recapture = None
         self.current_player = BLACK
-        self.maxpoint = size * size + 3 * (size + 1)
-        self.board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        self.geometry = board_geometry(size)
+        self.maxpoint = self.geometry.maxpoint
+        self.board = np.copy(self.geometry.empty_board)
         self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
-        self._initialize_empty_points(self.board)
-        self._initialize_neighbors()
+        self.neighbors = self.geometry.neighbors
+        # empty_points is kept up to date by play_move_gomoku and undoMove,
+        # _empty_index maps a point to its position in empty_points
+        self.empty_points = list(self.geometry.empty_points)
+        self._empty_index = list(self.geometry.empty_index)
         self.moves=[]
         self.last_move = None
+        self._winner = None
+        self._win_move_nr = None
+        # threat map, refreshed lazily by threats(): stones played or
+        # removed since the last refresh are collected in _threat_changed
+        self._threat_steps = [1, self.NS, self.NS - 1, self.NS + 1]
+        self._threats = np.zeros((self.maxpoint, 4, 3), dtype = np.int8)
+        self._threat_changed = set()
+        self._threats_stale = True
 
     def copy(self):
-        b = SimpleGoBoard(self.size)
-        assert b.NS == self.NS
-        assert b.WE == self.WE
-        b.ko_recapture = self.ko_recapture
-        b.current_player = self.current_player
-        assert b.maxpoint == self.maxpoint
+        """
+        Copy of the position. Plain values and the shared geometry are
+        taken over as they are, only the mutable state is cloned.
+        """
+        b = type(self).__new__(type(self))
+        b.__dict__.update(self.__dict__)
         b.board = np.copy(self.board)
+        b.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
+        b.moves = list(self.moves)
+        b.empty_points = list(self.empty_points)
+        b._empty_index = list(self._empty_index)
+        b._threats = np.copy(self._threats)
+        b._threat_changed = set(self._threat_changed)
         return b
 
     def row_start(self, row):
         assert row >= 1
         assert row <= self.size
-        return row * self.NS + 1
-        
-    def _initialize_empty_points(self, board):
-        """
-        Fills points on the board with EMPTY
-        Argument
-        ---------
-        board: numpy array, filled with BORDER
-        """
-        for row in range(1, self.size + 1):
-            start = self.row_start(row)
-            board[start : start + self.size] = EMPTY
-
-    def _on_board_neighbors(self, point):
-        nbs = []
-        for nb in self._neighbors(point):
-            if self.board[nb] != BORDER:
-                nbs.append(nb)
-        return nbs
-            
-    def _initialize_neighbors(self):
-        """
-        precompute neighbor array.
-        For each point on the board, store its list of on-the-board neighbors
-        """
-        self.neighbors = []
-        for point in range(self.maxpoint):
-            if self.board[point] == BORDER:
-                self.neighbors.append([])
-            else:
-                self.neighbors.append(self._on_board_neighbors(point))
+        return self.geometry.row_starts[row]
         
     def is_eye(self, point, color):
         """
@@ -318,10 +417,7 @@ class SimpleGoBoard(object):
 
     def _diag_neighbors(self, point):
         """ List of all four diagonal neighbors of point """
-        return [point - self.NS - 1, 
-                point - self.NS + 1, 
-                point + self.NS - 1, 
-                point + self.NS + 1]
+        return self.geometry.diag_neighbors[point]
     
     def _point_to_coord(self, point):
         """
@@ -357,8 +453,13 @@ class SimpleGoBoard(object):
         if self.board[point] != EMPTY:
             return False
         self.board[point] = color
+        self._remove_empty_point(point)
+        self._threat_changed.add(point)
         self.moves.append(point)
         self.last_move = point
+        if self._winner is None and self.point_check_game_end_gomoku(point):
+            self._winner = color
+            self._win_move_nr = len(self.moves)
         self.current_player = GoBoardUtil.opponent(color)
         return True
         
@@ -375,7 +476,7 @@ class SimpleGoBoard(object):
             p = p + d
             if self.board[p] == color:
                 count = count + 1
-                if count == 5:
+                if count >= 5:
                     break
             else:
                 break
@@ -385,12 +486,12 @@ class SimpleGoBoard(object):
             p = p + d
             if self.board[p] == color:
                 count = count + 1
-                if count == 5:
+                if count >= 5:
                     break
             else:
                 break
-        assert count <= 5
-        return count == 5
+        # the played stone may join two shorter lines into an overline
+        return count >= 5
     
     def point_check_game_end_gomoku(self, point):
         """
@@ -414,22 +515,21 @@ class SimpleGoBoard(object):
         
         return False
     
+    @property
+    def winner(self):
+        """
+        The color that has five in a row, or None while the game is open.
+        Maintained incrementally by play_move_gomoku and undoMove.
+        """
+        return self._winner
+
     def check_game_end_gomoku(self):
         """
             Check if the game ends for the game of Gomoku.
+            Only the last played stone can complete a five, so the result
+            is tracked in play_move_gomoku instead of rescanning all stones.
             """
-        white_points = where1d(self.board == WHITE)
-        black_points = where1d(self.board == BLACK)
-        
-        for point in white_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, WHITE
-    
-        for point in black_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, BLACK
-
-        return False, None
+        return self._winner is not None, self._winner
 
 
     ##Assignment 3 starts here
@@ -455,10 +555,37 @@ class SimpleGoBoard(object):
             self.undoMove()
         assert self.moveNumber() == moveNr
 
+    def snapshot(self):
+        """
+        Record the current position for restore().
+        Only moves played after the snapshot are taken back, so this
+        is much cheaper than copying the board.
+        """
+        return (len(self.moves), self.current_player, self.last_move,
+                set(self._threat_changed))
+
+    def restore(self, snapshot):
+        """
+        Undo all moves played since snapshot was taken
+        """
+        moveNr, current_player, last_move, threat_changed = snapshot
+        self.resetToMoveNumber(moveNr)
+        self.current_player = current_player
+        self.last_move = last_move
+        # the undos marked the points they emptied again, which covers
+        # the points refreshed since the snapshot. The points that were
+        # waiting for a refresh at the snapshot are added as well.
+        self._threat_changed |= threat_changed
+
     def undoMove(self):
         location = self.moves.pop()
         self.last_move = location
+        if self._win_move_nr is not None and len(self.moves) < self._win_move_nr:
+            self._winner = None
+            self._win_move_nr = None
         self.board[location] = EMPTY
+        self._add_empty_point(location)
+        self._threat_changed.add(location)
         self.current_player = GoBoardUtil.opponent(self.current_player)
 
     def simulate(self):
@@ -633,6 +760,72 @@ class SimpleGoBoard(object):
         self.board[point] = EMPTY
         return False
 
+    def _threat_flags(self, point, color, step):
+        flags = 0
+        if self.five_in_row(point,color,step):
+            flags |= FIVE
+        if self.OpenFour(point,color,step):
+            flags |= OPEN_FOUR
+        if self.BlockOpenFour(point,color,step):
+            flags |= BLOCK_OPEN_FOUR
+        if self.OpenThree(point,color,step):
+            flags |= OPEN_THREE
+        if self.DeadFour(point,color,step):
+            flags |= DEAD_FOUR
+        return flags
+
+    def _update_threats(self, points, directions):
+        """
+        Recompute the threats of the given (point, direction) pairs with
+        one gather of their lines and a lookup of each line code
+        """
+        lines = line_indices(self)[points, directions]
+        codes = self.board[lines] @ LINE_POWERS
+        for point, direction, code in zip(points, directions, codes.tolist()):
+            if self.board[point] != EMPTY:
+                self._threats[point, direction] = 0
+                continue
+            flags = _threat_table.get(code)
+            if flags is None:
+                if len(_threat_table) >= THREAT_TABLE_LIMIT:
+                    _threat_table.clear()
+                step = self._threat_steps[direction]
+                flags = (self._threat_flags(point, BLACK, step),
+                         self._threat_flags(point, WHITE, step))
+                _threat_table[code] = flags
+            self._threats[point, direction, BLACK] = flags[0]
+            self._threats[point, direction, WHITE] = flags[1]
+
+    def threats(self):
+        """
+        Return the threat map: threats()[point, direction, color] holds the
+        threat flags of color on the empty point in the direction with
+        step [1, NS, NS - 1, NS + 1][direction].
+        Only the points within THREAT_RANGE of a changed stone along its
+        line are recomputed. get_color wraps around for negative points,
+        so the points that read a stone that way are recomputed as well.
+        """
+        if self._threats_stale or \
+                2 * THREAT_RANGE * len(self._threat_changed) >= len(self.empty_points):
+            self._threats[:] = 0
+            points = [point for point in self.empty_points for _ in range(4)]
+            directions = list(range(4)) * len(self.empty_points)
+        else:
+            affected = set()
+            for direction, step in enumerate(self._threat_steps):
+                for changed in self._threat_changed:
+                    for k in range(-THREAT_RANGE, THREAT_RANGE + 1):
+                        for point in (changed + k * step, changed + k * step - self.maxpoint):
+                            if 0 <= point < self.maxpoint:
+                                affected.add((point, direction))
+            points = [point for point, _ in affected]
+            directions = [direction for _, direction in affected]
+        if points:
+            self._update_threats(points, directions)
+        self._threat_changed.clear()
+        self._threats_stale = False
+        return self._threats
+
     def StraightOpening(self,pointA):
 
         points = set()
@@ -1,121 +1,198 @@
+"""
+play.py
+
+Tournament between the players of this directory.
+Every pair of the given players plays --games games, half of them with
+each player as black. The games run in parallel in a process pool; each
+game talks GTP to its two engines and to the random player, which acts
+as referee, through pexpect.
+
+Reports the wins, draws and losses of each pairing with a 95%
+confidence interval of the score, and the genmove latency of each
+player.
+
+Usage: python3 play.py my_player gomoku4 [mcts ...] [--games N] [--workers N] [--timelimit S]
+"""
+
+import argparse
+import itertools
+import math
+import multiprocessing
+import os
+import time
+
 import pexpect
 
-player1='my_player/Gomoku4.py'
-player2='gomoku4/Gomoku4.py'
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PLAYERS = {
+    'my_player': 'my_player/Gomoku4.py',
+    'gomoku4': 'gomoku4/Gomoku4.py',
+    'gomoku41': 'gomoku41/Gomoku4.py',
+    'mcts': 'mcts/Gomoku4.py',
+    'flat_mc_player': 'flat_mc_player/Gomoku3.py',
+    'random_player': 'random_player/Gomoku2.py',
+}
+REFEREE = 'random_player'
 
-win1=0
-win2=0
-numTimeout=0
-draw=0
-timeout = 60
-moves_dic={}
+def spawn(name, timeout):
+    return pexpect.spawn('python3 ' + os.path.join(HERE, PLAYERS[name]),
+                         cwd = HERE, timeout = timeout)
 
 def getMove(p,color):
+    """
+    Return the move of p, 'resign', 'pass' or 'timeout'
+    """
     p.sendline('genmove '+color)
-    p.expect([pexpect.TIMEOUT,'= [A-Z][0-9]','= resign','= pass'])
-    if p.after==pexpect.TIMEOUT:
+    i = p.expect([pexpect.TIMEOUT,pexpect.EOF,'= [A-Z][0-9]+','= resign','= pass'])
+    if i < 2:
         return 'timeout'
     return p.after.decode("utf-8")[2:]
 
 def playMove(p,color,move):
     p.sendline('play '+color+' '+move)
 
-def setupPlayer(p):
-    p.sendline('boardsize 7')
+def setupPlayer(p, boardsize, timelimit):
+    p.sendline('boardsize {}'.format(boardsize))
     p.sendline('clear_board')
-    p.sendline('timelimit {}'.format(timeout))
-
-def playSingleGame(alternative=False):
-    global moves_dic
-    if not alternative:
-        p1=pexpect.spawn('python3 '+player1,timeout=timeout+1)
-        p2=pexpect.spawn('python3 '+player2,timeout=timeout+1)
-    else:
-        p1=pexpect.spawn('python3 '+player2,timeout=timeout+1)
-        p2=pexpect.spawn('python3 '+player1,timeout=timeout+1)
-    ob=pexpect.spawn('python3 random_player/Gomoku2.py')
-    setupPlayer(p1)
-    setupPlayer(p2)
-    result=None
-    numTimeout=0
-    sw=0
-    while 1:
-        if sw==0:
-            move=getMove(p1,'b')
-            assert(move!='pass')
-            if move=='resign':
-                result=2
-                break
-            elif move=='timeout':
-                result=2
-                break
-            playMove(p2,'b',move)
-            playMove(ob,'b',move)
-        else:
-            move=getMove(p2,'w')
-            assert(move!='pass')
-            if move=='resign':
-                result=1
-                break
-            elif move=='timeout':
-                result=1
+    p.sendline('timelimit {}'.format(timelimit))
+
+def playSingleGame(game):
+    """
+    Play one game. game is (black, white, boardsize, timelimit).
+    Returns a dict with the players, the winner ('black', 'white' or
+    'draw'), how the game ended, the moves and the genmove latencies
+    in seconds of both colors.
+    """
+    black, white, boardsize, timelimit = game
+    engines = {'b': spawn(black, timelimit + 1), 'w': spawn(white, timelimit + 1)}
+    ob = spawn(REFEREE, 10)
+    for p in engines.values():
+        setupPlayer(p, boardsize, timelimit)
+    setupPlayer(ob, boardsize, timelimit)
+    moves = []
+    latency = {'b': [], 'w': []}
+    winner = None
+    reason = None
+    color = 'b'
+    try:
+        while winner is None:
+            other = 'w' if color == 'b' else 'b'
+            start = time.time()
+            move = getMove(engines[color], color)
+            latency[color].append(time.time() - start)
+            if move in ('resign', 'timeout', 'pass'):
+                winner = 'white' if color == 'b' else 'black'
+                reason = move
                 break
-            playMove(p1,'w',move)
-            playMove(ob,'w',move)
-        sw=1-sw
-        if move in moves_dic:
-            moves_dic[move] += 1
-        else:
-            moves_dic[move] = 1
-        print(move)
-        ob.sendline('gogui-rules_final_result')
-        ob.expect(['= black','= white','= draw','= unknown'])
-        status=ob.after.decode("utf-8")[2:]
-        if status=='black':
-            result=1
-            break
-        elif status=='white':
-            result=2
-            break
-        elif status=='draw':
-            result=0
-            break
-        else:
-            assert(status=='unknown')
-    return result,numTimeout
-
-def playGames(numGame=10):
-    global win1,win2,draw,numTimeout
-    for i in range(0,numGame):
-        if(i<numGame/2):
-            alter=False
-        else:
-            alter=True
-        result,timeout=playSingleGame(alternative=alter)
-        if timeout>0:
-            numTimeout+=1
-        else:
-            if result==0:
-                draw+=1
-                print("Game %d"%(win1+win2+draw))
-                print("Draw")
+            playMove(engines[other], color, move)
+            playMove(ob, color, move)
+            moves.append(move)
+            ob.sendline('gogui-rules_final_result')
+            ob.expect(['= black','= white','= draw','= unknown'])
+            status = ob.after.decode("utf-8")[2:]
+            if status != 'unknown':
+                winner = status
+                reason = 'full board' if status == 'draw' else 'five'
+            color = other
+    finally:
+        for p in list(engines.values()) + [ob]:
+            p.close(force = True)
+    return {'black': black, 'white': white, 'winner': winner, 'reason': reason,
+            'moves': moves, 'latency': {black: latency['b'], white: latency['w']}}
+
+def schedule(players, games, boardsize, timelimit):
+    """
+    Return the games of a round robin between players, with each player
+    of a pairing black in half of the games
+    """
+    jobs = []
+    for p1, p2 in itertools.combinations(players, 2):
+        for i in range(games):
+            if i % 2 == 0:
+                jobs.append((p1, p2, boardsize, timelimit))
+            else:
+                jobs.append((p2, p1, boardsize, timelimit))
+    return jobs
+
+def score_interval(wins, draws, losses, z=1.96):
+    """
+    Score (wins + draws / 2) / games with the half width of its normal
+    approximation confidence interval
+    """
+    n = wins + draws + losses
+    if n == 0:
+        return None, None
+    score = (wins + 0.5 * draws) / n
+    if n == 1:
+        return score, None
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2
+                + losses * score ** 2) / (n - 1)
+    return score, z * math.sqrt(variance / n)
+
+def percentile(values, q):
+    values = sorted(values)
+    k = (len(values) - 1) * q
+    lo = int(math.floor(k))
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+def outputResult(players, results):
+    for p1, p2 in itertools.combinations(players, 2):
+        win1 = win2 = draw = 0
+        reasons = {}
+        for r in results:
+            if {r['black'], r['white']} != {p1, p2}:
+                continue
+            reasons[r['reason']] = reasons.get(r['reason'], 0) + 1
+            if r['winner'] == 'draw':
+                draw += 1
+            elif r[r['winner']] == p1:
+                win1 += 1
             else:
-                if result==1 and alter==False or result==2 and alter==True:
-                    win1+=1
-                    print("Game %d"%(win1+win2+draw))
-                    print("Player 1 win")
-                    
-                else:
-                    assert(result==1 and alter==True or result==2 and alter==False)
-                    win2+=1
-                    print("Game %d"%(win1+win2+draw))
-                    print("Player 2 win")
-                    
-
-def outputResult():
-    global moves_dic
-    print('player1 win',win1,'player2 win',win2,'draw',draw)
-    #print(moves_dic)
-
-playGames(10)
-outputResult()
+                win2 += 1
+        score, half = score_interval(win1, draw, win2)
+        if score is None:
+            continue
+        print('{} vs {}: {} win {}, {} win {}, draw {}'.format(p1, p2, p1, win1, p2, win2, draw))
+        if half is None:
+            print('  score of {} {:.3f}'.format(p1, score))
+        else:
+            print('  score of {} {:.3f} +- {:.3f} (95%)'.format(p1, score, half))
+        print('  endings ' + ', '.join('{} {}'.format(k, v) for k, v in sorted(reasons.items())))
+    print('genmove latency in seconds: mean median p95 max')
+    for name in players:
+        times = [t for r in results for t in r['latency'].get(name, [])]
+        if not times:
+            continue
+        print('  {:16s} {:.3f} {:.3f} {:.3f} {:.3f}'.format(
+            name, sum(times) / len(times), percentile(times, 0.5),
+            percentile(times, 0.95), max(times)))
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Round robin tournament between players')
+    parser.add_argument('players', nargs = '+', choices = sorted(PLAYERS))
+    parser.add_argument('--games', type = int, default = 10,
+                        help = 'games per pairing')
+    parser.add_argument('--workers', type = int, default = multiprocessing.cpu_count(),
+                        help = 'games played at the same time')
+    parser.add_argument('--timelimit', type = int, default = 60,
+                        help = 'seconds per move')
+    parser.add_argument('--boardsize', type = int, default = 7)
+    args = parser.parse_args()
+    if len(set(args.players)) < 2:
+        parser.error('need at least two different players')
+    players = list(dict.fromkeys(args.players))
+
+    jobs = schedule(players, args.games, args.boardsize, args.timelimit)
+    results = []
+    with multiprocessing.Pool(args.workers) as pool:
+        for r in pool.imap_unordered(playSingleGame, jobs):
+            results.append(r)
+            print('Game {}/{}: {} (b) vs {} (w), {} by {} after {} moves'.format(
+                len(results), len(jobs), r['black'], r['white'],
+                r['winner'], r['reason'], len(r['moves'])), flush = True)
+    outputResult(players, results)
+
+if __name__ == '__main__':
+    main()